@@ -11,9 +11,11 @@ import warnings
 from dotenv import load_dotenv
 import sys
 sys.path.append('/Users/ray/Desktop/hackdeez/backend/ai_backend/agents')
+sys.path.append('/Users/ray/Desktop/hackdeez/backend/ai_backend')
 
 from .tools import check_pipeline_status, get_user_data, fill_information, setup_insureds_from_counts, call_pricing_api, call_purchase_api, make_payment
 from .prompt import AGENT_DESCRIPTION, AGENT_INSTRUCTION
+from executors import offload
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
@@ -33,7 +35,16 @@ conversation_agent = Agent(
     model="gemini-2.0-flash-exp",
     description="Travel insurance assistant that helps users find and buy insurance plans",
     instruction=AGENT_INSTRUCTION,
-    tools=[check_pipeline_status, get_user_data, fill_information, setup_insureds_from_counts, call_pricing_api, make_payment, call_purchase_api],
+    # Tools are sync; offload() runs each in a bounded thread pool so they never block the event loop
+    tools=[
+        offload("disk")(check_pipeline_status),
+        offload("disk")(get_user_data),
+        offload("llm")(fill_information),
+        offload("disk")(setup_insureds_from_counts),
+        offload("http")(call_pricing_api),
+        offload("http")(make_payment),
+        offload("http")(call_purchase_api)
+    ],
     sub_agents=[document_magic_agent, policy_recommendation_agent]
 )
 
@@ -7,6 +7,7 @@ Uses its OWN vision capability to see images, then saves via tool
 from google.adk.agents import Agent
 from .tools_new import save_document_data
 from .prompt import AGENT_DESCRIPTION, AGENT_INSTRUCTION_NEW
+from executors import offload
 
 # Create the document magic agent - uses vision + save tool
 document_magic_agent = Agent(
@@ -14,5 +15,5 @@ document_magic_agent = Agent(
     model="gemini-2.0-flash-exp",
     description=AGENT_DESCRIPTION,
     instruction=AGENT_INSTRUCTION_NEW,
-    tools=[save_document_data]
+    tools=[offload("disk")(save_document_data)]
 )
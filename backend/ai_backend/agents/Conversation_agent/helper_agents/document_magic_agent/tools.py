@@ -18,7 +18,7 @@ import sys
 
 # Import profile manager for file-based storage
 sys.path.append('/Users/ray/Desktop/hackdeez/backend/ai_backend')
-from profile_manager import load_profile, save_profile
+from profile_manager import load_profile, save_profile, get_current_user_id
 
 
 def process_document(base64_image: str, doc_type: str = "auto") -> Dict:
@@ -35,9 +35,8 @@ def process_document(base64_image: str, doc_type: str = "auto") -> Dict:
     Returns:
         Dictionary with updated_schema, missing_fields, and status
     """
-    # Try to get user_id from environment variable set by runner
-    # This is a workaround for sub-agent tool calls
-    user_id = os.environ.get('CURRENT_USER_ID', 'default_user')
+    # Sub-agent tool calls don't receive user_id; take it from the current request
+    user_id = get_current_user_id()
 
     print(f"[DEBUG] process_document called with user_id from context: {user_id}")
     print(f"[DEBUG] base64_image type: {type(base64_image)}, length: {len(base64_image) if hasattr(base64_image, '__len__') else 'N/A'}")
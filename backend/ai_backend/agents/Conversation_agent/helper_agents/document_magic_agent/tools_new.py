@@ -7,7 +7,8 @@ import sys
 from typing import Dict, List
 
 sys.path.append('/Users/ray/Desktop/hackdeez/backend/ai_backend')
-from profile_manager import load_profile, save_profile
+from profile_manager import load_profile, save_profile, get_current_user_id
+from destinations import canonicalize_country
 
 
 def save_document_data(extracted_data: str, doc_type: str = "auto") -> Dict:
@@ -25,7 +26,7 @@ def save_document_data(extracted_data: str, doc_type: str = "auto") -> Dict:
     """
     import json
 
-    user_id = os.environ.get('CURRENT_USER_ID', 'default_user')
+    user_id = get_current_user_id()
     print(f"[DEBUG] save_document_data called for user: {user_id}")
     print(f"[DEBUG] extracted_data: {extracted_data[:200]}...")
 
@@ -43,6 +44,11 @@ def save_document_data(extracted_data: str, doc_type: str = "auto") -> Dict:
             "error": f"Invalid JSON: {str(e)}"
         }
 
+    # Countries are stored as ISO alpha-2 codes (passports give e.g. "SGP", itineraries "Tokyo")
+    for field in ['departureCountry', 'arrivalCountry', 'nationality']:
+        if field in data:
+            data[field] = canonicalize_country(data[field])
+
     # Update profile with extracted data
     updates_made = []
 
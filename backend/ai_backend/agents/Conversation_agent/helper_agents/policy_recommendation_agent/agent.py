@@ -6,6 +6,7 @@ Has 3 tools: analyze needs (2-stage + DB), recommend coverage (real DB), select
 from google.adk.agents import Agent
 from .tools import analyze_itinerary_needs, recommend_coverage, select_best_plan
 from .prompt import AGENT_DESCRIPTION, AGENT_INSTRUCTION
+from executors import offload
 
 # Create the policy recommendation agent with all 3 tools (no sub-agents)
 policy_recommendation_agent = Agent(
@@ -13,5 +14,9 @@ policy_recommendation_agent = Agent(
     model="gemini-2.0-flash-exp",
     description=AGENT_DESCRIPTION,
     instruction=AGENT_INSTRUCTION,
-    tools=[analyze_itinerary_needs, recommend_coverage, select_best_plan]
+    tools=[
+        offload("llm")(analyze_itinerary_needs),  # Gemini calls + claims DB lookup
+        offload("db")(recommend_coverage),
+        offload("disk")(select_best_plan)
+    ]
 )
@@ -11,8 +11,10 @@ from google import genai
 
 # Import profile manager and DB helper
 sys.path.append('/Users/ray/Desktop/hackdeez/backend/ai_backend')
-from profile_manager import load_profile, save_profile
+from profile_manager import load_profile, save_profile, get_current_user_id
 from db_helper import get_claim_stats
+from destinations import canonicalize_country
+from plan_scoring import get_plan_scorer, need_weights
 
 # Paths
 TAXONOMY_PATH = "/Users/ray/Desktop/hackdeez/backend/ai_backend/agents/rag_agent/taxonomy_data.json"
@@ -35,7 +37,7 @@ def analyze_itinerary_needs(itinerary_text: str) -> Dict:
     Returns:
         Dictionary with updated needs and list of identified needs
     """
-    user_id = os.environ.get('CURRENT_USER_ID', 'default_user')
+    user_id = get_current_user_id()
     print(f"[DEBUG] analyze_itinerary_needs called for user: {user_id}")
 
     profile = load_profile(user_id)
@@ -87,7 +89,8 @@ def analyze_itinerary_needs(itinerary_text: str) -> Dict:
 
         if db_stats:
             print(f"[DB QUERY] Claim type: {db_stats['claim_type']}, Avg: ${db_stats['gross_incurred']:,.2f}")
-            profile["arrivalCountry"] = destination
+            # Profiles keep the ISO code (pricing API format), not the LLM's free-text name
+            profile["arrivalCountry"] = canonicalize_country(destination)
         else:
             print(f"[DB QUERY] No data for {destination}")
             db_stats = {"destination": destination, "claim_type": "Unknown", "cause_of_loss": "Unknown", "gross_incurred": 0.0}
@@ -163,7 +166,7 @@ def recommend_coverage() -> Dict:
     Returns:
         Dictionary with recommended coverage amounts based on real data
     """
-    user_id = os.environ.get('CURRENT_USER_ID', 'default_user')
+    user_id = get_current_user_id()
     print(f"[DEBUG] recommend_coverage called for user: {user_id}")
 
     profile = load_profile(user_id)
@@ -234,52 +237,38 @@ def select_best_plan() -> Dict:
     Returns:
         Dictionary with selected plan and match analysis
     """
-    user_id = os.environ.get('CURRENT_USER_ID', 'default_user')
+    user_id = get_current_user_id()
     print(f"[DEBUG] select_best_plan called for user: {user_id}")
 
     profile = load_profile(user_id)
-    needs = profile.get("needs", {})
-    identified_needs = [k for k, v in needs.items() if v]
+    # One normalized needs vector drives both the matched-needs cards and the ranking
+    weighted = need_weights(profile.get("needs", {}), profile.get("need_weights"))
+    identified_needs = list(weighted)
 
     print(f"[DEBUG] Matching {len(identified_needs)} needs against taxonomy")
 
-    # Load taxonomy
+    # Scorer (built once, rebuilt when taxonomy_data.json changes) and the index it was
+    # built from, so both come from the same taxonomy version
     try:
-        with open(TAXONOMY_PATH, 'r') as f:
-            taxonomy = json.load(f)
+        scorer = get_plan_scorer(TAXONOMY_PATH)
     except Exception as e:
         return {"success": False, "error": str(e)}
+    index = scorer.index
 
-    # Match needs against products
+    # Match needs against products: one bitset intersection per product
     coverage_match = {
-        "Product A": {"matched": 0, "matched_needs": []},
-        "Product B": {"matched": 0, "matched_needs": []},
-        "Product C": {"matched": 0, "matched_needs": []}
+        product: {"matched": len(matched_needs), "matched_needs": matched_needs}
+        for product, matched_needs in index.match(identified_needs).items()
     }
 
-    for layer_key, conditions in taxonomy.get("layers", {}).items():
-        for condition_item in conditions:
-            condition_name = condition_item.get("condition") or condition_item.get("benefit_name", "")
-
-            if condition_name in identified_needs:
-                products_data = condition_item.get("products", {})
-
-                for product_name in ["Product A", "Product B", "Product C"]:
-                    if product_name in products_data:
-                        product_info = products_data[product_name]
-                        if product_info.get("condition_exist") or product_info.get("benefit_exist"):
-                            coverage_match[product_name]["matched"] += 1
-                            coverage_match[product_name]["matched_needs"].append(condition_name)
-
-    # Calculate scores
-    scores = {}
-    for product in ["Product A", "Product B", "Product C"]:
-        matched = coverage_match[product]["matched"]
-        total = len(identified_needs)
-        scores[product] = int((matched / total) * 100) if total > 0 else 0
+    # Rank all products in one pass: weighted needs x coverage/limits matrix
+    ranked = scorer.rank_weights(weighted)
+    if not ranked:
+        return {"success": False, "error": "No products in the taxonomy"}
+    ranking = {r["name"]: r for r in ranked}
 
-    # Determine recommended plan (highest score)
-    recommended_plan = max(scores, key=scores.get)
+    # Determine recommended plan (highest rank score)
+    recommended_plan = ranked[0]["name"]
 
     # Get coverage recommendations from profile
     coverage_rec = {}
@@ -293,35 +282,19 @@ def select_best_plan() -> Dict:
     except:
         pass
 
-    # Build product cards for all 3 plans
+    # Build product cards for every product in the taxonomy
     products = {
-        "Product A": {
-            "name": "Product A",
-            "match_percentage": scores["Product A"],
-            "needs_matched": coverage_match["Product A"]["matched"],
-            "total_needs": len(identified_needs),
-            "matched_needs": coverage_match["Product A"]["matched_needs"],
-            "is_recommended": recommended_plan == "Product A",
-            "coverage": coverage_rec
-        },
-        "Product B": {
-            "name": "Product B",
-            "match_percentage": scores["Product B"],
-            "needs_matched": coverage_match["Product B"]["matched"],
-            "total_needs": len(identified_needs),
-            "matched_needs": coverage_match["Product B"]["matched_needs"],
-            "is_recommended": recommended_plan == "Product B",
-            "coverage": coverage_rec
-        },
-        "Product C": {
-            "name": "Product C",
-            "match_percentage": scores["Product C"],
-            "needs_matched": coverage_match["Product C"]["matched"],
+        product: {
+            "name": product,
+            "match_percentage": ranking[product]["match_percentage"],
+            "score": ranking[product]["score"],
+            "needs_matched": coverage_match[product]["matched"],
             "total_needs": len(identified_needs),
-            "matched_needs": coverage_match["Product C"]["matched_needs"],
-            "is_recommended": recommended_plan == "Product C",
+            "matched_needs": coverage_match[product]["matched_needs"],
+            "is_recommended": recommended_plan == product,
             "coverage": coverage_rec
         }
+        for product in index.products
     }
 
     return {
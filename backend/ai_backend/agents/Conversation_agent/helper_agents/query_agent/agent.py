@@ -6,6 +6,7 @@ Answers questions about policy plans using Taxonomy_Filled.json
 from google.adk.agents import Agent
 from .tools import compare_plans, answer_policy_question
 from .prompt import AGENT_DESCRIPTION, AGENT_INSTRUCTION
+from executors import offload
 
 # Create the query agent directly
 query_agent = Agent(
@@ -13,5 +14,8 @@ query_agent = Agent(
     model="gemini-2.0-flash-exp",
     description=AGENT_DESCRIPTION,
     instruction=AGENT_INSTRUCTION,
-    tools=[compare_plans, answer_policy_question]
+    tools=[
+        offload("disk")(compare_plans),  # builds the plan diff index on first use
+        offload("llm")(answer_policy_question)  # RAG tier: Chroma, embeddings and Gemini
+    ]
 )
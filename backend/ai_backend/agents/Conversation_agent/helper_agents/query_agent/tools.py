@@ -1,49 +1,173 @@
 """
 Tools for Query Agent
-Placeholder implementations - to be properly implemented later
+compare_plans: precomputed plan-vs-plan diffs over the filled taxonomy
+answer_policy_question: taxonomy inverted index first, RAG + Gemini for the long tail
 """
 
-from typing import Dict
+import os
+import sys
+import time
+import threading
+from typing import Dict, List, Optional
+from google import genai
+
+sys.path.append('/Users/ray/Desktop/hackdeez/backend/ai_backend')
+from plan_comparison import get_plan_diff_index, resolve_product
+from taxonomy_search import TIER1_MIN_CONFIDENCE, get_taxonomy_search
+
+# Policy chunks handed to Gemini by the RAG tier
+RAG_CONTEXT_SIZE = int(os.getenv("QUERY_RAG_CONTEXT_SIZE", "5"))
+
+# Which tier answered and how long it took, since process start. rag_failed counts
+# questions sent to the RAG tier that errored and got the low-confidence taxonomy matches.
+answer_stats = {
+    "taxonomy": {"count": 0, "total_ms": 0.0},
+    "rag": {"count": 0, "total_ms": 0.0},
+    "rag_failed": {"count": 0, "total_ms": 0.0}
+}
+_answer_stats_lock = threading.Lock()
+
+_rag_agent = None
+_rag_agent_lock = threading.Lock()
 
 
 def compare_plans(plan_a: str, plan_b: str, comparison_aspect: str = "coverage") -> Dict:
     """
-    Compare two insurance plans
+    Compare two insurance plans using the filled taxonomy (taxonomy_data.json)
 
-    PLACEHOLDER: To be properly implemented with Taxonomy_Filled.json grounding
+    Served from diffs precomputed for every pair of products, so no LLM or
+    vector store call is made.
 
     Args:
-        plan_a: First plan identifier (e.g., "Plan A", "Basic")
-        plan_b: Second plan identifier (e.g., "Plan B", "Premium")
-        comparison_aspect: What to compare (coverage, price, benefits)
+        plan_a: First plan identifier (e.g., "Product A", "Plan A", "A")
+        plan_b: Second plan identifier (e.g., "Product B", "Plan B", "B")
+        comparison_aspect: What to compare (coverage, benefits, limits, exclusions, all)
 
     Returns:
-        Comparison details
+        Comparison details: differences per taxonomy layer plus counts per kind of difference
     """
-    return {
-        "plan_a": plan_a,
-        "plan_b": plan_b,
-        "comparison_aspect": comparison_aspect,
-        "message": "Plan comparison placeholder - to be implemented with Taxonomy_Filled.json"
+    print(f"[DEBUG] compare_plans called: {plan_a} vs {plan_b} ({comparison_aspect})")
+
+    try:
+        diffs = get_plan_diff_index()
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        return {"success": False, "error": str(e), "plan_a": plan_a, "plan_b": plan_b}
+
+    return diffs.compare(plan_a, plan_b, comparison_aspect)
+
+
+def _get_rag_agent():
+    """RAG agent, created on the first question that needs it (loads the vector store)."""
+    global _rag_agent
+    if _rag_agent is None:
+        with _rag_agent_lock:
+            if _rag_agent is None:
+                from agents.rag_agent import create_rag_agent
+                _rag_agent = create_rag_agent(auto_load=True)
+    return _rag_agent
+
+
+def _format_matches(matches: List[Dict]) -> str:
+    """Taxonomy matches as plain text, one line per product."""
+    wording = {
+        "benefit": ("covered", "not covered"),
+        "condition": ("applies", "does not apply"),
+        "exclusion": ("excluded", "no such exclusion")
     }
+    lines = []
+    for match in matches:
+        lines.append(f"{match['name']}:")
+        present, absent = wording[match["kind"]]
+        for product, info in match["products"].items():
+            status = present if info["covered"] else absent
+            if info["limit"] is not None:
+                status += f", up to ${info['limit']:,.0f}"
+            excerpt = f' - "{info["excerpt"]}"' if info["covered"] and info["excerpt"] else ""
+            lines.append(f"  {product}: {status}{excerpt}")
+    return "\n".join(lines)
+
+
+def _answered(tier: str, started: float, result: Dict) -> Dict:
+    """Record which tier answered and its latency."""
+    latency_ms = (time.perf_counter() - started) * 1000
+    with _answer_stats_lock:
+        answer_stats[tier]["count"] += 1
+        answer_stats[tier]["total_ms"] += latency_ms
+    print(f"[DEBUG] answer_policy_question answered by {tier} tier in {latency_ms:.1f}ms")
+    result["tier"] = tier
+    result["latency_ms"] = round(latency_ms, 2)
+    return result
 
 
 def answer_policy_question(question: str, policy_context: str = "general") -> Dict:
     """
     Answer questions about insurance policies
 
-    PLACEHOLDER: To be properly implemented with Taxonomy_Filled.json grounding
+    Tier 1 looks the question up in an in-memory inverted index over the filled
+    taxonomy (condition names + policy wording) - no network, milliseconds. Only when
+    its confidence is below QUERY_TIER1_MIN_CONFIDENCE does tier 2 retrieve policy
+    chunks (RAGAgent.get_policy_context) and ask Gemini.
 
     Args:
         question: User's question about policies
         policy_context: Context (general, specific plan, coverage type)
 
     Returns:
-        Answer to the policy question
+        Answer to the policy question, with the tier that answered, its latency and confidence
     """
-    return {
+    started = time.perf_counter()
+    print(f"[DEBUG] answer_policy_question called: {question} ({policy_context})")
+
+    # A specific plan narrows the answer to that product; anything else refines the query
+    query = question
+    products: Optional[List[str]] = None
+    matches: List[Dict] = []
+    confidence = 0.0
+    try:
+        search = get_taxonomy_search()
+        if policy_context and policy_context.lower() != "general":
+            product = resolve_product(policy_context, search.products)
+            if product:
+                products = [product]
+            else:
+                query = f"{question} {policy_context}"
+
+        hits = search.search(query, k=3)
+        if hits:
+            confidence = hits[0]["confidence"]
+            matches = [search.describe(hit, query, products) for hit in hits]
+    except Exception as e:
+        print(f"[WARNING] Taxonomy search unavailable: {e}")
+
+    result = {
         "question": question,
         "policy_context": policy_context,
-        "answer": "Policy question placeholder - to be implemented with Taxonomy_Filled.json",
-        "message": "This tool will use Taxonomy_Filled.json to answer policy questions"
+        "confidence": confidence,
+        "matches": matches
     }
+
+    if matches and confidence >= TIER1_MIN_CONFIDENCE:
+        result["answer"] = _format_matches(matches)
+        return _answered("taxonomy", started, result)
+
+    # Tier 2: retrieve policy wording and generate an answer
+    try:
+        from agents.rag_agent.prompt import format_policy_qa_prompt
+
+        # Hybrid retrieval: questions quote exact policy terms ("Period of Insurance", "Section 21")
+        context = _get_rag_agent().get_policy_context(query, context_size=RAG_CONTEXT_SIZE, mode="hybrid")
+        client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        response = client.models.generate_content(
+            model='gemini-2.0-flash-exp',
+            contents=format_policy_qa_prompt(context=context, question=question)
+        )
+        result["answer"] = response.text.strip()
+        return _answered("rag", started, result)
+
+    except Exception as e:
+        # Fall back to the best the taxonomy had, flagged as low confidence
+        print(f"[ERROR] RAG tier failed: {e}")
+        result["answer"] = _format_matches(matches) if matches else "No information found in the policy taxonomy."
+        result["fallback_error"] = str(e)
+        return _answered("rag_failed", started, result)
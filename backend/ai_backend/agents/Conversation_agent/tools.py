@@ -17,7 +17,8 @@ from schema_template import taxonomy_dict
 
 # Import profile manager for file-based storage
 sys.path.append('/Users/ray/Desktop/hackdeez/backend/ai_backend')
-from profile_manager import load_profile, save_profile, delete_profile
+from profile_manager import load_profile, save_profile, update_profile, delete_profile
+from destinations import canonicalize_country
 
 def check_pipeline_status(user_id: str) -> Dict:
     """
@@ -236,31 +237,11 @@ Examples:
         extraction_result = json.loads(extracted_text)
         extracted_fields = extraction_result.get("extracted_fields", {})
 
-        # Update profile with extracted fields
-        updates_made = []
-        for field_name, field_value in extracted_fields.items():
-            # Handle nested fields (e.g., "insureds.0.firstName")
-            if '.' in field_name:
-                parts = field_name.split('.')
-                current = profile
-                for part in parts[:-1]:
-                    if part.isdigit():  # Array index
-                        idx = int(part)
-                        if idx >= len(current):
-                            current.append({})
-                        current = current[idx]
-                    else:
-                        if part not in current:
-                            current[part] = {}
-                        current = current[part]
-                current[parts[-1]] = field_value
-            else:
-                profile[field_name] = field_value
-
-            updates_made.append(f"{field_name}={field_value}")
-
-        # Save profile to file
-        save_profile(user_id, profile)
+        # Update only the extracted fields (dotted paths like "insureds.0.passport")
+        updates_made = [f"{field_name}={field_value}" for field_name, field_value in extracted_fields.items()]
+        if extracted_fields:
+            update_profile(user_id, extracted_fields)
+            profile = get_user_data(user_id)
 
         # Identify missing critical fields
         missing = _identify_missing_fields(profile)
@@ -335,8 +316,9 @@ def call_pricing_api(user_id: str) -> Dict:
             "tripType": user_profile.get("tripType", "ST"),
             "departureDate": user_profile.get("departureDate", ""),
             "returnDate": user_profile.get("returnDate", user_profile.get("departureDate", "")),  # Use departure if no return
-            "departureCountry": user_profile.get("departureCountry", "SG"),
-            "arrivalCountry": user_profile.get("arrivalCountry", ""),
+            # Older profiles may hold country names; the API wants alpha-2 codes
+            "departureCountry": canonicalize_country(user_profile.get("departureCountry") or "SG"),
+            "arrivalCountry": canonicalize_country(user_profile.get("arrivalCountry", "")),
             "adultsCount": user_profile.get("adultsCount", 1),
             "childrenCount": user_profile.get("childrenCount", 0)
         }
@@ -391,15 +373,14 @@ def call_pricing_api(user_id: str) -> Dict:
             }
 
         # Store the complete pricing response for purchase API
-        user_profile["last_quote"] = {
-            "quoteId": quote_id,
-            "pricing_response": pricing_data,
-            "offers": offers,
-            "selected_offer": offers[0]  # Default to first offer
-        }
-
-        # Save profile to file
-        save_profile(user_id, user_profile)
+        update_profile(user_id, {
+            "last_quote": {
+                "quoteId": quote_id,
+                "pricing_response": pricing_data,
+                "offers": offers,
+                "selected_offer": offers[0]  # Default to first offer
+            }
+        })
 
         return {
             "success": True,
@@ -631,13 +612,12 @@ def make_payment(user_id: str, amount_cents: int, description: str = "Travel Ins
 
             # TODO: In production, payment should only be marked "completed" after webhook confirmation
             # For now, we're mocking the payment as immediately completed for testing
-            user_profile["payment_status"] = "completed"
-            user_profile["payment_id"] = payment_id
-            user_profile["payment_amount"] = amount_cents
-            user_profile["payment_client_secret"] = client_secret
-
-            # Save profile to file
-            save_profile(user_id, user_profile)
+            update_profile(user_id, {
+                "payment_status": "completed",
+                "payment_id": payment_id,
+                "payment_amount": amount_cents,
+                "payment_client_secret": client_secret
+            })
 
             return {
                 "success": True,
@@ -705,8 +685,7 @@ def check_payment_status(user_id: str) -> Dict:
             payment_status = status_data.get("status")
 
             # Update profile with latest status
-            user_profile["payment_status"] = payment_status
-            save_profile(user_id, user_profile)
+            update_profile(user_id, {"payment_status": payment_status})
 
             return {
                 "success": True,
@@ -65,29 +65,19 @@ class RAGAgent:
 
     def embed_policies(self, force_rebuild: bool = False) -> bool:
         """
-        Process and embed all policy documents in the policies directory.
+        Embed the policy documents in the policies directory.
+
+        Incremental by default: only new or changed PDFs are parsed and embedded,
+        and vectors of removed PDFs are deleted (see PolicyRAGPipeline.sync_vectorstore).
 
         Args:
-            force_rebuild: If True, rebuild even if vectorstore exists
+            force_rebuild: If True, drop the vectorstore and re-embed every policy
 
         Returns:
             True if successful, False otherwise
         """
-        # Check if vectorstore already exists
-        if os.path.exists(self.pipeline.chroma_db_path) and not force_rebuild:
-            response = input(
-                f"Vectorstore already exists at {self.pipeline.chroma_db_path}. "
-                "Rebuild? (y/n): "
-            )
-            if response.lower() != 'y':
-                print("Loading existing vectorstore instead...")
-                self.pipeline.load_existing_vectorstore()
-                self.is_ready = True
-                return True
-
         try:
-            # Run the full pipeline
-            self.pipeline.build_pipeline()
+            self.pipeline.build_pipeline(rebuild=force_rebuild)
             self.is_ready = True
             return True
         except Exception as e:
@@ -99,7 +89,8 @@ class RAGAgent:
         query: str,
         k: int = 4,
         filename: Optional[str] = None,
-        include_scores: bool = False
+        include_scores: bool = False,
+        mode: Optional[str] = None
     ) -> List[Dict]:
         """
         Query the policy documents for relevant information.
@@ -108,7 +99,8 @@ class RAGAgent:
             query: The search query
             k: Number of results to return
             filename: Optional filename to filter results by specific policy
-            include_scores: If True, include similarity scores
+            include_scores: If True, include similarity scores (vector search only)
+            mode: Retrieval mode, "vector", "hybrid" or "lexical" (default: RAG_RETRIEVAL_MODE)
 
         Returns:
             List of relevant document chunks with metadata
@@ -140,7 +132,8 @@ class RAGAgent:
             return self.pipeline.query(
                 query_text=query,
                 k=k,
-                filter_by_filename=filename
+                filter_by_filename=filename,
+                mode=mode
             )
 
     def get_available_policies(self) -> List[str]:
@@ -168,7 +161,38 @@ class RAGAgent:
         """
         return self.query_policies(query=query, k=k, filename=policy_name)
 
-    def get_policy_context(self, query: str, context_size: int = 3) -> str:
+    def search_across_policies(
+        self,
+        query: str,
+        filenames: List[str],
+        k_per_policy: int = 4
+    ) -> Dict[str, List[Dict]]:
+        """
+        Search several policy documents at once.
+        Equivalent to search_in_policy for each filename, but the query is embedded
+        once and the store is searched in a single pass.
+
+        Args:
+            query: Search query
+            filenames: Names of the policy files
+            k_per_policy: Number of results per policy
+
+        Returns:
+            Mapping of policy filename -> relevant chunks from that policy
+        """
+        if not self.is_ready:
+            raise RuntimeError(
+                "RAG Agent not ready. Run embed_policies() first or "
+                "initialize with auto_load=True"
+            )
+
+        return self.pipeline.query_across_policies(
+            query_text=query,
+            filenames=filenames,
+            k_per_policy=k_per_policy
+        )
+
+    def get_policy_context(self, query: str, context_size: int = 3, mode: Optional[str] = None) -> str:
         """
         Get formatted context from policy documents for a query.
         Useful for feeding into LLM prompts.
@@ -176,11 +200,12 @@ class RAGAgent:
         Args:
             query: The search query
             context_size: Number of chunks to retrieve
+            mode: Retrieval mode (see query_policies)
 
         Returns:
             Formatted string with context from policies
         """
-        results = self.query_policies(query=query, k=context_size)
+        results = self.query_policies(query=query, k=context_size, mode=mode)
 
         context_parts = []
         for i, result in enumerate(results, 1):
@@ -9,19 +9,19 @@ from agents.rag_agent.agent import RAGAgent
 # Load RAG agent
 agent = RAGAgent(auto_load=True)
 
-# Search for age eligibility in Product B
-print("Searching for 'age eligibility' in Product B (TravelEasy Pre-Ex)...")
-results = agent.search_in_policy(
-    "TravelEasy Pre-Ex Policy QTD032212-PX.pdf",
-    "age eligibility minimum maximum years old insured person eligibility requirements conditions policy",
-    k=10
-)
+QUERY = "age eligibility minimum maximum years old insured person eligibility requirements conditions policy"
 
-print(f"\nFound {len(results)} chunks:")
-print("="*80)
+# Search every policy with one query embedding and one store pass
+policies = agent.get_available_policies()
+print(f"Searching for 'age eligibility' in {len(policies)} policies...")
+results_by_policy = agent.search_across_policies(QUERY, policies, k_per_policy=10)
 
-for i, result in enumerate(results, 1):
-    print(f"\n[Chunk {i}] Page {result['page']}")
-    print(f"Length: {len(result['content'])} characters")
-    print(f"Content:\n{result['content']}")
-    print("-"*80)
+for policy, results in results_by_policy.items():
+    print(f"\n{policy}: found {len(results)} chunks")
+    print("="*80)
+
+    for i, result in enumerate(results, 1):
+        print(f"\n[Chunk {i}] Page {result['page']}")
+        print(f"Length: {len(result['content'])} characters")
+        print(f"Content:\n{result['content']}")
+        print("-"*80)
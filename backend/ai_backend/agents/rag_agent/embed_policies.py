@@ -2,9 +2,13 @@
 Embedding Pipeline Script
 Loads and embeds all policy PDF documents into ChromaDB vector store
 Run this FIRST before running taxonomy filling
+
+Only new or changed PDFs are embedded on re-runs (vectors of removed PDFs are deleted);
+pass --rebuild to re-embed everything from scratch.
 """
 
 import sys
+import argparse
 from pathlib import Path
 
 # Add parent directory to path
@@ -15,12 +19,17 @@ from agents.rag_agent import RAGAgent
 
 def main():
     """Main execution function for embedding policies"""
+    parser = argparse.ArgumentParser(description="Embed policy PDFs into ChromaDB")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the vectorstore and re-embed every policy")
+    parser.add_argument("--yes", "-y", action="store_true", help="Do not ask for confirmation")
+    args = parser.parse_args()
+
     print("\n" + "="*70)
     print("POLICY EMBEDDING PIPELINE")
     print("="*70)
 
     print("\nThis script will:")
-    print("1. Load all PDF files from policies/ directory")
+    print("1. Load new or changed PDF files from policies/ directory")
     print("2. Extract text and chunk documents")
     print("3. Generate OpenAI embeddings")
     print("4. Store in ChromaDB vector database")
@@ -41,21 +50,15 @@ def main():
     print(f"  {agent.pipeline.chroma_db_path}")
     print("-"*70)
 
-    # Check if already exists
+    # A full rebuild re-pays for every embedding, so confirm it
     chroma_path = Path(agent.pipeline.chroma_db_path)
-    if chroma_path.exists():
-        print("\n⚠ ChromaDB already exists!")
-        choice = input("Do you want to rebuild? (y/n): ").strip().lower()
-        if choice != 'y':
-            print("\nCancelled. Using existing ChromaDB.")
-            return
-        force_rebuild = True
-    else:
-        choice = input("\nProceed with embedding? (y/n): ").strip().lower()
+    if args.rebuild and chroma_path.exists() and not args.yes:
+        print("\n⚠ ChromaDB already exists and will be rebuilt from scratch!")
+        choice = input("Proceed? (y/n): ").strip().lower()
         if choice != 'y':
             print("\nCancelled.")
             return
-        force_rebuild = False
+    force_rebuild = args.rebuild
 
     # Run embedding
     print("\n" + "="*70)
@@ -0,0 +1,288 @@
+"""
+Embedding Stage for the Policy Vector Store
+Batched, rate-limited, retrying embeddings with a persistent vector cache
+
+BatchedEmbeddings wraps an embedding backend (OpenAI, or a deterministic local model for
+offline builds and tests) behind the LangChain Embeddings interface:
+- texts are sent in batches of EMBED_BATCH_SIZE, at most EMBED_MAX_CONCURRENCY at a time
+- rate limits and transient API errors are retried with exponential backoff + jitter
+- every finished batch is written to an on-disk vector cache (EMBEDDING_CACHE_PATH), so a
+  build that fails halfway resumes without re-paying for the batches that succeeded
+
+Query embeddings (embed_query) go through an in-memory LRU of QUERY_EMBED_CACHE_SIZE
+entries keyed by normalized text, then the same on-disk cache (QUERY_EMBED_DISK_CACHE=0
+keeps queries out of it), so the templated taxonomy queries are embedded once across
+products, Ray actors and reruns.
+
+EMBEDDING_BACKEND selects the backend: "openai" (default) or "local".
+"""
+
+import os
+import re
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / "embedding_cache.sqlite3"
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+
+# Backoff: min(EMBED_BACKOFF_MAX, EMBED_BACKOFF_BASE * 2 ** attempt) seconds, plus jitter
+EMBED_BACKOFF_BASE = float(os.getenv("EMBED_BACKOFF_BASE", "1.0"))
+EMBED_BACKOFF_MAX = float(os.getenv("EMBED_BACKOFF_MAX", "60.0"))
+
+# Query embedding cache: in-memory LRU size, and whether queries also use the on-disk cache
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "1024"))
+QUERY_EMBED_DISK_CACHE = os.getenv("QUERY_EMBED_DISK_CACHE", "1") == "1"
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError", "Timeout"}
+
+
+def normalize_query(text: str) -> str:
+    """Query text as embedded and cached: surrounding and repeated whitespace removed."""
+    return " ".join(text.split())
+
+
+def _is_retryable(error: Exception) -> bool:
+    """True for rate limits and transient server/network errors."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in RETRYABLE_STATUS or type(error).__name__ in RETRYABLE_ERRORS
+
+
+class LocalHashEmbeddings(Embeddings):
+    """
+    Deterministic offline embeddings (feature hashing of word unigrams and bigrams).
+    No network, no model download: builds and tests run without an API key. Retrieval
+    quality is lexical, not semantic - use it for development, not production.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+        self.model_name = f"local-hash-{dimensions}"
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = [0.0] * self.dimensions
+        for feature in features:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class VectorCache:
+    """Persistent (model, text) -> vector store, shared by concurrent builds (SQLite, WAL)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Vectors for the keys that are cached."""
+        found = {}
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (key, vector) VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in items.items()]
+            )
+            self._conn.commit()
+
+
+class BatchedEmbeddings(Embeddings):
+    """LangChain Embeddings with batching, bounded concurrency, backoff and a vector cache."""
+
+    def __init__(
+        self,
+        backend: Embeddings,
+        model_name: str,
+        batch_size: int = None,
+        max_concurrency: int = None,
+        max_retries: int = None,
+        cache_path: Optional[Path] = DEFAULT_CACHE_PATH
+    ):
+        """
+        Args:
+            backend: Embeddings implementation that does the actual work
+            model_name: Identifier of the backend model (part of every cache key)
+            batch_size: Texts per backend request (default: EMBED_BATCH_SIZE)
+            max_concurrency: Concurrent backend requests (default: EMBED_MAX_CONCURRENCY)
+            max_retries: Retries per batch on retryable errors (default: EMBED_MAX_RETRIES)
+            cache_path: SQLite vector cache, None to disable
+        """
+        self.backend = backend
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size or EMBED_BATCH_SIZE)
+        self.max_concurrency = max(1, max_concurrency or EMBED_MAX_CONCURRENCY)
+        self.max_retries = EMBED_MAX_RETRIES if max_retries is None else max_retries
+        self.cache = VectorCache(cache_path) if cache_path else None
+        self.stats = {"texts": 0, "cached": 0, "requests": 0, "retries": 0, "query_hits": 0, "query_misses": 0}
+        self._stats_lock = threading.Lock()
+
+        # normalized query text -> vector, most recently used last
+        self._query_lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_lru_lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """One backend request, retried with exponential backoff on retryable errors."""
+        attempt = 0
+        while True:
+            try:
+                self._count("requests")
+                return self.backend.embed_documents(texts)
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = min(EMBED_BACKOFF_MAX, EMBED_BACKOFF_BASE * 2 ** attempt)
+                delay += random.uniform(0, delay / 2)
+                print(f"[WARNING] Embedding batch of {len(texts)} failed ({type(e).__name__}), "
+                      f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                self._count("retries")
+                time.sleep(delay)
+                attempt += 1
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, serving cached vectors and embedding the rest in concurrent batches.
+
+        Every batch that succeeds is cached immediately; if a batch still fails after its
+        retries, the remaining batches are finished and cached before the error is raised.
+        """
+        self._count("texts", len(texts))
+        keys = [VectorCache.key(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(list(set(keys))) if self.cache else {}
+        self._count("cached", sum(1 for key in keys if key in vectors))
+
+        # Unique uncached texts, in input order
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in pending:
+                pending[key] = text
+        pending_keys = list(pending)
+        batches = [pending_keys[i:i + self.batch_size] for i in range(0, len(pending_keys), self.batch_size)]
+
+        error = None
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+                futures = {
+                    pool.submit(self._embed_batch, [pending[key] for key in batch]): batch
+                    for batch in batches
+                }
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        embedded = dict(zip(batch, future.result()))
+                    except Exception as e:
+                        error = error or e
+                        continue
+                    vectors.update(embedded)
+                    if self.cache:
+                        self.cache.put_many(embedded)
+
+        if error is not None:
+            done = sum(1 for key in pending_keys if key in vectors)
+            print(f"[ERROR] Embedding failed after retries: {done}/{len(pending_keys)} new texts embedded and cached")
+            raise error
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query, served from the query LRU, then the vector cache, then the backend."""
+        text = normalize_query(text)
+        with self._query_lru_lock:
+            vector = self._query_lru.get(text)
+            if vector is not None:
+                self._query_lru.move_to_end(text)
+        if vector is not None:
+            self._count("query_hits")
+            return list(vector)
+        self._count("query_misses")
+
+        if QUERY_EMBED_DISK_CACHE:
+            vector = self.embed_documents([text])[0]
+        else:
+            vector = self._embed_batch([text])[0]
+
+        with self._query_lru_lock:
+            self._query_lru[text] = vector
+            self._query_lru.move_to_end(text)
+            while len(self._query_lru) > QUERY_EMBED_CACHE_SIZE:
+                self._query_lru.popitem(last=False)
+        return list(vector)
+
+
+def create_embeddings(model_name: str = "text-embedding-3-small", backend: str = None,
+                      cache_path: Optional[Path] = None) -> BatchedEmbeddings:
+    """
+    Build the embedding stage used by PolicyRAGPipeline.
+
+    Args:
+        model_name: OpenAI embedding model (ignored by the local backend)
+        backend: "openai" or "local" (default: EMBEDDING_BACKEND, else "openai")
+        cache_path: Vector cache file (default: EMBEDDING_CACHE_PATH or rag_agent/embedding_cache.sqlite3)
+
+    Returns:
+        BatchedEmbeddings instance
+    """
+    backend = (backend or os.getenv("EMBEDDING_BACKEND", "openai")).lower()
+    if cache_path is None:
+        cache_path = Path(os.getenv("EMBEDDING_CACHE_PATH", str(DEFAULT_CACHE_PATH)))
+
+    if backend == "local":
+        local = LocalHashEmbeddings()
+        return BatchedEmbeddings(local, local.model_name, cache_path=cache_path)
+
+    if backend != "openai":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+    from langchain_openai import OpenAIEmbeddings
+    openai_embeddings = OpenAIEmbeddings(
+        model=model_name,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        max_retries=0  # BatchedEmbeddings does the retrying
+    )
+    return BatchedEmbeddings(openai_embeddings, model_name, cache_path=cache_path)
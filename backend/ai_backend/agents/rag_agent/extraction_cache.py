@@ -0,0 +1,162 @@
+"""
+Extraction Cache for Taxonomy Filling
+Persists Gemini extraction results so re-runs only pay for prompts that changed.
+
+Entries are content-addressed: the key is a hash of the model, the prompt template
+version, the condition (name/type/benefit, not its filled products) and the ids of the
+retrieved chunks (a hash of filename, page and text). Re-running with overwrite, or after
+adding one condition to the taxonomy, hits the cache for every cell whose prompt would be
+byte-identical. Bump a *_PROMPT_VERSION in retrieval.py when a prompt template changes.
+
+The cache is a SQLite file shared by the Ray extraction actors (WAL mode), bounded by
+EXTRACTION_CACHE_MAX_MB (default 256); least recently used entries are evicted first.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / "extraction_cache.sqlite3"
+
+# Check the size bound after this many writes
+EVICTION_CHECK_EVERY = 50
+
+
+def chunk_id(chunk: Dict) -> str:
+    """Content id of a retrieved chunk (filename, page and text)."""
+    raw = f"{chunk.get('filename', '')}|{chunk.get('page', '')}|{chunk.get('content', '')}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def condition_identity(condition: Dict) -> List:
+    """The parts of a taxonomy condition that go into a prompt (never its filled products)."""
+    return [condition.get("benefit_name"), condition.get("condition"), condition.get("condition_type", "")]
+
+
+def make_key(model_name: str, template_version: str, conditions: Iterable[Dict],
+             chunk_ids: Iterable[str], extra: Iterable[Any] = ()) -> str:
+    """
+    Cache key for one extraction prompt.
+
+    Args:
+        model_name: Gemini model name
+        template_version: Version tag of the prompt template
+        conditions: Conditions covered by the prompt (one, or a batch)
+        chunk_ids: Ids of the retrieved chunks, in prompt order
+        extra: Anything else that is interpolated into the prompt (e.g. product name)
+
+    Returns:
+        Hex digest
+    """
+    payload = json.dumps([
+        model_name,
+        template_version,
+        [condition_identity(c) for c in conditions],
+        list(chunk_ids),
+        list(extra)
+    ], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """Size-bounded persistent key -> JSON result store with LRU eviction."""
+
+    def __init__(self, path: Path = None, max_bytes: int = None):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path: SQLite file (defaults to EXTRACTION_CACHE_PATH or rag_agent/extraction_cache.sqlite3)
+            max_bytes: Size bound for stored results (defaults to EXTRACTION_CACHE_MAX_MB)
+        """
+        if path is None:
+            path = Path(os.getenv("EXTRACTION_CACHE_PATH", str(DEFAULT_CACHE_PATH)))
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("EXTRACTION_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._writes_since_check = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS extractions_last_used ON extractions (last_used)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached result for key, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a result (JSON-serializable) and evict old entries if over the size bound."""
+        data = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now)
+            )
+            self._conn.commit()
+            self.stats["writes"] += 1
+            self._writes_since_check += 1
+            if self._writes_since_check >= EVICTION_CHECK_EVERY:
+                self._writes_since_check = 0
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache is under 90% of max_bytes. Caller holds the lock."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM extractions ORDER BY last_used").fetchall():
+            if total <= target:
+                break
+            self._conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+            total -= size
+            removed += 1
+        self._conn.commit()
+        self.stats["evictions"] += removed
+
+    def size_bytes(self) -> int:
+        """Total size of stored results."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM extractions")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
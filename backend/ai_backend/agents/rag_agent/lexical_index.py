@@ -0,0 +1,228 @@
+"""
+Lexical (BM25) Index over Policy Chunks
+Keyword retrieval alongside the Chroma vector store
+
+Embedding similarity is good at paraphrases but unreliable for exact policy terms
+("Period of Insurance", "Section 21", clause numbers like "6.2"). LexicalIndex keeps a
+BM25 index over the same chunks, maintained by PolicyRAGPipeline.sync_vectorstore()
+(same chunk ids, added and removed with the vectors) and persisted as gzipped JSON next
+to the ChromaDB store.
+
+In hybrid mode (mode="hybrid" per query, or RAG_RETRIEVAL_MODE=hybrid) PolicyRAGPipeline
+fuses the lexical and vector rankings with reciprocal rank fusion. When the lexical result
+is decisive - every top-k chunk contains all the query terms and scores clearly above the
+rest - the vector search, and so the query embedding call, is skipped.
+"""
+
+import os
+import re
+import gzip
+import json
+import math
+import hashlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+LEXICAL_INDEX_NAME = "lexical_index.json.gz"
+LEXICAL_INDEX_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Lexical top-k is decisive when its k-th score is at least this many times the next score
+LEXICAL_DECISIVE_GAP = float(os.getenv("LEXICAL_DECISIVE_GAP", "1.5"))
+
+# Reciprocal rank fusion constant (score = sum of 1 / (RRF_K + rank))
+RRF_K = 60
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "what", "which", "with"
+}
+
+# Words, plus dotted clause numbers ("6.2", "1.4.3") kept as one token
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms without stopwords; no stemming, so exact policy terms stay exact."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def doc_key(content: str, metadata: Dict) -> str:
+    """Identity of a chunk across the vector store and the lexical index."""
+    return hashlib.sha1(f"{metadata.get('filename', '')}\0{content}".encode("utf-8")).hexdigest()
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int) -> List[Document]:
+    """
+    Merge several best-first rankings into one.
+
+    Args:
+        rankings: Rankings of the same kind of chunks (e.g. lexical and vector results)
+        k: Number of results to return
+
+    Returns:
+        Top k documents by summed 1 / (RRF_K + rank); ties keep first-seen order
+    """
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, 1):
+            key = doc_key(document.page_content, document.metadata)
+            documents.setdefault(key, document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+    best = sorted(scores, key=lambda key: -scores[key])[:k]
+    return [documents[key] for key in best]
+
+
+class LexicalIndex:
+    """BM25 inverted index over policy chunks, keyed by the vector store's chunk ids."""
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: Persisted index file (loaded if it exists), None for in-memory only
+        """
+        self.path = Path(path) if path else None
+        self.chunks: Dict[str, Dict] = {}                  # id -> {"content", "metadata", "terms", "length"}
+        self.postings: Dict[str, Dict[str, int]] = {}      # term -> {id: term frequency}
+        self.total_length = 0
+        if self.path and self.path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def _index(self, chunk_id: str, chunk: Dict) -> None:
+        self.chunks[chunk_id] = chunk
+        self.total_length += chunk["length"]
+        for term, frequency in chunk["terms"].items():
+            self.postings.setdefault(term, {})[chunk_id] = frequency
+
+    def add(self, chunk_ids: List[str], documents: List[Document]) -> None:
+        """Index chunks (replacing any with the same id)."""
+        self.remove(chunk_ids)
+        for chunk_id, document in zip(chunk_ids, documents):
+            terms = Counter(tokenize(document.page_content))
+            self._index(chunk_id, {
+                "content": document.page_content,
+                "metadata": dict(document.metadata),
+                "terms": dict(terms),
+                "length": sum(terms.values())
+            })
+
+    def remove(self, chunk_ids: List[str]) -> int:
+        """Drop chunks by id; returns how many were indexed."""
+        removed = 0
+        for chunk_id in chunk_ids:
+            chunk = self.chunks.pop(chunk_id, None)
+            if chunk is None:
+                continue
+            removed += 1
+            self.total_length -= chunk["length"]
+            for term in chunk["terms"]:
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(chunk_id, None)
+                    if not docs:
+                        del self.postings[term]
+        return removed
+
+    def remove_file(self, filename: str) -> int:
+        """Drop every chunk of one policy file."""
+        return self.remove([cid for cid, chunk in self.chunks.items() if chunk["metadata"].get("filename") == filename])
+
+    def retain(self, chunk_ids) -> int:
+        """Drop every chunk whose id is not in chunk_ids."""
+        keep = set(chunk_ids)
+        return self.remove([cid for cid in self.chunks if cid not in keep])
+
+    def clear(self) -> None:
+        self.chunks, self.postings, self.total_length = {}, {}, 0
+
+    def search(self, query_text: str, k: int = 4, filenames: Optional[List[str]] = None) -> List[Dict]:
+        """
+        BM25 search.
+
+        Args:
+            query_text: The query string
+            k: Number of results to return
+            filenames: Only search chunks of these policy files
+
+        Returns:
+            Best first: {"id", "score", "matched" (share of query terms in the chunk)}
+        """
+        terms = list(dict.fromkeys(tokenize(query_text)))
+        if not terms or not self.chunks:
+            return []
+
+        allowed = set(filenames) if filenames else None
+        n_chunks = len(self.chunks)
+        avg_length = self.total_length / n_chunks or 1.0
+        scores: Dict[str, float] = {}
+        matched: Dict[str, int] = {}
+        for term in terms:
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_chunks - len(docs) + 0.5) / (len(docs) + 0.5))
+            for chunk_id, frequency in docs.items():
+                chunk = self.chunks[chunk_id]
+                if allowed is not None and chunk["metadata"].get("filename") not in allowed:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * chunk["length"] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                matched[chunk_id] = matched.get(chunk_id, 0) + 1
+
+        best = sorted(scores, key=lambda chunk_id: -scores[chunk_id])[:k]
+        return [
+            {"id": chunk_id, "score": scores[chunk_id], "matched": matched[chunk_id] / len(terms)}
+            for chunk_id in best
+        ]
+
+    @staticmethod
+    def is_decisive(hits: List[Dict], k: int) -> bool:
+        """
+        True if lexical hits settle the top k on their own: at least k hits, each
+        containing every query term, and the k-th clearly ahead of the next one.
+        (hits should come from search(..., k + 1) or more.)
+        """
+        if k <= 0 or len(hits) < k or any(hit["matched"] < 1.0 for hit in hits[:k]):
+            return False
+        next_score = hits[k]["score"] if len(hits) > k else 0.0
+        return hits[k - 1]["score"] >= LEXICAL_DECISIVE_GAP * next_score
+
+    def documents(self, hits: List[Dict]) -> List[Document]:
+        """Chunks for search hits, as LangChain Documents."""
+        return [
+            Document(page_content=self.chunks[hit["id"]]["content"], metadata=self.chunks[hit["id"]]["metadata"])
+            for hit in hits
+        ]
+
+    def load(self) -> None:
+        """Load the persisted index; an unreadable or outdated file leaves it empty."""
+        self.clear()
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not read lexical index {self.path}: {e}")
+            return
+        if data.get("version") != LEXICAL_INDEX_VERSION:
+            return
+        for chunk_id, chunk in data.get("chunks", {}).items():
+            self._index(chunk_id, chunk)
+
+    def save(self) -> None:
+        """Write the index atomically (temp file + rename)."""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"version": LEXICAL_INDEX_VERSION, "chunks": self.chunks}, f)
+        os.replace(tmp_path, self.path)
@@ -5,77 +5,211 @@ Uses RAG embeddings to iteratively fill conditions in Taxonomy_Hackathon.json
 
 import json
 import os
+import time
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from dotenv import load_dotenv
 import google.generativeai as genai
 import ray
 from .agent import RAGAgent
+from .extraction_cache import ExtractionCache, chunk_id, make_key
 
 load_dotenv()
 
 # Configure Gemini API
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-# Ray remote function for parallel processing
-@ray.remote
-def extract_condition_remote(chroma_db_path: str, policy_mapping: Dict,
-                             condition: Dict, product_name: str,
-                             policy_filename: str, model_name: str, verbose: bool) -> Dict:
+# Batched mode: chunks retrieved per condition, and cap on the merged context
+BATCH_CHUNKS_PER_CONDITION = 4
+BATCH_MAX_CONTEXT_CHUNKS = 32
+
+# Tasks queued on each extraction actor at a time. The rest wait in fill_layer's shared
+# queue and go to whichever actor finishes first, so one slow call holds up at most this
+# many tasks instead of everything assigned to its actor.
+TASKS_IN_FLIGHT_PER_WORKER = 2
+
+# Prompt template versions, part of the extraction cache key.
+# Bump the matching version whenever a prompt template below changes.
+DETAILED_PROMPT_VERSION = "detailed-v1"
+SIMPLE_PROMPT_VERSION = "simple-v1"
+BATCH_PROMPT_VERSION = "batch-v1"
+
+
+def _failed_condition(error: str) -> Dict:
+    """
+    Result for a cell whose extraction failed transiently (API error, malformed output).
+    condition_exist is None rather than False, so the cell is not treated as filled:
+    it is never written into the taxonomy and a resumed run retries it.
     """
-    Ray remote function to extract a single condition.
+    return {"condition_exist": None, "original_text": "", "parameters": {}, "error": error}
+
+
+def _not_found_condition() -> Dict:
+    """
+    Result for a cell whose policy has no chunks matching the condition.
+    A definitive answer (condition_exist False), so resumed runs do not query it again.
+    """
+    return {
+        "condition_exist": False,
+        "original_text": "No matching policy wording was retrieved for this condition.",
+        "parameters": {}
+    }
+
+
+def _normalize_condition_result(result: Any) -> Optional[Dict]:
+    """
+    Validate one extraction result against the condition schema.
+
+    Returns:
+        Result with condition_exist/original_text/parameters coerced to the right types,
+        or None if it is not a usable result
+    """
+    if not isinstance(result, dict) or "condition_exist" not in result:
+        return None
+    return {
+        "condition_exist": bool(result["condition_exist"]),
+        "original_text": str(result.get("original_text") or ""),
+        "parameters": result.get("parameters") if isinstance(result.get("parameters"), dict) else {}
+    }
+
+
+# Long-lived Ray actor for parallel extraction.
+# The vectorstore, embeddings client and Gemini model are created once per actor
+# and reused for every task sent to it (actor calls run one at a time, in order).
+# num_cpus=0: the work is LLM/network bound, so the pool size is not capped by CPU count.
+@ray.remote(num_cpus=0)
+class ConditionExtractionWorker:
+    """
+    Ray actor that extracts conditions for TaxonomyConditionFiller.fill_layer.
     Initializes its own RAG agent and Gemini model to avoid serialization issues.
     """
-    # Add parent directory to sys.path for imports
-    import sys
-    from pathlib import Path
-    parent_dir = str(Path(__file__).parent.parent.parent)
-    if parent_dir not in sys.path:
-        sys.path.insert(0, parent_dir)
-
-    # Re-initialize RAG agent in this worker
-    from agents.rag_agent.agent import RAGAgent
-    import google.generativeai as genai
-
-    rag_agent = RAGAgent(chroma_db_path=chroma_db_path, auto_load=True)
-
-    # Initialize Gemini model
-    model = genai.GenerativeModel(
-        model_name=model_name,
-        generation_config={
-            "temperature": 0,
-            "response_mime_type": "application/json"
+
+    def __init__(self, chroma_db_path: str, model_name: str, verbose: bool = False,
+                 cache_path: Optional[str] = None):
+        # Add parent directory to sys.path for imports
+        import sys
+        from pathlib import Path
+        parent_dir = str(Path(__file__).parent.parent.parent)
+        if parent_dir not in sys.path:
+            sys.path.insert(0, parent_dir)
+
+        from agents.rag_agent.agent import RAGAgent
+        from agents.rag_agent.extraction_cache import ExtractionCache
+        import google.generativeai as genai
+
+        self.verbose = verbose
+        self.model_name = model_name
+        # Shared with the other actors through the same SQLite file (None = caching disabled)
+        self.cache = ExtractionCache(Path(cache_path)) if cache_path else None
+        self.rag_agent = RAGAgent(chroma_db_path=chroma_db_path, auto_load=True)
+        self.model = genai.GenerativeModel(
+            model_name=model_name,
+            generation_config={
+                "temperature": 0,
+                "response_mime_type": "application/json"
+            }
+        )
+        self.tasks_completed = 0
+        self.llm_calls = 0
+        self.batch_splits = 0
+
+    def ready(self) -> bool:
+        """Returns once __init__ has finished (used to surface startup errors early)."""
+        return self.rag_agent.is_ready
+
+    def stats(self) -> Dict:
+        """Counters for this actor: conditions, Gemini calls, batch splits, extraction/query-embedding cache hits."""
+        cache_stats = self.cache.stats if self.cache else {}
+        embed_stats = self.rag_agent.pipeline.embeddings.stats
+        return {
+            "tasks_completed": self.tasks_completed,
+            "llm_calls": self.llm_calls,
+            "batch_splits": self.batch_splits,
+            "cache_hits": cache_stats.get("hits", 0),
+            "cache_misses": cache_stats.get("misses", 0),
+            "query_embed_hits": embed_stats["query_hits"],
+            "query_embed_misses": embed_stats["query_misses"]
         }
-    )
 
-    # Extract condition name
-    condition_name = condition.get("condition") or condition.get("benefit_name")
-    condition_type = condition.get("condition_type", "")
+    @staticmethod
+    def _query_for(condition: Dict) -> str:
+        """Search query for a condition (simplified semantic variation)."""
+        condition_name = condition.get("condition") or condition.get("benefit_name")
+        condition_type = condition.get("condition_type", "")
+        query_parts = [condition_name.replace("_", " ")]
+        if condition_type:
+            query_parts.append(condition_type)
+        return " ".join(query_parts)
+
+    def _generate_json(self, prompt: str) -> Any:
+        """Call Gemini in JSON mode and parse the response (raises on malformed JSON)."""
+        self.llm_calls += 1
+        response = self.model.generate_content(prompt)
+        return json.loads(response.text)
+
+    def extract(self, condition: Dict, product_name: str, policy_filename: str) -> Dict:
+        """
+        Extract a single condition for one product.
+
+        Args:
+            condition: Condition dictionary from taxonomy
+            product_name: Name of the product
+            policy_filename: Filename of the policy to search
+
+        Returns:
+            Dictionary with condition_exist, original_text, and parameters
+        """
+        # Retrieve context from RAG
+        context_results = self.rag_agent.search_in_policy(policy_filename, self._query_for(condition), k=8)
+        return self._extract_from_context(condition, product_name, context_results)
 
-    # Generate query (simplified semantic variation)
-    query_parts = [condition_name.replace("_", " ")]
-    if condition_type:
-        query_parts.append(condition_type)
-    query = " ".join(query_parts)
+    def extract_across(self, condition: Dict, policies: Dict[str, str]) -> Dict[str, Dict]:
+        """
+        Extract one condition for several products.
+        Context for all the policies comes from one search_across_policies call
+        (one query embedding, one store pass); each product still gets its own prompt.
 
-    # Retrieve context from RAG
-    context_results = rag_agent.search_in_policy(policy_filename, query, k=8)
+        Args:
+            condition: Condition dictionary from taxonomy
+            policies: Mapping of product name -> policy filename
 
-    if not context_results:
+        Returns:
+            Mapping of product name -> condition result
+        """
+        by_policy = self.rag_agent.search_across_policies(
+            self._query_for(condition), list(policies.values()), k_per_policy=8
+        )
         return {
-            "condition_exist": False,
-            "original_text": "",
-            "parameters": {}
+            product_name: self._extract_from_context(condition, product_name, by_policy.get(policy_filename, []))
+            for product_name, policy_filename in policies.items()
         }
 
-    # Format context
-    context = "\n\n---\n\n".join([
-        f"[Page {r['page']}]\n{r['content']}"
-        for r in context_results
-    ])
+    def _extract_from_context(self, condition: Dict, product_name: str, context_results: List[Dict]) -> Dict:
+        """Run the simplified extraction prompt over retrieved chunks (served from the cache if possible)."""
+        self.tasks_completed += 1
+
+        # Extract condition name
+        condition_name = condition.get("condition") or condition.get("benefit_name")
 
-    # Build extraction prompt (simplified version)
-    prompt = f"""You are an insurance policy extraction expert.
+        if not context_results:
+            return _not_found_condition()
+
+        cache_key = make_key(self.model_name, SIMPLE_PROMPT_VERSION, [condition],
+                             [chunk_id(r) for r in context_results])
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        # Format context
+        context = "\n\n---\n\n".join([
+            f"[Page {r['page']}]\n{r['content']}"
+            for r in context_results
+        ])
+
+        # Build extraction prompt (simplified version)
+        prompt = f"""You are an insurance policy extraction expert.
 
 TASK: Extract information about "{condition_name}" from the policy text below.
 
@@ -91,17 +225,130 @@ OUTPUT SCHEMA - Return valid JSON:
 
 Extract the information and return ONLY the JSON."""
 
-    # Call Gemini
-    try:
-        response = model.generate_content(prompt)
-        result = json.loads(response.text)
+        # Call Gemini
+        try:
+            result = _normalize_condition_result(self._generate_json(prompt))
+        except Exception as e:
+            if self.verbose:
+                print(f"    [DEBUG] Extraction failed for {condition_name} - {product_name}: {e}")
+            return _failed_condition(f"Extraction failed: {e}")
+
+        # Only well-formed answers are cached; failures stay unfilled and are retried on the next run
+        if result is None:
+            return _failed_condition("Malformed extraction result")
+        if self.cache:
+            self.cache.put(cache_key, result)
         return result
-    except Exception as e:
-        return {
-            "condition_exist": False,
-            "original_text": "",
-            "parameters": {}
-        }
+
+    def extract_batch(self, items: List[tuple], product_name: str, policy_filename: str) -> Dict[str, Dict]:
+        """
+        Extract several conditions of one policy with a single Gemini call.
+
+        The top chunks of every condition are retrieved and merged (duplicates removed),
+        and the model returns one JSON object keyed by condition label. If the output is
+        malformed or incomplete, the unanswered conditions are retried in smaller batches
+        (halving down to single-condition extract calls).
+
+        Args:
+            items: List of (label, condition) pairs; labels are unique within the batch
+            product_name: Name of the product
+            policy_filename: Filename of the policy to search
+
+        Returns:
+            Mapping of label -> condition result
+        """
+        if len(items) == 1:
+            label, condition = items[0]
+            return {label: self.extract(condition, product_name, policy_filename)}
+
+        # Union of every condition's top chunks, in retrieval order
+        chunks = []
+        seen = set()
+        for _label, condition in items:
+            for r in self.rag_agent.search_in_policy(policy_filename, self._query_for(condition),
+                                                     k=BATCH_CHUNKS_PER_CONDITION):
+                key = (r["page"], r["content"])
+                if key not in seen:
+                    seen.add(key)
+                    chunks.append(r)
+
+        if not chunks:
+            self.tasks_completed += len(items)
+            return {label: _not_found_condition() for label, _ in items}
+
+        chunks = chunks[:BATCH_MAX_CONTEXT_CHUNKS]
+        # Labels are part of the prompt, so they are part of the key
+        cache_key = make_key(self.model_name, BATCH_PROMPT_VERSION, [c for _, c in items],
+                             [chunk_id(r) for r in chunks], extra=[label for label, _ in items])
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.tasks_completed += len(items)
+                return cached
+
+        context = "\n\n---\n\n".join([
+            f"[Page {r['page']}]\n{r['content']}"
+            for r in chunks
+        ])
+        condition_list = "\n".join(
+            f'- "{label}": {(c.get("condition") or c.get("benefit_name")).replace("_", " ")}'
+            + (f" ({c['condition_type']})" if c.get("condition_type") else "")
+            for label, c in items
+        )
+
+        prompt = f"""You are an insurance policy extraction expert.
+
+TASK: For EACH condition listed below, extract its information from the policy text.
+
+CONDITIONS (key: description):
+{condition_list}
+
+POLICY CONTEXT:
+{context}
+
+OUTPUT SCHEMA - Return one valid JSON object with exactly one entry per condition key:
+{{
+    "<condition key>": {{
+        "condition_exist": boolean,
+        "original_text": string,
+        "parameters": object
+    }}
+}}
+
+Use condition_exist=false, original_text="" and parameters={{}} for conditions the context does not cover.
+Return ONLY the JSON."""
+
+        results = {}
+        try:
+            parsed = self._generate_json(prompt)
+            if not isinstance(parsed, dict):
+                raise ValueError("Response is not a JSON object")
+            for label, _condition in items:
+                normalized = _normalize_condition_result(parsed.get(label))
+                if normalized is not None:
+                    results[label] = normalized
+        except Exception as e:
+            if self.verbose:
+                print(f"    [DEBUG] Batch of {len(items)} failed for {product_name}: {e}")
+
+        self.tasks_completed += len(results)
+        missing = [(label, c) for label, c in items if label not in results]
+        if not missing:
+            # Only complete answers are cached; partial ones go through split-and-retry again
+            if self.cache:
+                self.cache.put(cache_key, results)
+            return results
+
+        # Split and retry: unanswered subset as one batch, or halves if nothing came back
+        self.batch_splits += 1
+        if len(missing) < len(items):
+            groups = [missing]
+        else:
+            middle = len(missing) // 2
+            groups = [missing[:middle], missing[middle:]]
+        for group in groups:
+            results.update(self.extract_batch(group, product_name, policy_filename))
+        return results
 
 
 class TaxonomyConditionFiller:
@@ -117,7 +364,11 @@ class TaxonomyConditionFiller:
         model_name: str = "gemini-2.5-flash",
         overwrite: bool = False,
         verbose: bool = False,
-        max_workers: int = 5
+        max_workers: int = 5,
+        resume: bool = True,
+        checkpoint_every: int = 25,
+        batch_size: int = 0,
+        use_cache: bool = True
     ):
         """
         Initialize the taxonomy condition filler.
@@ -126,14 +377,29 @@ class TaxonomyConditionFiller:
             taxonomy_path: Path to source Taxonomy_Hackathon.json
             output_path: Path to save filled taxonomy (defaults to rag_agent folder)
             model_name: Gemini model to use for extraction (default: gemini-2.5-flash)
-            overwrite: If False, skip layers that are already filled (default: False)
+            overwrite: If False, skip conditions that are already filled (default: False)
             verbose: If True, show detailed debug information (default: False)
-            max_workers: Max parallel workers for batch processing (default: 5)
+            max_workers: Number of extraction actors in the Ray pool (default: 5)
+            resume: If True, pick up filled conditions from an existing output file (default: True)
+            checkpoint_every: Write output_path after this many new results (default: 25)
+            batch_size: If > 1, extract up to this many conditions of the same policy per
+                        Gemini call (batched mode); 0 = one call per condition (default: 0)
+            use_cache: If True, reuse Gemini results for byte-identical prompts from the
+                       on-disk extraction cache (see extraction_cache.py) (default: True)
         """
         self.taxonomy_path = Path(taxonomy_path)
+        self.model_name = model_name
         self.overwrite = overwrite
         self.verbose = verbose
         self.max_workers = max_workers
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.batch_size = batch_size or 0
+
+        # Ray actor pool, created on first fill_layer and reused across layers
+        self._workers: List = []
+
+        # Persistent extraction cache, shared with the actors through its SQLite file
+        self.extraction_cache = ExtractionCache() if use_cache else None
 
         # Default output path in rag_agent folder
         if output_path is None:
@@ -155,6 +421,10 @@ class TaxonomyConditionFiller:
         # Load taxonomy
         self.taxonomy = self._load_taxonomy()
 
+        # Carry over work from a previous (possibly interrupted) run
+        if resume:
+            self._resume_from_checkpoint()
+
         # Map policy files to product names
         self.policy_mapping = self._create_policy_mapping()
 
@@ -163,6 +433,56 @@ class TaxonomyConditionFiller:
         with open(self.taxonomy_path, 'r') as f:
             return json.load(f)
 
+    @staticmethod
+    def _condition_key(condition: Dict) -> tuple:
+        """Stable identity of a condition across taxonomy files (layer 3 names repeat per benefit)."""
+        return (condition.get("benefit_name"), condition.get("condition"))
+
+    @staticmethod
+    def _is_cell_filled(product_info: Any) -> bool:
+        """
+        True if a (condition, product) cell holds an extraction result.
+        The source taxonomy uses the placeholder string "boolean" for condition_exist.
+        """
+        return isinstance(product_info, dict) and isinstance(product_info.get("condition_exist"), bool)
+
+    def _resume_from_checkpoint(self) -> int:
+        """
+        Copy filled cells from an existing output_path into the loaded taxonomy.
+        Cells are matched by layer, condition and product, so conditions added to the
+        source taxonomy since the checkpoint are simply left unfilled.
+
+        Returns:
+            Number of cells restored
+        """
+        if not self.output_path.exists():
+            return 0
+
+        try:
+            with open(self.output_path, 'r') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not read checkpoint {self.output_path}: {e}")
+            return 0
+
+        restored = 0
+        for layer_name, layer in self.taxonomy.get("layers", {}).items():
+            saved = {
+                self._condition_key(c): c.get("products", {})
+                for c in checkpoint.get("layers", {}).get(layer_name, [])
+            }
+            for condition in layer:
+                saved_products = saved.get(self._condition_key(condition), {})
+                products = condition.get("products", {})
+                for product_name in products:
+                    if self._is_cell_filled(saved_products.get(product_name)):
+                        products[product_name] = saved_products[product_name]
+                        restored += 1
+
+        if restored:
+            print(f"✓ Resumed {restored} filled cells from {self.output_path}")
+        return restored
+
     def _create_policy_mapping(self) -> Dict[str, str]:
         """
         Map product names to policy filenames.
@@ -239,20 +559,40 @@ class TaxonomyConditionFiller:
         condition_name: str,
         condition_type: str,
         policy_context: str,
-        product_name: str
+        product_name: str,
+        chunk_ids: List[str] = None
     ) -> Dict[str, Any]:
         """
         Use Gemini to extract structured condition information from policy context.
+        Results are served from the extraction cache when the same prompt was answered before.
 
         Args:
             condition_name: Name of the condition
             condition_type: Type of condition
             policy_context: Retrieved context from policy documents
             product_name: Name of the product/policy
+            chunk_ids: Ids of the chunks policy_context was built from (cache key);
+                       defaults to a hash of policy_context itself
 
         Returns:
             Dictionary with condition_exist, original_text, and parameters
         """
+        if chunk_ids is None:
+            chunk_ids = [chunk_id({"content": policy_context})]
+        cache_key = make_key(
+            self.model_name,
+            DETAILED_PROMPT_VERSION,
+            [{"condition": condition_name, "condition_type": condition_type}],
+            chunk_ids,
+            extra=[product_name]
+        )
+        if self.extraction_cache:
+            cached = self.extraction_cache.get(cache_key)
+            if cached is not None:
+                if self.verbose:
+                    print(f"    [DEBUG] Extraction cache hit")
+                return cached
+
         prompt = f"""You are an intelligent insurance policy analyzer with expertise in understanding insurance terminology and concepts.
 
 TASK: Analyze the policy to find information about "{condition_name.replace('_', ' ').title()}" (condition type: {condition_type})
@@ -413,23 +753,17 @@ Now analyze the policy context and extract information for the condition:"""
                 print(f"    [DEBUG] Parsed result: condition_exist={result['condition_exist']}, "
                       f"params={result['parameters']}")
 
+            if self.extraction_cache:
+                self.extraction_cache.put(cache_key, result)
             return result
 
         except json.JSONDecodeError as e:
             print(f"  ✗ JSON parsing error: {e}")
             print(f"  Response text: {response_text[:200]}...")
-            return {
-                "condition_exist": False,
-                "original_text": "",
-                "parameters": {}
-            }
+            return _failed_condition(f"JSON parsing error: {e}")
         except Exception as e:
             print(f"  ✗ Error extracting condition info: {e}")
-            return {
-                "condition_exist": False,
-                "original_text": "",
-                "parameters": {}
-            }
+            return _failed_condition(f"Extraction failed: {e}")
 
     def _fill_condition_for_product(
         self,
@@ -446,7 +780,7 @@ Now analyze the policy context and extract information for the condition:"""
             policy_filename: Filename of the policy to search
 
         Returns:
-            Updated product condition info
+            Updated product condition info (see _failed_condition if extraction failed)
         """
         # Handle both "condition" (layer 1) and "benefit_name" (layer 2) structures
         condition_name = condition.get("condition") or condition.get("benefit_name")
@@ -459,6 +793,7 @@ Now analyze the policy context and extract information for the condition:"""
             print(f"\n    [DEBUG] Query: {query}")
 
         # Retrieve relevant context from specific policy
+        chunk_ids = None
         try:
             results = self.rag_agent.search_in_policy(
                 policy_filename,
@@ -474,6 +809,7 @@ Now analyze the policy context and extract information for the condition:"""
                 f"[Page {r['page']}]\n{r['content']}"
                 for r in results
             ])
+            chunk_ids = [chunk_id(r) for r in results]
 
             if self.verbose:
                 context_preview = policy_context[:300] + "..." if len(policy_context) > 300 else policy_context
@@ -481,7 +817,7 @@ Now analyze the policy context and extract information for the condition:"""
 
         except Exception as e:
             print(f"  ✗ Error retrieving context: {e}")
-            policy_context = ""
+            return _failed_condition(f"Retrieval failed: {e}")
 
         # Extract condition information using Gemini
         if policy_context:
@@ -489,16 +825,13 @@ Now analyze the policy context and extract information for the condition:"""
                 condition_name,
                 condition_type,
                 policy_context,
-                product_name
+                product_name,
+                chunk_ids
             )
         else:
             if self.verbose:
                 print(f"    [DEBUG] No context retrieved - marking as not found")
-            condition_info = {
-                "condition_exist": False,
-                "original_text": "",
-                "parameters": {}
-            }
+            condition_info = _not_found_condition()
 
         return condition_info
 
@@ -506,8 +839,8 @@ Now analyze the policy context and extract information for the condition:"""
         """
         Check if a layer has already been filled with data.
 
-        A layer is considered filled if at least one product in at least one condition
-        has non-empty data (condition_exist is not None/False or has original_text).
+        A layer is considered filled if every (condition, product) cell holds an
+        extraction result.
 
         Args:
             layer_name: Name of the layer to check
@@ -520,25 +853,86 @@ Now analyze the policy context and extract information for the condition:"""
         if not layer:
             return False
 
-        # Check if any condition in the layer has filled data
-        for condition in layer:
-            products = condition.get("products", {})
-            for _product_name, product_info in products.items():
-                # Check if this product has meaningful data
-                if isinstance(product_info, dict):
-                    condition_exist = product_info.get("condition_exist")
-                    original_text = product_info.get("original_text", "")
+        return all(
+            self._is_cell_filled(product_info)
+            for condition in layer
+            for product_info in condition.get("products", {}).values()
+        )
 
-                    # If condition_exist is explicitly set or has original_text, consider it filled
-                    if condition_exist is not None or original_text:
-                        return True
+    def _get_workers(self) -> List:
+        """
+        Start the extraction actor pool (max_workers actors) if it is not running.
+        Each actor loads the vectorstore and Gemini model once.
 
-        return False
+        Returns:
+            List of ConditionExtractionWorker actor handles
+        """
+        if self._workers:
+            return self._workers
+
+        # Initialize Ray if not already initialized
+        if not ray.is_initialized():
+            ray.init(ignore_reinit_error=True)
+
+        chroma_db_path = str(self.rag_agent.pipeline.chroma_db_path)
+        cache_path = str(self.extraction_cache.path) if self.extraction_cache else None
+        pool_size = max(1, self.max_workers)
+
+        print(f"Starting {pool_size} extraction workers...")
+        started = time.perf_counter()
+        workers = [
+            ConditionExtractionWorker.remote(chroma_db_path, self.model_name, self.verbose, cache_path)
+            for _ in range(pool_size)
+        ]
+        # Wait for every actor to finish loading so startup errors surface here
+        ray.get([worker.ready.remote() for worker in workers])
+        print(f"✓ Workers ready in {time.perf_counter() - started:.1f}s")
+
+        self._workers = workers
+        return self._workers
+
+    def shutdown_workers(self) -> None:
+        """Stop the extraction actor pool."""
+        for worker in self._workers:
+            ray.kill(worker)
+        self._workers = []
+
+    @staticmethod
+    def _worker_totals(workers: List) -> Dict[str, int]:
+        """Sum of the actors' counters (llm_calls, cache_hits, ...)."""
+        totals: Dict[str, int] = {}
+        for stats in ray.get([worker.stats.remote() for worker in workers]):
+            for name, value in stats.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    @staticmethod
+    def _batch_labels(conditions: List[Dict]) -> List[str]:
+        """
+        Keys the model uses for the conditions of one batched call.
+
+        Built from the condition names only (benefit_name.condition), not their position
+        in the layer, so editing the taxonomy elsewhere keeps the extraction cache keys.
+        A name repeated within the batch gets a "#2", "#3", ... suffix.
+        """
+        labels = []
+        seen: Dict[str, int] = {}
+        for condition in conditions:
+            name = condition.get("condition") or condition.get("benefit_name")
+            if condition.get("benefit_name") and condition.get("condition"):
+                name = f"{condition['benefit_name']}.{condition['condition']}"
+            seen[name] = seen.get(name, 0) + 1
+            labels.append(name if seen[name] == 1 else f"{name}#{seen[name]}")
+        return labels
 
     def fill_layer(self, layer_name: str, force_overwrite: bool = None) -> None:
         """
         Fill all conditions in a specific layer using Ray for parallel batch processing.
 
+        Results are merged as they complete and checkpointed to output_path every
+        checkpoint_every results; unless overwriting, cells that are already filled
+        (e.g. restored from a checkpoint) are skipped.
+
         Args:
             layer_name: Name of the layer (e.g., "layer_1_general_conditions")
             force_overwrite: If provided, overrides the instance overwrite setting
@@ -560,75 +954,138 @@ Now analyze the policy context and extract information for the condition:"""
 
         layer = self.taxonomy["layers"].get(layer_name, [])
 
-        # Initialize Ray if not already initialized
-        if not ray.is_initialized():
-            ray.init(ignore_reinit_error=True)
-
-        # Prepare ALL tasks for batch processing
+        # Prepare tasks for batch processing, skipping cells filled by an earlier run
         all_tasks = []
+        already_filled = 0
         for i, condition in enumerate(layer):
             products = condition.get("products", {})
-            for product_name in products.keys():
+            for product_name, product_info in products.items():
+                if not should_overwrite and self._is_cell_filled(product_info):
+                    already_filled += 1
+                    continue
                 policy_filename = self.policy_mapping.get(product_name)
                 if policy_filename:
                     all_tasks.append((i, condition, product_name, policy_filename))
 
+        if already_filled:
+            print(f"Resuming: {already_filled} cells already filled, {len(all_tasks)} remaining")
+
         if not all_tasks:
             print("No tasks to process")
             return
 
-        print(f"\nBatch processing {len(all_tasks)} extractions using Ray")
-        print(f"Processing up to {self.max_workers} API calls simultaneously\n")
-
-        # Submit all tasks to Ray
-        futures = []
-        chroma_db_path = str(self.rag_agent.pipeline.chroma_db_path)
+        workers = self._get_workers()
+        stats_before = self._worker_totals(workers)
 
-        for i, condition, product_name, policy_filename in all_tasks:
-            future = extract_condition_remote.remote(
-                chroma_db_path,
-                self.policy_mapping,
-                condition,
-                product_name,
-                policy_filename,
-                self.model.model_name,
-                self.verbose
-            )
-            futures.append((i, condition, product_name, future))
-
-        # Collect results as they complete
-        results = {}
+        print(f"\nBatch processing {len(all_tasks)} extractions using Ray")
+        print(f"Processing up to {len(workers)} API calls simultaneously")
+
+        # Shared task queue: (actor method, args, cells it fills: [(condition index, condition, product, result key)])
+        jobs = deque()
+        if self.batch_size > 1:
+            # Batched mode: group conditions of the same policy, one Gemini call per group
+            by_product: Dict[str, List] = {}
+            for i, condition, product_name, policy_filename in all_tasks:
+                by_product.setdefault(product_name, []).append((i, condition, policy_filename))
+
+            batches = []
+            for product_name, tasks in by_product.items():
+                for start in range(0, len(tasks), self.batch_size):
+                    batches.append((product_name, tasks[start:start + self.batch_size]))
+            print(f"Batched mode: {len(batches)} calls of up to {self.batch_size} conditions\n")
+
+            for product_name, tasks in batches:
+                cells = []
+                items = []
+                labels = self._batch_labels([condition for _i, condition, _policy_filename in tasks])
+                for (i, condition, _policy_filename), label in zip(tasks, labels):
+                    cells.append((i, condition, product_name, label))
+                    items.append((label, condition))
+                jobs.append(("extract_batch", (items, product_name, tasks[0][2]), cells))
+        else:
+            print()
+            # One task per condition covering all its products: the policies are searched
+            # together (search_across_policies), then extracted product by product
+            by_condition: Dict[int, Dict[str, str]] = {}
+            for i, condition, product_name, policy_filename in all_tasks:
+                by_condition.setdefault(i, {})[product_name] = policy_filename
+
+            for i, policies in by_condition.items():
+                cells = [(i, layer[i], product_name, product_name) for product_name in policies]
+                jobs.append(("extract_across", (layer[i], policies), cells))
+
+        # Each future maps to the actor running it and the cells it fills
+        pending = {}
+
+        def submit(worker) -> None:
+            method, args, cells = jobs.popleft()
+            pending[getattr(worker, method).remote(*args)] = (worker, cells)
+
+        # Prime every actor, then hand the next queued task to whichever actor finishes
+        for _ in range(TASKS_IN_FLIGHT_PER_WORKER):
+            for worker in workers:
+                if jobs:
+                    submit(worker)
+
+        # Collect results in completion order, merging each into the taxonomy as it arrives
         completed = 0
+        failed = 0
+        since_checkpoint = 0
 
-        for i, condition, product_name, future in futures:
-            try:
-                filled_info = ray.get(future)
-
-                # Store result
-                if i not in results:
-                    results[i] = {}
-                results[i][product_name] = filled_info
-
-                completed += 1
-                condition_name = condition.get("condition") or condition.get("benefit_name")
-                exists = filled_info.get("condition_exist", False)
-                status = "✓" if exists else "✗"
-
-                print(f"[{completed}/{len(all_tasks)}] {status} {condition_name} - {product_name}")
-
-            except Exception as e:
-                print(f"  ✗ Error: {product_name} - {str(e)}")
-
-        # Update taxonomy with all results
-        print(f"\nUpdating taxonomy with {len(results)} conditions...")
-        for condition_idx, product_results in results.items():
-            condition = layer[condition_idx]
-            products = condition.get("products", {})
-            for product_name, filled_info in product_results.items():
-                products[product_name] = filled_info
+        try:
+            while pending:
+                done, _ = ray.wait(list(pending), num_returns=1)
+                for future in done:
+                    worker, cells = pending.pop(future)
+                    if jobs:
+                        submit(worker)
+
+                    try:
+                        result = ray.get(future)
+                    except Exception as e:
+                        for _i, condition, product_name, _label in cells:
+                            completed += 1
+                            failed += 1
+                            condition_name = condition.get("condition") or condition.get("benefit_name")
+                            print(f"[{completed}/{len(all_tasks)}] ✗ Error: {condition_name} - {product_name}: {e}")
+                        continue
+
+                    for i, condition, product_name, label in cells:
+                        completed += 1
+                        condition_name = condition.get("condition") or condition.get("benefit_name")
+                        filled_info = result.get(label) or _failed_condition("No result returned")
+
+                        # Failed cells keep their previous value, so resume retries them
+                        if not self._is_cell_filled(filled_info):
+                            failed += 1
+                            print(f"[{completed}/{len(all_tasks)}] ✗ Error: {condition_name} - {product_name}: "
+                                  f"{filled_info.get('error', 'unknown error')}")
+                            continue
+
+                        layer[i]["products"][product_name] = filled_info
+                        since_checkpoint += 1
+
+                        status = "✓" if filled_info.get("condition_exist", False) else "✗"
+                        print(f"[{completed}/{len(all_tasks)}] {status} {condition_name} - {product_name}")
+
+                if since_checkpoint >= self.checkpoint_every:
+                    self.save_taxonomy()
+                    since_checkpoint = 0
+                    if self.verbose:
+                        print(f"    [DEBUG] Checkpoint written to {self.output_path}")
+        finally:
+            # Always persist what finished, including on Ctrl-C or a worker crash
+            self.save_taxonomy()
 
-        # Save progress after layer completion
-        self.save_taxonomy()
+        stats_after = self._worker_totals(workers)
+        delta = {name: stats_after[name] - stats_before[name] for name in stats_after}
+        print(f"\n{len(all_tasks) - failed} cells filled with {delta['llm_calls']} Gemini calls")
+        if failed:
+            print(f"⚠ {failed} cells failed and were left unfilled; re-run to retry them")
+        if self.extraction_cache:
+            print(f"Extraction cache: {delta['cache_hits']} hits, {delta['cache_misses']} misses")
+        print(f"Query embeddings: {delta['query_embed_hits']} from memory, "
+              f"{delta['query_embed_misses']} embedded or loaded from disk")
         print(f"✓ Layer saved to {self.output_path}")
 
     def fill_all_layers(self) -> None:
@@ -648,6 +1105,8 @@ Now analyze the policy context and extract information for the condition:"""
             self.save_taxonomy()
             print(f"\n✓ Progress saved to {self.output_path}")
 
+        self.shutdown_workers()
+
         print("\n" + "="*70)
         print("✓ All Layers Completed!")
         print(f"✓ Filled taxonomy saved to: {self.output_path}")
@@ -668,6 +1127,7 @@ Now analyze the policy context and extract information for the condition:"""
         print(f"\nProcessing specific conditions in {layer_name}")
 
         layer = self.taxonomy["layers"].get(layer_name, [])
+        cache_before = dict(self.extraction_cache.stats) if self.extraction_cache else {}
 
         for condition in layer:
             # Handle both "condition" (layer 1) and "benefit_name" (layer 2) structures
@@ -687,15 +1147,30 @@ Now analyze the policy context and extract information for the condition:"""
                             product_name,
                             policy_filename
                         )
+                        if not self._is_cell_filled(filled_info):
+                            print(f"    ✗ Left unfilled: {filled_info.get('error', 'unknown error')}")
+                            continue
                         products[product_name] = filled_info
 
         self.save_taxonomy()
+        if self.extraction_cache:
+            hits = self.extraction_cache.stats["hits"] - cache_before["hits"]
+            misses = self.extraction_cache.stats["misses"] - cache_before["misses"]
+            print(f"Extraction cache: {hits} hits, {misses} misses")
         print(f"\n✓ Saved to {self.output_path}")
 
     def save_taxonomy(self) -> None:
-        """Save the filled taxonomy to output file."""
-        with open(self.output_path, 'w') as f:
+        """
+        Save the filled taxonomy to output file.
+        Written to a temp file and renamed, so an interrupted save never leaves a truncated checkpoint.
+        """
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.output_path.with_name(f".{self.output_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
             json.dump(self.taxonomy, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.output_path)
 
     def get_taxonomy(self) -> Dict:
         """Get the current taxonomy dictionary."""
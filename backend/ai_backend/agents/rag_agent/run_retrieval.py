@@ -48,6 +48,15 @@ def main():
     verbose_input = input("Enable verbose mode? (y/N): ").strip().lower()
     verbose = verbose_input == 'y'
 
+    # Step 2c: Ask about batched extraction
+    print("\n" + "-"*70)
+    print("Batched Mode:")
+    print("  • OFF (default): One Gemini call per condition and product")
+    print("  • ON: Group N conditions of the same policy into one call (far fewer calls)")
+    print("-"*70)
+    batch_input = input("Batch size (blank = off, e.g. 10): ").strip()
+    batch_size = int(batch_input) if batch_input.isdigit() else 0
+
     # Step 3: Initialize the taxonomy filler
     print("\nStep 3: Initializing Taxonomy Condition Filler...")
 
@@ -55,10 +64,12 @@ def main():
         filler = create_taxonomy_filler()
         filler.overwrite = overwrite
         filler.verbose = verbose
+        filler.batch_size = batch_size
         print(f"✓ Taxonomy loaded from: {filler.taxonomy_path}")
         print(f"✓ Output will be saved to: {filler.output_path}")
         print(f"✓ Overwrite mode: {'ON' if overwrite else 'OFF'}")
         print(f"✓ Verbose mode: {'ON' if verbose else 'OFF'}")
+        print(f"✓ Batched mode: {f'ON ({batch_size} conditions per call)' if batch_size > 1 else 'OFF'}")
 
     except Exception as e:
         print(f"✗ Error initializing filler: {e}")
@@ -82,7 +93,7 @@ def main():
         # Ask about overwrite for all layers
         print("\n" + "-"*70)
         print("Overwrite Mode:")
-        print("  • OFF (default): Skip layers that are already filled")
+        print("  • OFF (default): Skip conditions that are already filled (resumes an interrupted run)")
         print("  • ON: Re-process all layers, even if already filled")
         print("-"*70)
         overwrite_input = input("Enable overwrite mode for all layers? (y/N): ").strip().lower()
@@ -2,16 +2,140 @@
 RAG Tools for Policy Document Processing
 Handles document loading, chunking, embedding, and retrieval using LangChain, ChromaDB, and OpenAI
 Now uses unstructured.io for table-aware PDF parsing
+
+Embedding is incremental: a manifest next to the ChromaDB store records, per policy PDF,
+its content hash, the parsing/chunking config and the ids of its chunks. sync_vectorstore()
+only re-parses and re-embeds files whose hash or config changed, and deletes the vectors of
+changed or removed files.
+
+PDF partitioning is CPU-bound and independent per file, so it runs in a process pool
+(PDF_PARTITION_WORKERS). Large PDFs can also be split into page ranges of
+PDF_PAGES_PER_TASK pages (needs pypdf); elements are merged back in file/page order.
+
+Parsed elements are cached on disk as gzipped JSON, keyed by file hash and partition
+strategy (PDF_ELEMENT_CACHE_DIR), so changing chunking settings or table handling does
+not re-run partition_pdf.
+
+Embeddings go through embeddings.BatchedEmbeddings (batching, bounded concurrency, backoff,
+persistent vector cache); EMBEDDING_BACKEND=local swaps in a deterministic offline model.
+
+Retrieval is vector similarity by default (RAG_RETRIEVAL_MODE=vector|hybrid|lexical), which
+is what the taxonomy extraction pipeline was tuned on. Callers that want exact policy terms
+matched pass mode="hybrid": a BM25 index over the same chunks (lexical_index.py, kept in
+step with the vectors by sync_vectorstore) is fused with the vector ranking, and answers on
+its own, without embedding the query, when its match is decisive.
 """
 
 import os
+import gzip
+import json
+import time
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 from unstructured.partition.pdf import partition_pdf
+from .embeddings import create_embeddings
+from .lexical_index import LEXICAL_INDEX_NAME, LexicalIndex, reciprocal_rank_fusion
+
+MANIFEST_NAME = "embedding_manifest.json"
+
+# Processes used to partition PDFs (1 = parse in this process)
+PARTITION_WORKERS = int(os.getenv("PDF_PARTITION_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Split PDFs longer than this into page ranges of this size (0 = one task per file)
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "0"))
+
+# Parsed-element cache (gzipped JSON element records per file hash + partition strategy, "" = off)
+ELEMENT_CACHE_DIR = os.getenv("PDF_ELEMENT_CACHE_DIR", str(Path(__file__).parent / "element_cache"))
+
+# Bump when _element_record changes, so old cache files are ignored
+ELEMENT_RECORD_VERSION = 1
+
+# Default retrieval for calls without a mode: "vector", "hybrid" (BM25 + vectors,
+# reciprocal rank fusion) or "lexical"
+RETRIEVAL_MODES = ("vector", "hybrid", "lexical")
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "vector")
+
+# In hybrid mode each ranking fetches HYBRID_OVERFETCH * k candidates before fusion
+HYBRID_OVERFETCH = int(os.getenv("HYBRID_OVERFETCH", "2"))
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _element_record(element: Any, page_offset: int = 0) -> Dict:
+    """The fields of an unstructured element that the pipeline uses, as a plain dict."""
+    page_number = element.metadata.page_number
+    return {
+        "category": element.category,
+        "text": element.text,
+        "page": page_number + page_offset if page_number is not None else None,
+        "text_as_html": getattr(element.metadata, "text_as_html", None)
+    }
+
+
+def _pdf_page_count(pdf_path: Path) -> Optional[int]:
+    """Number of pages, or None if pypdf is not installed or the file cannot be read."""
+    try:
+        from pypdf import PdfReader
+        return len(PdfReader(str(pdf_path)).pages)
+    except Exception:
+        return None
+
+
+def _partition_task(
+    pdf_path: str,
+    strategy: str,
+    first_page: Optional[int] = None,
+    last_page: Optional[int] = None
+) -> Tuple[List[Dict], float]:
+    """
+    Partition a PDF (or pages first_page..last_page of it, 1-based inclusive).
+    Runs in a worker process, so it returns plain element records.
+
+    Returns:
+        (element records with page numbers of the original file, seconds spent)
+    """
+    started = time.perf_counter()
+    page_offset = 0
+    tmp_path = None
+    filename = pdf_path
+
+    if first_page is not None:
+        # Write the page range to a temporary PDF and partition that
+        from pypdf import PdfReader, PdfWriter
+        reader = PdfReader(pdf_path)
+        writer = PdfWriter()
+        for page_index in range(first_page - 1, last_page):
+            writer.add_page(reader.pages[page_index])
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            writer.write(tmp)
+            tmp_path = tmp.name
+        filename = tmp_path
+        page_offset = first_page - 1
+
+    try:
+        elements = partition_pdf(
+            filename=filename,
+            strategy=strategy,  # Fast extraction, still detects tables
+            infer_table_structure=True  # Preserve table layout
+        )
+    finally:
+        if tmp_path:
+            os.unlink(tmp_path)
+
+    return [_element_record(e, page_offset) for e in elements], time.perf_counter() - started
 
 
 class PolicyRAGPipeline:
@@ -27,7 +151,12 @@ class PolicyRAGPipeline:
         collection_name: str = "policy_documents",
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
-        embedding_model: str = "text-embedding-3-small"
+        embedding_model: str = "text-embedding-3-small",
+        partition_workers: int = None,
+        pages_per_task: int = None,
+        element_cache_dir: str = None,
+        embedding_backend: str = None,
+        retrieval_mode: str = None
     ):
         """
         Initialize the RAG pipeline.
@@ -39,23 +168,38 @@ class PolicyRAGPipeline:
             chunk_size: Size of text chunks for splitting
             chunk_overlap: Overlap between chunks
             embedding_model: OpenAI embedding model to use
+            embedding_backend: "openai" or "local" (default: EMBEDDING_BACKEND, else "openai")
+            partition_workers: Processes for PDF partitioning (default: PDF_PARTITION_WORKERS)
+            pages_per_task: Page range size for splitting large PDFs, 0 = whole files
+                            (default: PDF_PAGES_PER_TASK)
+            element_cache_dir: Directory for cached parsed elements, "" to disable
+                               (default: PDF_ELEMENT_CACHE_DIR)
+            retrieval_mode: Default for queries without a mode: "vector", "hybrid" or "lexical"
+                            (default: RAG_RETRIEVAL_MODE)
         """
         self.policies_dir = Path(policies_dir)
         self.chroma_db_path = chroma_db_path
         self.collection_name = collection_name
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-
-        # Initialize OpenAI embeddings
-        self.embeddings = OpenAIEmbeddings(
-            model=embedding_model,
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+        self.partition_strategy = "fast"
+        self.partition_workers = PARTITION_WORKERS if partition_workers is None else partition_workers
+        self.pages_per_task = PAGES_PER_TASK if pages_per_task is None else pages_per_task
+        if element_cache_dir is None:
+            element_cache_dir = ELEMENT_CACHE_DIR
+        self.element_cache_dir = Path(element_cache_dir) if element_cache_dir else None
+        self.manifest_path = Path(chroma_db_path) / MANIFEST_NAME
+
+        # Initialize embeddings (batched, retrying, cached; OpenAI unless EMBEDDING_BACKEND=local)
+        self.embeddings = create_embeddings(embedding_model, backend=embedding_backend)
+        self.embedding_model = self.embeddings.model_name
 
         # Initialize text splitter with larger chunks for better context
+        self.split_chunk_size = 2000  # Larger chunks to preserve context
+        self.split_chunk_overlap = 400  # More overlap to not lose connections
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=2000,  # Larger chunks to preserve context
-            chunk_overlap=400,  # More overlap to not lose connections
+            chunk_size=self.split_chunk_size,
+            chunk_overlap=self.split_chunk_overlap,
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
@@ -63,97 +207,219 @@ class PolicyRAGPipeline:
         # Initialize vector store (will be set during processing)
         self.vectorstore = None
 
+        # BM25 index over the same chunks, persisted next to the vector store
+        self.retrieval_mode = self._resolve_mode(retrieval_mode or RETRIEVAL_MODE)
+        self.lexical_index = LexicalIndex(Path(chroma_db_path) / LEXICAL_INDEX_NAME)
+        self.retrieval_stats = {"lexical_only": 0, "fused": 0, "vector_only": 0}
+
     def load_policy_documents(self) -> List[Document]:
         """
         Load all PDF policy documents from the policies directory using unstructured.io.
         This preserves table structure and provides better text extraction.
+        Files are partitioned in parallel (see partition_pdfs).
 
         Returns:
             List of LangChain Document objects with metadata
         """
         documents = []
-        pdf_files = list(self.policies_dir.glob("*.pdf"))
+        pdf_files = self.get_policy_files()
 
         if not pdf_files:
             raise ValueError(f"No PDF files found in {self.policies_dir}")
 
         print(f"Found {len(pdf_files)} policy documents to process:")
 
+        parsed = self.partition_pdfs(pdf_files)
         for pdf_path in pdf_files:
-            print(f"  - Loading: {pdf_path.name} (with table preservation)")
-
-            try:
-                # Use unstructured.io for better PDF parsing
-                # Using "fast" strategy - still detects tables but much faster than "hi_res"
-                elements = partition_pdf(
-                    filename=str(pdf_path),
-                    strategy="fast",  # Fast extraction, still detects tables
-                    infer_table_structure=True  # Preserve table layout
-                )
+            records = parsed[pdf_path.name]
+            if isinstance(records, Exception):
+                print(f"    Error loading {pdf_path.name}: {str(records)}")
+                continue
+            documents.extend(self._elements_to_documents(records, pdf_path))
 
-                # Combine small consecutive elements on same page to avoid tiny chunks
-                current_page = None
-                current_content = []
-                current_type = None
+        print(f"\nTotal documents loaded: {len(documents)}")
+        return documents
 
-                for element in elements:
-                    page_num = element.metadata.page_number
-
-                    # For tables, always keep separate (don't combine)
-                    if element.category == "Table":
-                        # First, save any accumulated content
-                        if current_content:
-                            doc = Document(
-                                page_content="\n\n".join(current_content),
-                                metadata={
-                                    "filename": pdf_path.name,
-                                    "source_path": str(pdf_path),
-                                    "page": current_page,
-                                    "type": current_type
-                                }
-                            )
-                            documents.append(doc)
-                            current_content = []
-
-                        # Add table as separate document
-                        content = element.metadata.text_as_html or element.text
-                        doc = Document(
-                            page_content=content,
-                            metadata={
-                                "filename": pdf_path.name,
-                                "source_path": str(pdf_path),
-                                "page": page_num,
-                                "type": "Table"
-                            }
-                        )
-                        documents.append(doc)
-                        current_page = None
-                        current_type = None
-
-                    else:
-                        # For text elements, combine consecutive ones on same page
-                        if page_num == current_page:
-                            current_content.append(element.text)
-                        else:
-                            # Page changed - save accumulated content
-                            if current_content:
-                                doc = Document(
-                                    page_content="\n\n".join(current_content),
-                                    metadata={
-                                        "filename": pdf_path.name,
-                                        "source_path": str(pdf_path),
-                                        "page": current_page,
-                                        "type": current_type or "Text"
-                                    }
-                                )
-                                documents.append(doc)
-
-                            # Start new page
-                            current_page = page_num
-                            current_content = [element.text]
-                            current_type = element.category
-
-                # Don't forget last accumulated content
+    def get_policy_files(self) -> List[Path]:
+        """Policy PDFs in the policies directory, sorted by name."""
+        return sorted(self.policies_dir.glob("*.pdf"))
+
+    def _partition_tasks(self, pdf_path: Path) -> List[Tuple[Optional[int], Optional[int]]]:
+        """Page ranges to partition a file in: [(None, None)] for the whole file."""
+        if self.pages_per_task <= 0:
+            return [(None, None)]
+        page_count = _pdf_page_count(pdf_path)
+        if not page_count or page_count <= self.pages_per_task:
+            return [(None, None)]
+        return [
+            (first, min(first + self.pages_per_task - 1, page_count))
+            for first in range(1, page_count + 1, self.pages_per_task)
+        ]
+
+    def _element_cache_path(self, sha256: str) -> Path:
+        """Cache file for a PDF's elements (file hash + partition settings)."""
+        key = hashlib.sha256(
+            f"{sha256}|{self.partition_strategy}|tables|v{ELEMENT_RECORD_VERSION}".encode("utf-8")
+        ).hexdigest()
+        return self.element_cache_dir / f"{key[:40]}.json.gz"
+
+    def _read_element_cache(self, sha256: str) -> Optional[List[Dict]]:
+        """Cached element records for a file hash, or None."""
+        cache_path = self._element_cache_path(sha256)
+        if not cache_path.exists():
+            return None
+        try:
+            with gzip.open(cache_path, "rt", encoding="utf-8") as f:
+                return json.load(f)["elements"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"    ⚠ Ignoring unreadable element cache {cache_path.name}: {e}")
+            return None
+
+    def _write_element_cache(self, sha256: str, filename: str, records: List[Dict]) -> None:
+        """Store element records (written to a temp file and renamed)."""
+        cache_path = self._element_cache_path(sha256)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({
+                "filename": filename,
+                "sha256": sha256,
+                "strategy": self.partition_strategy,
+                "elements": records
+            }, f, separators=(",", ":"))
+        os.replace(tmp_path, cache_path)
+
+    def partition_pdfs(self, pdf_files: List[Path]) -> Dict[str, Any]:
+        """
+        Partition PDFs in parallel with a process pool, printing per-file timing.
+        Files whose elements are in the element cache are not re-parsed.
+
+        Args:
+            pdf_files: PDFs to partition
+
+        Returns:
+            Mapping of filename -> element records in page order, or the Exception
+            that partitioning it raised
+        """
+        parsed = {}
+        hashes = {}
+        if self.element_cache_dir:
+            uncached = []
+            for pdf_path in pdf_files:
+                hashes[pdf_path.name] = file_sha256(pdf_path)
+                records = self._read_element_cache(hashes[pdf_path.name])
+                if records is None:
+                    uncached.append(pdf_path)
+                else:
+                    parsed[pdf_path.name] = records
+                    print(f"  - {pdf_path.name}: {len(records)} elements (element cache)")
+            pdf_files = uncached
+
+        if not pdf_files:
+            return parsed
+
+        tasks = [
+            (pdf_path, first, last)
+            for pdf_path in pdf_files
+            for first, last in self._partition_tasks(pdf_path)
+        ]
+        workers = max(1, min(self.partition_workers, len(tasks)))
+        print(f"Partitioning {len(pdf_files)} PDFs ({len(tasks)} tasks) with {workers} worker(s)...")
+        started = time.perf_counter()
+
+        # (filename, first page) -> (records, seconds), or the Exception raised
+        outcomes = {}
+        if workers == 1:
+            for pdf_path, first, last in tasks:
+                try:
+                    outcomes[(pdf_path.name, first or 0)] = _partition_task(
+                        str(pdf_path), self.partition_strategy, first, last)
+                except Exception as e:
+                    outcomes[(pdf_path.name, first or 0)] = e
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    (pdf_path.name, first or 0): pool.submit(
+                        _partition_task, str(pdf_path), self.partition_strategy, first, last)
+                    for pdf_path, first, last in tasks
+                }
+                for key, future in futures.items():
+                    try:
+                        outcomes[key] = future.result()
+                    except Exception as e:
+                        outcomes[key] = e
+
+        # Merge page ranges back per file, in page order
+        parse_seconds = 0.0
+        for pdf_path in pdf_files:
+            parts = sorted(
+                ((first, outcome) for (name, first), outcome in outcomes.items() if name == pdf_path.name),
+                key=lambda part: part[0]
+            )
+            errors = [outcome for _first, outcome in parts if isinstance(outcome, Exception)]
+            if errors:
+                parsed[pdf_path.name] = errors[0]
+                continue
+
+            records = [record for _first, (part_records, _seconds) in parts for record in part_records]
+            seconds = sum(part_seconds for _first, (_records, part_seconds) in parts)
+            parsed[pdf_path.name] = records
+            parse_seconds += seconds
+            if self.element_cache_dir:
+                self._write_element_cache(hashes[pdf_path.name], pdf_path.name, records)
+
+            table_count = len([r for r in records if r["category"] == "Table"])
+            ranges = f", {len(parts)} page ranges" if len(parts) > 1 else ""
+            print(f"  - {pdf_path.name}: {len(records)} elements, {table_count} tables "
+                  f"in {seconds:.1f}s{ranges}")
+
+        elapsed = time.perf_counter() - started
+        print(f"Partitioned in {elapsed:.1f}s wall ({parse_seconds:.1f}s of parsing, "
+              f"{parse_seconds / elapsed if elapsed else 0:.1f}x parallel speedup)")
+        return parsed
+
+    def _load_pdf(self, pdf_path: Path) -> List[Document]:
+        """
+        Parse one policy PDF into page-level Documents (tables kept separate, as HTML).
+
+        Args:
+            pdf_path: Path to the PDF
+
+        Returns:
+            List of Document objects for this file
+
+        Raises:
+            Exception: Whatever partition_pdf raises for an unreadable file
+        """
+        records = self.partition_pdfs([pdf_path])[pdf_path.name]
+        if isinstance(records, Exception):
+            raise records
+        return self._elements_to_documents(records, pdf_path)
+
+    @staticmethod
+    def _elements_to_documents(elements: List[Dict], pdf_path: Path) -> List[Document]:
+        """
+        Combine small consecutive elements on the same page into one Document,
+        keeping every table as its own Document.
+
+        Args:
+            elements: Element records from partition_pdfs
+            pdf_path: Path of the source PDF (for metadata)
+
+        Returns:
+            List of Document objects
+        """
+        documents = []
+        current_page = None
+        current_content = []
+        current_type = None
+
+        for element in elements:
+            page_num = element["page"]
+
+            # For tables, always keep separate (don't combine)
+            if element["category"] == "Table":
+                # First, save any accumulated content
                 if current_content:
                     doc = Document(
                         page_content="\n\n".join(current_content),
@@ -161,21 +427,63 @@ class PolicyRAGPipeline:
                             "filename": pdf_path.name,
                             "source_path": str(pdf_path),
                             "page": current_page,
-                            "type": current_type or "Text"
+                            "type": current_type
                         }
                     )
                     documents.append(doc)
+                    current_content = []
+
+                # Add table as separate document
+                content = element["text_as_html"] or element["text"]
+                doc = Document(
+                    page_content=content,
+                    metadata={
+                        "filename": pdf_path.name,
+                        "source_path": str(pdf_path),
+                        "page": page_num,
+                        "type": "Table"
+                    }
+                )
+                documents.append(doc)
+                current_page = None
+                current_type = None
 
-                print(f"    Loaded {len([e for e in elements])} elements from {pdf_path.name}")
-                table_count = len([e for e in elements if e.category == "Table"])
-                if table_count > 0:
-                    print(f"    Found {table_count} tables (preserved as HTML)")
+            else:
+                # For text elements, combine consecutive ones on same page
+                if page_num == current_page:
+                    current_content.append(element["text"])
+                else:
+                    # Page changed - save accumulated content
+                    if current_content:
+                        doc = Document(
+                            page_content="\n\n".join(current_content),
+                            metadata={
+                                "filename": pdf_path.name,
+                                "source_path": str(pdf_path),
+                                "page": current_page,
+                                "type": current_type or "Text"
+                            }
+                        )
+                        documents.append(doc)
 
-            except Exception as e:
-                print(f"    Error loading {pdf_path.name}: {str(e)}")
-                continue
+                    # Start new page
+                    current_page = page_num
+                    current_content = [element["text"]]
+                    current_type = element["category"]
+
+        # Don't forget last accumulated content
+        if current_content:
+            doc = Document(
+                page_content="\n\n".join(current_content),
+                metadata={
+                    "filename": pdf_path.name,
+                    "source_path": str(pdf_path),
+                    "page": current_page,
+                    "type": current_type or "Text"
+                }
+            )
+            documents.append(doc)
 
-        print(f"\nTotal documents loaded: {len(documents)}")
         return documents
 
     def chunk_documents(self, documents: List[Document]) -> List[Document]:
@@ -233,9 +541,182 @@ class PolicyRAGPipeline:
         print(f"Vector store created and persisted to {self.chroma_db_path}")
         return vectorstore
 
-    def build_pipeline(self) -> Chroma:
+    def chunking_config(self) -> Dict:
+        """
+        Everything that determines a file's chunks and vectors. A file is re-embedded
+        when this changes, even if its contents did not.
+        """
+        return {
+            "partition_strategy": self.partition_strategy,
+            "infer_table_structure": True,
+            "chunk_size": self.split_chunk_size,
+            "chunk_overlap": self.split_chunk_overlap,
+            "embedding_model": self.embedding_model,
+            "collection_name": self.collection_name
+        }
+
+    def _load_manifest(self) -> Dict:
+        """Read the embedding manifest ({"files": {filename: entry}})."""
+        if not self.manifest_path.exists():
+            return {"files": {}}
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not read manifest {self.manifest_path}: {e}")
+            return {"files": {}}
+        manifest.setdefault("files", {})
+        return manifest
+
+    def _save_manifest(self, manifest: Dict) -> None:
+        """Write the manifest atomically (temp file + rename)."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(f".{self.manifest_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _open_vectorstore(self) -> Chroma:
+        """Open the persisted collection, creating it if it does not exist."""
+        if self.vectorstore is None:
+            self.vectorstore = Chroma(
+                collection_name=self.collection_name,
+                embedding_function=self.embeddings,
+                persist_directory=self.chroma_db_path
+            )
+        return self.vectorstore
+
+    def _delete_file_vectors(self, filename: str, chunk_ids: List[str] = None) -> int:
+        """
+        Delete every vector of one policy file.
+
+        Args:
+            filename: Policy filename (the "filename" metadata field)
+            chunk_ids: Ids recorded in the manifest for this file
+
+        Returns:
+            Number of vectors deleted
+        """
+        ids = set(chunk_ids or [])
+        # Also catch vectors written before the manifest existed (random ids)
+        ids.update(self.vectorstore.get(where={"filename": filename}, include=[]).get("ids", []))
+        if ids:
+            self.vectorstore.delete(ids=sorted(ids))
+        self.lexical_index.remove_file(filename)
+        return len(ids)
+
+    def _backfill_lexical_index(self, chunk_ids: List[str]) -> int:
+        """Index chunks that are in the vector store but not the lexical index (no re-embedding)."""
+        stored = self.vectorstore.get(ids=chunk_ids, include=["documents", "metadatas"])
+        documents = [
+            Document(page_content=content, metadata=metadata or {})
+            for content, metadata in zip(stored.get("documents", []), stored.get("metadatas", []))
+        ]
+        self.lexical_index.add(stored.get("ids", []), documents)
+        return len(documents)
+
+    def sync_vectorstore(self) -> Dict[str, List[str]]:
         """
-        Execute the full RAG pipeline: load, chunk, and embed documents.
+        Bring the vector store in line with the policies directory, file by file.
+
+        New files are parsed and embedded; files whose content hash or chunking config
+        changed have their old vectors deleted and are re-embedded; files that were
+        removed have their vectors deleted. Unchanged files are not touched. The manifest
+        is saved after every file, so an interrupted sync resumes where it stopped.
+
+        Returns:
+            Filenames by outcome: {"added", "updated", "removed", "unchanged", "failed"}
+        """
+        self._open_vectorstore()
+        manifest = self._load_manifest()
+        files = manifest["files"]
+        config = self.chunking_config()
+        summary = {"added": [], "updated": [], "removed": [], "unchanged": [], "failed": []}
+
+        pdf_files = self.get_policy_files()
+        present = {pdf_path.name for pdf_path in pdf_files}
+
+        # Removed policies
+        for filename in sorted(set(files) - present):
+            deleted = self._delete_file_vectors(filename, files[filename].get("chunk_ids"))
+            del files[filename]
+            self._save_manifest(manifest)
+            summary["removed"].append(filename)
+            print(f"  - Removed: {filename} ({deleted} vectors deleted)")
+
+        # Find new/changed files first so they can be partitioned in one parallel pass
+        changed = []
+        for pdf_path in pdf_files:
+            sha256 = file_sha256(pdf_path)
+            entry = files.get(pdf_path.name)
+            if entry and entry.get("sha256") == sha256 and entry.get("config") == config:
+                summary["unchanged"].append(pdf_path.name)
+            else:
+                changed.append((pdf_path, sha256, entry))
+
+        parsed = self.partition_pdfs([pdf_path for pdf_path, _sha256, _entry in changed])
+
+        for pdf_path, sha256, entry in changed:
+            records = parsed[pdf_path.name]
+            if isinstance(records, Exception):
+                # Leave the old vectors and manifest entry in place; retried on the next sync
+                print(f"    Error loading {pdf_path.name}: {str(records)}")
+                summary["failed"].append(pdf_path.name)
+                continue
+
+            started = time.perf_counter()
+            chunks = self.chunk_documents(self._elements_to_documents(records, pdf_path))
+
+            # Embed before touching the store: finished batches land in the vector cache,
+            # and a failure leaves this file's old vectors in place (add_documents below
+            # is then served from the cache)
+            if self.embeddings.cache:
+                try:
+                    self.embeddings.embed_documents([chunk.page_content for chunk in chunks])
+                except Exception as e:
+                    print(f"    Error embedding {pdf_path.name}: {str(e)}")
+                    summary["failed"].append(pdf_path.name)
+                    continue
+
+            deleted = self._delete_file_vectors(pdf_path.name, entry.get("chunk_ids") if entry else None)
+
+            # Deterministic ids: <filename>:<content hash>:<chunk number>
+            chunk_ids = [f"{pdf_path.name}:{sha256[:16]}:{i:05d}" for i in range(len(chunks))]
+            if chunks:
+                self.vectorstore.add_documents(chunks, ids=chunk_ids)
+                self.lexical_index.add(chunk_ids, chunks)
+
+            files[pdf_path.name] = {
+                "sha256": sha256,
+                "config": config,
+                "chunk_ids": chunk_ids,
+                "embedded_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+            }
+            self._save_manifest(manifest)
+
+            summary["updated" if entry else "added"].append(pdf_path.name)
+            print(f"  ✓ {'Re-embedded' if entry else 'Embedded'} {pdf_path.name}: "
+                  f"{len(chunks)} chunks ({deleted} stale vectors deleted) "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+        # Lexical index: add chunks embedded before it existed (or before an interrupted
+        # sync saved it), drop anything the manifest no longer lists, then persist
+        indexed_ids = [cid for entry in files.values() for cid in entry.get("chunk_ids", [])]
+        missing = [cid for cid in indexed_ids if cid not in self.lexical_index.chunks]
+        if missing:
+            print(f"  Lexical index: backfilled {self._backfill_lexical_index(missing)} chunks from the vector store")
+        self.lexical_index.retain(indexed_ids)
+        self.lexical_index.save()
+
+        return summary
+
+    def build_pipeline(self, rebuild: bool = False) -> Chroma:
+        """
+        Execute the RAG pipeline: load, chunk, and embed documents.
+        Only new or changed policy files are processed (see sync_vectorstore).
+
+        Args:
+            rebuild: If True, drop the collection and manifest and re-embed every file
 
         Returns:
             ChromaDB vector store ready for retrieval
@@ -244,17 +725,28 @@ class PolicyRAGPipeline:
         print("Starting RAG Pipeline for Policy Documents")
         print("=" * 60)
 
-        # Step 1: Load policy documents
-        documents = self.load_policy_documents()
+        if not self.get_policy_files():
+            raise ValueError(f"No PDF files found in {self.policies_dir}")
 
-        # Step 2: Chunk documents
-        chunked_docs = self.chunk_documents(documents)
+        if rebuild:
+            print("Rebuilding: dropping existing collection and manifest")
+            self._open_vectorstore().delete_collection()
+            self.vectorstore = None
+            if self.manifest_path.exists():
+                self.manifest_path.unlink()
+            self.lexical_index.clear()
 
-        # Step 3: Create vector store and embed
-        self.vectorstore = self.create_vector_store(chunked_docs)
+        summary = self.sync_vectorstore()
 
         print("\n" + "=" * 60)
         print("RAG Pipeline Complete!")
+        print(f"  added: {len(summary['added'])}, updated: {len(summary['updated'])}, "
+              f"removed: {len(summary['removed'])}, unchanged: {len(summary['unchanged'])}, "
+              f"failed: {len(summary['failed'])}")
+        embed_stats = self.embeddings.stats
+        print(f"  embeddings: {embed_stats['texts']} texts, {embed_stats['cached']} from cache, "
+              f"{embed_stats['requests']} requests, {embed_stats['retries']} retries")
+        print(f"  lexical index: {len(self.lexical_index)} chunks")
         print("=" * 60)
 
         return self.vectorstore
@@ -276,13 +768,45 @@ class PolicyRAGPipeline:
         )
 
         print(f"Loaded existing vector store from {self.chroma_db_path}")
+        if not len(self.lexical_index):
+            print("⚠ No lexical index yet - hybrid queries use vector search only until build_pipeline() runs")
         return self.vectorstore
 
+    @staticmethod
+    def _resolve_mode(mode: str) -> str:
+        mode = mode.lower()
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        return mode
+
+    def _fused(self, k: int, lexical_hits: List[Dict], vector_docs, mode: str) -> List[Document]:
+        """
+        Final ranking for one query/filter from its lexical hits and (lazily) its vector results.
+
+        Args:
+            k: Number of results to return
+            lexical_hits: LexicalIndex.search results (at least k + 1 requested)
+            vector_docs: Callable returning the vector ranking (only called if needed)
+            mode: "hybrid" or "lexical"
+
+        Returns:
+            Top k documents
+        """
+        if mode == "lexical" or LexicalIndex.is_decisive(lexical_hits, k):
+            self.retrieval_stats["lexical_only"] += 1
+            return self.lexical_index.documents(lexical_hits[:k])
+        if not lexical_hits:
+            self.retrieval_stats["vector_only"] += 1
+            return vector_docs()[:k]
+        self.retrieval_stats["fused"] += 1
+        return reciprocal_rank_fusion([self.lexical_index.documents(lexical_hits), vector_docs()], k)
+
     def query(
         self,
         query_text: str,
         k: int = 4,
-        filter_by_filename: Optional[str] = None
+        filter_by_filename: Optional[str] = None,
+        mode: Optional[str] = None
     ) -> List[Dict]:
         """
         Query the vector store for relevant policy information.
@@ -291,6 +815,7 @@ class PolicyRAGPipeline:
             query_text: The query string
             k: Number of results to return
             filter_by_filename: Optional filename to filter results
+            mode: "vector", "hybrid" or "lexical" (default: the pipeline's retrieval_mode)
 
         Returns:
             List of relevant document chunks with metadata
@@ -303,15 +828,28 @@ class PolicyRAGPipeline:
         if filter_by_filename:
             where_filter = {"filename": filter_by_filename}
 
-        # Perform similarity search
-        if where_filter:
-            results = self.vectorstore.similarity_search(
-                query_text,
-                k=k,
-                filter=where_filter
-            )
+        def vector_search(fetch_k: int) -> List[Document]:
+            # Query embedding served from the query cache
+            embedding = self.embeddings.embed_query(query_text)
+            if where_filter:
+                return self.vectorstore.similarity_search_by_vector(
+                    embedding,
+                    k=fetch_k,
+                    filter=where_filter
+                )
+            return self.vectorstore.similarity_search_by_vector(embedding, k=fetch_k)
+
+        mode = self._resolve_mode(mode) if mode else self.retrieval_mode
+        if mode == "vector":
+            self.retrieval_stats["vector_only"] += 1
+            results = vector_search(k)
         else:
-            results = self.vectorstore.similarity_search(query_text, k=k)
+            fetch_k = k * max(1, HYBRID_OVERFETCH)
+            lexical_hits = self.lexical_index.search(
+                query_text, k=max(fetch_k, k + 1),
+                filenames=[filter_by_filename] if filter_by_filename else None
+            )
+            results = self._fused(k, lexical_hits, lambda: vector_search(fetch_k), mode)
 
         # Format results
         formatted_results = []
@@ -325,6 +863,107 @@ class PolicyRAGPipeline:
 
         return formatted_results
 
+    def query_across_policies(
+        self,
+        query_text: str,
+        filenames: List[str],
+        k_per_policy: int = 4,
+        overfetch: int = 3,
+        mode: Optional[str] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Top-k chunks per policy for one query, embedding the query once.
+
+        Runs a single similarity search over all the policies ({"filename": {"$in": ...}})
+        for overfetch * k_per_policy * len(filenames) results and truncates per filename.
+        A policy that ends up with fewer than k_per_policy chunks (the others crowded it
+        out) gets a filtered search of its own with the same query vector, so every
+        policy's results equal what query(filter_by_filename=...) returns.
+
+        In hybrid mode each policy also gets a BM25 search; policies whose lexical result
+        is decisive are left out of the vector search (none left: no query embedding).
+
+        Args:
+            query_text: The query string
+            filenames: Policy filenames to search
+            k_per_policy: Results per policy
+            overfetch: Multiplier for the shared search
+            mode: "vector", "hybrid" or "lexical" (default: the pipeline's retrieval_mode)
+
+        Returns:
+            Mapping of filename -> result chunks (same format as query), best first
+        """
+        if self.vectorstore is None:
+            raise ValueError("Vector store not initialized. Run build_pipeline() first.")
+
+        filenames = list(dict.fromkeys(filenames))
+        if not filenames:
+            return {}
+
+        mode = self._resolve_mode(mode) if mode else self.retrieval_mode
+        if mode == "vector":
+            self.retrieval_stats["vector_only"] += len(filenames)
+            grouped = self._vector_search_across(query_text, filenames, k_per_policy, overfetch)
+        else:
+            vector_k = k_per_policy * max(1, HYBRID_OVERFETCH)
+            lexical_hits = {
+                filename: self.lexical_index.search(query_text, k=max(vector_k, k_per_policy + 1), filenames=[filename])
+                for filename in filenames
+            }
+            undecided = [
+                filename for filename in filenames
+                if mode != "lexical" and not LexicalIndex.is_decisive(lexical_hits[filename], k_per_policy)
+            ]
+            vector_groups = self._vector_search_across(query_text, undecided, vector_k, overfetch) if undecided else {}
+            grouped = {
+                filename: self._fused(
+                    k_per_policy, lexical_hits[filename],
+                    lambda filename=filename: vector_groups.get(filename, []),
+                    mode
+                )
+                for filename in filenames
+            }
+
+        return {
+            filename: [
+                {
+                    "content": doc.page_content,
+                    "metadata": doc.metadata,
+                    "filename": doc.metadata.get("filename", "unknown"),
+                    "page": doc.metadata.get("page", "unknown")
+                }
+                for doc in group
+            ]
+            for filename, group in grouped.items()
+        }
+
+    def _vector_search_across(
+        self,
+        query_text: str,
+        filenames: List[str],
+        k_per_policy: int,
+        overfetch: int
+    ) -> Dict[str, List[Document]]:
+        """Vector part of query_across_policies: one shared search, per-policy top-up."""
+        embedding = self.embeddings.embed_query(query_text)
+        where_filter = {"filename": filenames[0]} if len(filenames) == 1 else {"filename": {"$in": filenames}}
+        fetch_k = k_per_policy * len(filenames) * max(1, overfetch)
+        docs = self.vectorstore.similarity_search_by_vector(embedding, k=fetch_k, filter=where_filter)
+        exhausted = len(docs) < fetch_k  # every matching chunk was returned
+
+        grouped: Dict[str, List[Document]] = {filename: [] for filename in filenames}
+        for doc in docs:
+            group = grouped.get(doc.metadata.get("filename"))
+            if group is not None and len(group) < k_per_policy:
+                group.append(doc)
+
+        for filename, group in grouped.items():
+            if len(group) < k_per_policy and not exhausted:
+                grouped[filename] = self.vectorstore.similarity_search_by_vector(
+                    embedding, k=k_per_policy, filter={"filename": filename}
+                )
+        return grouped
+
     def query_with_scores(
         self,
         query_text: str,
@@ -332,7 +971,7 @@ class PolicyRAGPipeline:
         filter_by_filename: Optional[str] = None
     ) -> List[tuple]:
         """
-        Query with similarity scores.
+        Query with similarity scores (vector search only, whatever the retrieval mode).
 
         Args:
             query_text: The query string
@@ -349,14 +988,16 @@ class PolicyRAGPipeline:
         if filter_by_filename:
             where_filter = {"filename": filter_by_filename}
 
+        # Same distances as similarity_search_with_score, with the cached query embedding
+        embedding = self.embeddings.embed_query(query_text)
         if where_filter:
-            results = self.vectorstore.similarity_search_with_score(
-                query_text,
+            results = self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+                embedding,
                 k=k,
                 filter=where_filter
             )
         else:
-            results = self.vectorstore.similarity_search_with_score(query_text, k=k)
+            results = self.vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k=k)
 
         return results
 
@@ -25,6 +25,15 @@ from google.genai import types
 # Import conversation agent
 from agents.Conversation_agent.agent import conversation_agent, APP_NAME
 
+# Request-scoped profile session (one load + one save per /chat turn)
+from profile_manager import begin_profile_session, end_profile_session, user_turn_lock, get_profile_io_stats
+
+# Bounded thread pools for blocking work (LLM, DB, HTTP, disk) + event-loop lag metric
+from executors import run_blocking, start_loop_lag_monitor, stop_loop_lag_monitor, shutdown_executors, get_executor_stats
+
+# Pooled claims DB connections + claim stats cache
+from db_helper import close_pool, get_db_stats
+
 load_dotenv()
 
 # Initialize FastAPI app
@@ -48,6 +57,20 @@ session_service = InMemorySessionService()
 user_runners: Dict[str, Runner] = {}
 
 
+@app.on_event("startup")
+async def start_monitors():
+    """Start sampling event-loop lag (reported by GET /metrics)"""
+    start_loop_lag_monitor()
+
+
+@app.on_event("shutdown")
+async def stop_monitors():
+    """Stop the lag monitor, release executor threads and close DB connections"""
+    stop_loop_lag_monitor()
+    shutdown_executors(wait=False)
+    close_pool()
+
+
 # ============================================================================
 # REQUEST/RESPONSE MODELS
 # ============================================================================
@@ -154,11 +177,22 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "chat": "POST /chat - Send message to agent",
-            "clear": "DELETE /session/{user_id}/{session_id} - Clear conversation"
+            "clear": "DELETE /session/{user_id}/{session_id} - Clear conversation",
+            "metrics": "GET /metrics - Executor, event-loop lag, profile I/O and claims DB stats"
         }
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Executor queue/run stats per category, event-loop lag, profile I/O and claims DB counters"""
+    return {
+        **get_executor_stats(),
+        "profile_io": get_profile_io_stats(),
+        "claims_db": get_db_stats()
+    }
+
+
 @app.post("/chat")
 async def chat(
     user_id: str = Form(...),
@@ -184,12 +218,29 @@ async def chat(
     Returns:
         ChatResponse with full messages array and session info
     """
+    # One turn at a time per user in this worker (double-submits, middleware re-runs);
+    # profile writes are additionally locked across workers by the profile store
+    async with user_turn_lock(user_id):
+        return await _run_chat_turn(user_id, message, session_id, file)
+
+
+async def _run_chat_turn(
+    user_id: str,
+    message: str,
+    session_id: Optional[str],
+    file: Optional[UploadFile]
+):
+    """Run one chat turn for a user. Caller holds the user's turn lock."""
+    profile_io = None
     try:
         session_id = session_id or f"session_{user_id}"
 
-        # Set user_id in environment for sub-agent tools to access
+        # Legacy fallback for scripts; request code reads the user from the profile session
         os.environ['CURRENT_USER_ID'] = user_id
 
+        # All tools in this turn share one in-memory profile, flushed once at the end
+        profile_io = begin_profile_session(user_id)
+
         # Get or create runner for this session
         runner = await get_or_create_runner(user_id, session_id)
 
@@ -206,7 +257,7 @@ async def chat(
                 print(f"[PRE-PROCESSING] Detected information in text message, auto-calling fill_information...")
                 from agents.Conversation_agent.tools import fill_information
 
-                fill_result = fill_information(user_id, message)
+                fill_result = await run_blocking("llm", fill_information, user_id, message)
                 print(f"[PRE-PROCESSING] fill_information result: {fill_result.get('extracted_fields', {})}")
         # ========================================================================
 
@@ -250,7 +301,7 @@ async def chat(
         print("[MIDDLEWARE] Checking profile completeness...")
         from profile_manager import load_profile
 
-        profile = load_profile(user_id)
+        profile = await run_blocking("disk", load_profile, user_id)
 
         # Check COMPLETE requirements for pricing + purchase APIs
         # Trip info (for pricing API)
@@ -339,6 +390,13 @@ async def chat(
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+    finally:
+        if profile_io is not None:
+            # Write the profile off the loop; closing the session resets the contextvar here
+            await run_blocking("disk", profile_io.flush)
+            stats = end_profile_session(profile_io)
+            print(f"[PROFILE IO] store_loads={stats['store_loads']} store_saves={stats['store_saves']} "
+                  f"(load_calls={stats['load_calls']}, save_calls={stats['save_calls']})")
 
 
 @app.delete("/session/{user_id}/{session_id}")
@@ -0,0 +1,213 @@
+"""
+Benchmark: claims lookup latency before and after the LOWER(destination) index
+
+Builds a synthetic copy of hackathon.claims (1M rows by default, generated
+server-side with generate_series) in a scratch schema, then times
+db_helper.CLAIM_STATS_SQL against it:
+1. without indexes (sequential scan + LOWER() on every row)
+2. after db_helper.ensure_claims_indexes() + VACUUM ANALYZE
+
+Connection settings come from the usual POSTGRES_* variables. Point them at a
+scratch database - the benchmark only touches its own schema, but loading a
+million rows is not something to do on the shared RDS instance.
+
+Usage:
+    python benchmark_claims_index.py
+    python benchmark_claims_index.py --rows 5000000 --runs 100 --keep
+"""
+
+import json
+import time
+import argparse
+import statistics
+from typing import Dict, List
+
+import psycopg2
+
+from db_helper import CLAIM_STATS_SQL, connection_params, ensure_claims_indexes
+
+# Weighted towards the front: power(random(), 2) makes early destinations far more common
+DESTINATIONS = [
+    "Japan", "Thailand", "Indonesia", "Malaysia", "South Korea", "China", "Vietnam",
+    "Australia", "Taiwan", "Philippines", "Hong Kong", "India", "United States",
+    "United Kingdom", "France", "Italy", "Germany", "Switzerland", "New Zealand",
+    "Cambodia", "Myanmar", "Sri Lanka", "Maldives", "Nepal", "Turkey", "Spain",
+    "Canada", "United Arab Emirates", "Egypt", "Iceland"
+]
+
+CLAIM_TYPES = ["Medical", "Baggage", "Trip Cancellation", "Travel Delay", "Personal Accident", "Theft"]
+
+CAUSES = [
+    "Illness", "Injury", "Lost Baggage", "Delayed Flight", "Cancelled Flight",
+    "Theft", "Natural Disaster", "Hospitalisation"
+]
+
+
+def create_synthetic_claims(conn, schema: str, rows: int) -> None:
+    """Create {schema}.claims and fill it with `rows` generated claims."""
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        cur.execute(f"CREATE SCHEMA {schema}")
+        cur.execute(f"""
+            CREATE TABLE {schema}.claims (
+                claim_id BIGINT PRIMARY KEY,
+                claim_date DATE,
+                destination TEXT,
+                claim_type TEXT,
+                cause_of_loss TEXT,
+                gross_incurred NUMERIC(12, 2),
+                policy_number TEXT
+            )
+        """)
+
+        started = time.perf_counter()
+        # Destinations arrive in mixed case, as in the real data, which is why lookups use LOWER()
+        cur.execute(f"""
+            INSERT INTO {schema}.claims
+            SELECT g,
+                   DATE '2020-01-01' + (random() * 1800)::int,
+                   CASE g % 3
+                       WHEN 0 THEN UPPER(d.name)
+                       WHEN 1 THEN LOWER(d.name)
+                       ELSE d.name
+                   END,
+                   (%(types)s::text[])[1 + floor(random() * %(type_count)s)::int],
+                   (%(causes)s::text[])[1 + floor(random() * %(cause_count)s)::int],
+                   round((random() * 5000)::numeric, 2),
+                   'POL-' || lpad(g::text, 9, '0')
+            FROM generate_series(1, %(rows)s) AS g
+            CROSS JOIN LATERAL (
+                SELECT (%(destinations)s::text[])[1 + floor(power(random(), 2) * %(dest_count)s)::int] AS name
+                WHERE g IS NOT NULL
+            ) AS d
+        """, {
+            "rows": rows,
+            "types": CLAIM_TYPES, "type_count": len(CLAIM_TYPES),
+            "causes": CAUSES, "cause_count": len(CAUSES),
+            "destinations": DESTINATIONS, "dest_count": len(DESTINATIONS)
+        })
+        print(f"Inserted {rows:,} rows in {time.perf_counter() - started:.1f}s")
+    conn.commit()
+
+    vacuum_analyze(conn, f"{schema}.claims")
+
+
+def vacuum_analyze(conn, table: str) -> None:
+    """
+    VACUUM ANALYZE (outside a transaction) so stats and the visibility map are current.
+
+    Commits any open transaction first: psycopg2 cannot switch to autocommit inside one.
+    """
+    conn.commit()
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"VACUUM ANALYZE {table}")
+    finally:
+        conn.autocommit = previous_autocommit
+
+
+def _plan_nodes(plan: Dict) -> List[str]:
+    """Flatten an EXPLAIN (FORMAT JSON) plan into 'Node Type [index]' strings."""
+    node = plan["Node Type"]
+    if plan.get("Index Name"):
+        node += f" [{plan['Index Name']}]"
+    nodes = [node]
+    for child in plan.get("Plans", []):
+        nodes.extend(_plan_nodes(child))
+    return nodes
+
+
+def time_lookups(conn, sql: str, destinations: List[str], runs: int) -> Dict:
+    """
+    Run the lookup `runs` times, cycling through destinations (different case each time).
+
+    Returns:
+        Latency summary in milliseconds plus the scan nodes of the plan
+    """
+    samples = []
+    with conn.cursor() as cur:
+        # Warm up shared buffers so both phases are measured hot
+        for destination in destinations[:3]:
+            cur.execute(sql, (destination,))
+            cur.fetchone()
+
+        for i in range(runs):
+            destination = destinations[i % len(destinations)]
+            destination = destination.upper() if i % 2 else destination.lower()
+            started = time.perf_counter()
+            cur.execute(sql, (destination,))
+            cur.fetchone()
+            samples.append((time.perf_counter() - started) * 1000)
+
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, (destinations[0],))
+        plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+    conn.rollback()
+
+    samples.sort()
+    return {
+        "runs": runs,
+        "mean_ms": statistics.mean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max_ms": samples[-1],
+        "plan": [n for n in _plan_nodes(plan[0]["Plan"]) if "Scan" in n]
+    }
+
+
+def print_result(label: str, result: Dict) -> None:
+    print(f"\n{label}")
+    print(f"  mean {result['mean_ms']:8.2f} ms   p50 {result['p50_ms']:8.2f} ms   "
+          f"p95 {result['p95_ms']:8.2f} ms   max {result['max_ms']:8.2f} ms   ({result['runs']} runs)")
+    print(f"  scans: {', '.join(result['plan'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark claims lookups with and without the destination index")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic claims to generate")
+    parser.add_argument("--runs", type=int, default=50, help="Timed lookups per phase")
+    parser.add_argument("--schema", default="claims_bench", help="Scratch schema (dropped and recreated)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema afterwards")
+    args = parser.parse_args()
+
+    table = f"{args.schema}.claims"
+    sql = CLAIM_STATS_SQL.replace("hackathon.claims", table)
+
+    # Popular, mid and rare destinations, so both large and small result sets are covered
+    sample = [DESTINATIONS[0], DESTINATIONS[5], DESTINATIONS[12], DESTINATIONS[-1]]
+
+    conn = psycopg2.connect(**connection_params())
+    try:
+        print("=" * 60)
+        print(f"Claims index benchmark: {args.rows:,} rows in {table}")
+        print("=" * 60)
+        create_synthetic_claims(conn, args.schema, args.rows)
+
+        before = time_lookups(conn, sql, sample, args.runs)
+        print_result("BEFORE (no index)", before)
+
+        started = time.perf_counter()
+        ensure_claims_indexes(conn, table=table, concurrently=False)
+        vacuum_analyze(conn, table)
+        print(f"\nIndex build + VACUUM ANALYZE: {time.perf_counter() - started:.1f}s")
+
+        after = time_lookups(conn, sql, sample, args.runs)
+        print_result("AFTER (LOWER(destination), claim_type, cause_of_loss) INCLUDE (gross_incurred)", after)
+
+        print(f"\nSpeedup: p50 {before['p50_ms'] / after['p50_ms']:.1f}x, "
+              f"p95 {before['p95_ms'] / after['p95_ms']:.1f}x")
+
+    finally:
+        if not args.keep:
+            conn.rollback()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: plan scoring with the PlanScorer matrices vs a per-product Python loop
+
+Generates a synthetic catalog (100 products x the real taxonomy's condition names by
+default, random coverage and limits) and 10k synthetic profiles with weighted needs,
+then ranks every profile three ways:
+1. Python loop: for each profile, for each product, sum over its needs (the old
+   select_best_plan approach, with the same scoring formula)
+2. PlanScorer.score per profile (one matrix-vector product each)
+3. PlanScorer.score_many over all profiles (one matrix-matrix product)
+
+and checks that all three pick the same best product for every profile.
+
+Needs NumPy only - no database, no API keys.
+
+Usage:
+    python benchmark_plan_scoring.py
+    python benchmark_plan_scoring.py --profiles 50000 --products 500 --seed 7
+"""
+
+import time
+import argparse
+from typing import Dict, List
+
+import numpy as np
+
+from plan_scoring import PLAN_LIMIT_WEIGHT, PlanScorer
+from taxonomy_index import get_taxonomy_index
+
+
+def synthetic_catalog(rng: np.random.Generator, n_products: int, names: List[str], density: float) -> PlanScorer:
+    """Random coverage (each condition present with probability `density`) and limits."""
+    coverage = (rng.random((n_products, len(names))) < density).astype(np.float64)
+    # Benefit limits between ~$1k and ~$1M; about a third of cells have no parsed limit
+    limits = np.round(np.exp(rng.uniform(np.log(1_000), np.log(1_000_000), coverage.shape)), -2)
+    limits[rng.random(coverage.shape) < 0.33] = 0.0
+    products = [f"Product {i:03d}" for i in range(n_products)]
+    return PlanScorer(products, names, coverage, limits)
+
+
+def synthetic_profiles(rng: np.random.Generator, n_profiles: int, names: List[str], mean_needs: int) -> List[Dict[str, float]]:
+    """Profiles as need -> weight (mostly 1.0, some needs weighted 2-3x)."""
+    profiles = []
+    for count in rng.poisson(mean_needs, n_profiles):
+        chosen = rng.choice(len(names), size=min(max(count, 1), len(names)), replace=False)
+        weights = rng.choice([1.0, 1.0, 1.0, 2.0, 3.0], size=len(chosen))
+        profiles.append({names[i]: float(w) for i, w in zip(chosen, weights)})
+    return profiles
+
+
+def rank_python(scorer: PlanScorer, profiles: List[Dict[str, float]]) -> np.ndarray:
+    """Best product per profile with dict/set lookups only (same formula as the matrices)."""
+    # Per product: need -> score contribution per unit of weight, covered needs only
+    best_limit = scorer.limits.max(axis=0, initial=0.0)
+    per_product = []
+    for row in range(len(scorer.products)):
+        contributions = {}
+        for col, name in enumerate(scorer.names):
+            if scorer.coverage[row, col]:
+                relative = scorer.limits[row, col] / best_limit[col] if best_limit[col] > 0 else 0.0
+                contributions[name] = 1.0 + PLAN_LIMIT_WEIGHT * relative
+        per_product.append(contributions)
+
+    best = np.empty(len(profiles), dtype=np.int64)
+    for p, weights in enumerate(profiles):
+        best_score, best_row = -1.0, 0
+        for row, contributions in enumerate(per_product):
+            score = 0.0
+            for need, weight in weights.items():
+                score += weight * contributions.get(need, 0.0)
+            if score > best_score:
+                best_score, best_row = score, row
+        best[p] = best_row
+    return best
+
+
+def timed(label: str, fn, n_profiles: int):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<36} {elapsed * 1000:10.1f} ms   {elapsed / n_profiles * 1e6:8.2f} us/profile")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized plan scoring")
+    parser.add_argument("--profiles", type=int, default=10_000, help="Synthetic profiles to rank")
+    parser.add_argument("--products", type=int, default=100, help="Synthetic products in the catalog")
+    parser.add_argument("--conditions", type=int, default=0,
+                        help="Conditions per product (default: the real taxonomy's names)")
+    parser.add_argument("--density", type=float, default=0.6, help="Probability a product covers a condition")
+    parser.add_argument("--mean-needs", type=int, default=15, help="Average needs per profile")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.conditions:
+        names = [f"condition_{i:04d}" for i in range(args.conditions)]
+    else:
+        names = get_taxonomy_index().names
+
+    scorer = synthetic_catalog(rng, args.products, names, args.density)
+    profiles = synthetic_profiles(rng, args.profiles, names, args.mean_needs)
+
+    print("=" * 60)
+    print(f"Plan scoring benchmark: {args.profiles:,} profiles x {args.products} products "
+          f"x {len(names)} conditions")
+    print("=" * 60)
+
+    vectors, _ = timed("Build needs vectors", lambda: np.stack([scorer.needs_vector(w) for w in profiles]),
+                       args.profiles)
+
+    loop_best, loop_time = timed("Python loop", lambda: rank_python(scorer, profiles), args.profiles)
+
+    def per_profile():
+        return np.array([int(np.argmax(scorer.score(v)[1])) for v in vectors])
+
+    single_best, single_time = timed("PlanScorer.score (per profile)", per_profile, args.profiles)
+
+    def batched():
+        return np.argmax(scorer.score_many(vectors)[1], axis=1)
+
+    batch_best, batch_time = timed("PlanScorer.score_many (one matmul)", batched, args.profiles)
+
+    mismatches = int(np.sum(loop_best != single_best) + np.sum(loop_best != batch_best))
+    print(f"\nSame best product for all profiles: {'✓' if mismatches == 0 else f'✗ ({mismatches} mismatches)'}")
+    print(f"Speedup vs Python loop: per profile {loop_time / single_time:.1f}x, "
+          f"batched {loop_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
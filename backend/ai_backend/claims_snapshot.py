@@ -0,0 +1,309 @@
+"""
+Claims Snapshot - precomputed claim statistics per destination
+
+Claim statistics change slowly, so instead of querying RDS on every chat they can
+be materialized for every destination at once into a compact JSON file:
+
+    {"built_at": "...", "source": "postgres", "row_count": 3,
+     "columns": ["claim_type", "cause_of_loss", "gross_incurred"],
+     "destinations": {"japan": ["Medical", "Illness", 1234.5], ...}}
+
+db_helper.get_claim_stats serves from this file when CLAIM_STATS_MODE=snapshot.
+A stale snapshot (older than CLAIMS_SNAPSHOT_MAX_AGE seconds) keeps being served
+while a background thread rebuilds it; if RDS is unreachable the old file stays.
+
+Build it with:
+    python claims_snapshot.py build                      # from PostgreSQL
+    python claims_snapshot.py build --sqlite claims.db   # from a local SQLite stand-in
+
+The SQLite stand-in is any database with a `claims` table (destination,
+claim_type, cause_of_loss, gross_incurred); it is attached as `hackathon` so the
+same SQL runs against `hackathon.claims` in both databases.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Where the snapshot lives and how old it may get before a background rebuild
+CLAIMS_SNAPSHOT_PATH = Path(os.getenv(
+    "CLAIMS_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "claims_snapshot.json")
+))
+CLAIMS_SNAPSHOT_MAX_AGE = int(os.getenv("CLAIMS_SNAPSHOT_MAX_AGE", str(24 * 3600)))
+
+SNAPSHOT_COLUMNS = ["claim_type", "cause_of_loss", "gross_incurred"]
+
+# Same ranking as db_helper.CLAIM_STATS_SQL, for every destination in one pass:
+# claim types ranked by total count, then the top cause within the winning type.
+MATERIALIZE_SQL = """
+    WITH grouped AS (
+        SELECT LOWER(destination) AS destination_key,
+               claim_type,
+               cause_of_loss,
+               COUNT(*) AS cause_count,
+               AVG(gross_incurred) AS avg_incurred
+        FROM hackathon.claims
+        WHERE destination IS NOT NULL
+        GROUP BY LOWER(destination), claim_type, cause_of_loss
+    ),
+    typed AS (
+        SELECT grouped.*,
+               SUM(cause_count) OVER (PARTITION BY destination_key, claim_type) AS type_count
+        FROM grouped
+    ),
+    ranked AS (
+        SELECT typed.*,
+               ROW_NUMBER() OVER (
+                   PARTITION BY destination_key
+                   ORDER BY type_count DESC, claim_type, cause_count DESC, cause_of_loss
+               ) AS stat_rank
+        FROM typed
+    )
+    SELECT destination_key, claim_type, cause_of_loss, avg_incurred
+    FROM ranked
+    WHERE stat_rank = 1
+    ORDER BY destination_key
+"""
+
+
+def connect_sqlite(db_path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite stand-in for the claims database.
+
+    The file is attached under the schema name `hackathon`, so queries written for
+    PostgreSQL's hackathon.claims run unchanged.
+    """
+    conn = sqlite3.connect(":memory:")
+    conn.execute("ATTACH DATABASE ? AS hackathon", (str(db_path),))
+    return conn
+
+
+def materialize(conn) -> Dict[str, List]:
+    """
+    Compute claim statistics for every destination.
+
+    Args:
+        conn: Open DB-API connection (psycopg2 or connect_sqlite)
+
+    Returns:
+        Mapping of lower-cased destination -> [claim_type, cause_of_loss, gross_incurred]
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(MATERIALIZE_SQL)
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    return {
+        destination: [claim_type, cause_of_loss or "Unknown", round(float(avg or 0.0), 2)]
+        for destination, claim_type, cause_of_loss, avg in rows
+    }
+
+
+def write_snapshot(destinations: Dict[str, List], path: Path = CLAIMS_SNAPSHOT_PATH, source: str = "postgres") -> Dict:
+    """Atomically write a snapshot file and return its contents."""
+    snapshot = {
+        "built_at": datetime.now().isoformat(),
+        "source": source,
+        "row_count": len(destinations),
+        "columns": SNAPSHOT_COLUMNS,
+        "destinations": destinations
+    }
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return snapshot
+
+
+def build_snapshot(path: Path = CLAIMS_SNAPSHOT_PATH, sqlite_path: Optional[str] = None) -> Dict:
+    """
+    Materialize claim statistics from PostgreSQL (or a SQLite stand-in) into the snapshot file.
+
+    Args:
+        path: Snapshot file to write
+        sqlite_path: If given, read hackathon.claims from this SQLite file instead of RDS
+
+    Returns:
+        The snapshot that was written
+    """
+    started = time.perf_counter()
+
+    if sqlite_path:
+        conn = connect_sqlite(sqlite_path)
+        try:
+            destinations = materialize(conn)
+        finally:
+            conn.close()
+        source = f"sqlite:{sqlite_path}"
+    else:
+        from db_helper import get_connection
+        with get_connection() as conn:
+            destinations = materialize(conn)
+        source = "postgres"
+
+    snapshot = write_snapshot(destinations, path, source)
+    print(f"[SNAPSHOT] Materialized {len(destinations)} destinations from {source} "
+          f"in {time.perf_counter() - started:.2f}s -> {path}")
+    return snapshot
+
+
+class ClaimsSnapshot:
+    """
+    Read side of the snapshot file.
+
+    Reloads when the file changes on disk and starts at most one background rebuild
+    when the snapshot is older than max_age.
+    """
+
+    def __init__(self, path: Path = CLAIMS_SNAPSHOT_PATH, max_age: int = CLAIMS_SNAPSHOT_MAX_AGE,
+                 sqlite_path: Optional[str] = None):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.sqlite_path = sqlite_path
+        self.destinations: Dict[str, List] = {}
+        self.built_at: Optional[datetime] = None
+        self._mtime_ns: Optional[int] = None
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.stats = {"hits": 0, "misses": 0, "reloads": 0, "refreshes": 0, "refresh_errors": 0}
+
+    def _reload_if_changed(self) -> bool:
+        """Load the file if it changed since the last read. Returns True if a snapshot is available."""
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return self._mtime_ns is not None
+
+        if mtime_ns != self._mtime_ns:
+            with self._lock:
+                if mtime_ns != self._mtime_ns:
+                    try:
+                        with open(self.path, "r") as f:
+                            snapshot = json.load(f)
+                        self.destinations = snapshot["destinations"]
+                        self.built_at = datetime.fromisoformat(snapshot["built_at"])
+                        self._mtime_ns = mtime_ns
+                        self.stats["reloads"] += 1
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"[SNAPSHOT] Could not read {self.path}: {e}")
+        return self._mtime_ns is not None
+
+    def age_seconds(self) -> Optional[float]:
+        """Seconds since the loaded snapshot was built, or None if none is loaded."""
+        if self.built_at is None:
+            return None
+        return (datetime.now() - self.built_at).total_seconds()
+
+    def is_available(self) -> bool:
+        """True if a snapshot file has been (or can be) loaded."""
+        return self._reload_if_changed()
+
+    def lookup(self, destination_key: str) -> Tuple[bool, Optional[Dict]]:
+        """
+        Look up one destination.
+
+        Args:
+            destination_key: Normalized (lower-cased) destination
+
+        Returns:
+            (available, stats): available is False when there is no snapshot at all,
+            so the caller can fall back to a live query; stats is None for destinations
+            without claims.
+        """
+        if not self._reload_if_changed():
+            self.refresh_in_background()
+            return False, None
+
+        age = self.age_seconds()
+        if age is not None and age > self.max_age:
+            self.refresh_in_background()
+
+        row = self.destinations.get(destination_key)
+        if row is None:
+            self.stats["misses"] += 1
+            return True, None
+
+        self.stats["hits"] += 1
+        return True, dict(zip(SNAPSHOT_COLUMNS, row))
+
+    def refresh_in_background(self) -> bool:
+        """Start a rebuild thread unless one is already running. Returns True if started."""
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            self._refresh_thread = threading.Thread(
+                target=self._refresh, name="claims-snapshot-refresh", daemon=True
+            )
+            self._refresh_thread.start()
+            return True
+
+    def _refresh(self) -> None:
+        """Rebuild the snapshot; on failure keep serving the old one."""
+        try:
+            build_snapshot(self.path, self.sqlite_path)
+            self.stats["refreshes"] += 1
+            self._reload_if_changed()
+        except Exception as e:
+            self.stats["refresh_errors"] += 1
+            print(f"[SNAPSHOT] Refresh failed, keeping existing snapshot: {e}")
+
+    def info(self) -> Dict:
+        """Snapshot metadata and counters, for the /metrics endpoint."""
+        age = self.age_seconds()
+        return {
+            "path": str(self.path),
+            "built_at": self.built_at.isoformat() if self.built_at else None,
+            "age_seconds": age,
+            "destinations": len(self.destinations),
+            "refreshing": self._refresh_thread is not None and self._refresh_thread.is_alive(),
+            **self.stats
+        }
+
+
+_snapshot: Optional[ClaimsSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot() -> ClaimsSnapshot:
+    """Process-wide snapshot reader (CLAIMS_SNAPSHOT_SQLITE selects a SQLite source for refreshes)."""
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = ClaimsSnapshot(sqlite_path=os.getenv("CLAIMS_SNAPSHOT_SQLITE") or None)
+    return _snapshot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Claims statistics snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Materialize stats for every destination")
+    build_parser.add_argument("--sqlite", help="Read hackathon.claims from this SQLite file instead of PostgreSQL")
+    build_parser.add_argument("--output", default=str(CLAIMS_SNAPSHOT_PATH), help="Snapshot file to write")
+
+    show_parser = subparsers.add_parser("show", help="Print snapshot metadata")
+    show_parser.add_argument("--output", default=str(CLAIMS_SNAPSHOT_PATH), help="Snapshot file to read")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_snapshot(Path(args.output), args.sqlite)
+    elif args.command == "show":
+        reader = ClaimsSnapshot(Path(args.output))
+        reader.is_available()
+        print(json.dumps(reader.info(), indent=2))
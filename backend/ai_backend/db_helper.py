@@ -1,12 +1,210 @@
 """
 Database Helper Functions
 Connects to PostgreSQL to fetch real historical claims data
+
+Connections come from a process-wide psycopg2 ThreadedConnectionPool
+(DB_POOL_MIN / DB_POOL_MAX), so each lookup reuses an open RDS connection
+instead of paying a fresh TCP/TLS handshake.
+
+Claim statistics are computed with a single windowed query and cached per
+normalized destination for DB_STATS_CACHE_TTL seconds (default 1 hour), so the
+analyze -> recommend flow hits the database at most once per destination.
+
+With CLAIM_STATS_MODE=snapshot, stats are served from the precomputed file built by
+claims_snapshot.py (refreshed in the background), falling back to a live query only
+when no snapshot exists yet.
+
+Lookups filter on LOWER(destination); `python db_helper.py migrate` creates the
+matching expression index so they are index-only scans instead of sequential
+scans (see benchmark_claims_index.py for before/after numbers).
 """
 
 import os
-import psycopg2
+import argparse
+import threading
+from contextlib import contextmanager
 from typing import Dict, Optional
 
+import psycopg2
+from psycopg2 import pool
+from cachetools import TTLCache
+
+from destinations import claims_key
+
+# live: query PostgreSQL (cached); snapshot: serve from claims_snapshot.json
+CLAIM_STATS_MODE = os.getenv('CLAIM_STATS_MODE', 'live')
+
+# Connection pool bounds (the db executor should not run more queries than this)
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '8'))
+
+_pool: Optional[pool.ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+
+# destination (normalized) -> stats dict, or None when the DB has no claims for it
+_stats_cache = TTLCache(
+    maxsize=int(os.getenv('DB_STATS_CACHE_SIZE', '512')),
+    ttl=int(os.getenv('DB_STATS_CACHE_TTL', '3600'))
+)
+_stats_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "queries": 0}
+
+# Top claim type, its top cause of loss, and the average amount for that pair - in one round trip.
+# type_count ranks claim types by their total count; cause_count breaks the tie within a type.
+CLAIM_STATS_SQL = """
+    WITH grouped AS (
+        SELECT claim_type,
+               cause_of_loss,
+               COUNT(*) AS cause_count,
+               AVG(gross_incurred) AS avg_incurred,
+               SUM(COUNT(*)) OVER (PARTITION BY claim_type) AS type_count
+        FROM hackathon.claims
+        WHERE LOWER(destination) = LOWER(%s)
+        GROUP BY claim_type, cause_of_loss
+    )
+    SELECT claim_type, cause_of_loss, avg_incurred
+    FROM grouped
+    ORDER BY type_count DESC, claim_type, cause_count DESC, cause_of_loss
+    LIMIT 1
+"""
+
+
+# Indexes for the claims lookups. The leading LOWER(destination) expression must match the
+# WHERE clause exactly; claim_type/cause_of_loss serve the GROUP BY and gross_incurred is
+# INCLUDEd so PostgreSQL (11+) can answer CLAIM_STATS_SQL from the index alone.
+CLAIMS_INDEXES = {
+    "claims_dest_type_cause_idx": (
+        "ON {table} (LOWER(destination), claim_type, cause_of_loss) INCLUDE (gross_incurred)"
+    )
+}
+
+
+def connection_params() -> Dict:
+    """psycopg2.connect keyword arguments from the POSTGRES_* environment variables."""
+    return {
+        "dbname": os.getenv('POSTGRES_DB', 'hackathon_db'),
+        "user": os.getenv('POSTGRES_USER', 'hackathon_user'),
+        "password": os.getenv('POSTGRES_PASSWORD', 'Hackathon2025!'),
+        "host": os.getenv('POSTGRES_HOST', 'hackathon-db.ceqjfmi6jhdd.ap-southeast-1.rds.amazonaws.com'),
+        "port": os.getenv('POSTGRES_PORT', '5432'),
+        "connect_timeout": int(os.getenv('POSTGRES_CONNECT_TIMEOUT', '10'))
+    }
+
+
+def _get_pool() -> pool.ThreadedConnectionPool:
+    """Create the connection pool on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, **connection_params())
+    return _pool
+
+
+@contextmanager
+def get_connection():
+    """
+    Borrow a pooled connection.
+
+    The transaction is rolled back when the block exits (these are read-only
+    lookups); connections that broke are discarded instead of returned to the pool.
+
+    Example:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+    """
+    db_pool = _get_pool()
+    conn = db_pool.getconn()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        if not broken and not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        db_pool.putconn(conn, close=broken or bool(conn.closed))
+
+
+async def get_claim_stats_async(destination: str) -> Optional[Dict]:
+    """Async variant of get_claim_stats; the query runs in the db executor."""
+    from executors import run_blocking
+    return await run_blocking("db", get_claim_stats, destination)
+
+
+def ensure_claims_indexes(conn=None, table: str = "hackathon.claims", concurrently: bool = True) -> Dict[str, bool]:
+    """
+    Create the claims lookup indexes if they are missing, then ANALYZE the table.
+
+    CREATE INDEX CONCURRENTLY cannot run inside a transaction, so this uses an
+    autocommit connection of its own (or the one passed in, switched to autocommit).
+
+    Args:
+        conn: Optional psycopg2 connection to use
+        table: Schema-qualified claims table
+        concurrently: Build without blocking writes (slower; off for scratch tables)
+
+    Returns:
+        Mapping of index name -> True if it was created, False if it already existed
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = psycopg2.connect(**connection_params())
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+
+    schema, _, table_name = table.rpartition(".")
+    created = {}
+    try:
+        with conn.cursor() as cur:
+            for name, definition in CLAIMS_INDEXES.items():
+                cur.execute(
+                    "SELECT 1 FROM pg_indexes WHERE schemaname = %s AND tablename = %s AND indexname = %s",
+                    (schema or "public", table_name, name)
+                )
+                if cur.fetchone():
+                    created[name] = False
+                    continue
+
+                print(f"[MIGRATE] Creating index {name} on {table}...")
+                cur.execute(
+                    f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+                    + definition.format(table=table)
+                )
+                created[name] = True
+
+            # Fresh statistics so the planner picks the new index right away
+            cur.execute(f"ANALYZE {table}")
+    finally:
+        conn.autocommit = previous_autocommit
+        if own_conn:
+            conn.close()
+
+    return created
+
+
+def close_pool() -> None:
+    """Close every pooled connection (e.g. on app shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def _normalize_destination(destination: str) -> str:
+    """
+    Cache/query key for a destination: the canonical country name, lower-cased to match
+    the SQL LOWER() filter - so "JP", "Japan" and "Tokyo" share one cache entry and DB result.
+    """
+    return claims_key(destination)
+
+
 def get_claim_stats(destination: str) -> Optional[Dict]:
     """
     Fetch real historical claim statistics from PostgreSQL database
@@ -17,7 +215,7 @@ def get_claim_stats(destination: str) -> Optional[Dict]:
     3. Average gross incurred amount for those claims
 
     Args:
-        destination: Country name (e.g., "Indonesia", "Thailand")
+        destination: Country name, ISO code or city (e.g., "Indonesia", "TH", "Tokyo")
 
     Returns:
         Dictionary with claim statistics or None if query fails
@@ -28,73 +226,96 @@ def get_claim_stats(destination: str) -> Optional[Dict]:
             'gross_incurred': float
         }
     """
-    try:
-        # Connect to PostgreSQL
-        conn = psycopg2.connect(
-            dbname=os.getenv('POSTGRES_DB', 'hackathon_db'),
-            user=os.getenv('POSTGRES_USER', 'hackathon_user'),
-            password=os.getenv('POSTGRES_PASSWORD', 'Hackathon2025!'),
-            host=os.getenv('POSTGRES_HOST', 'hackathon-db.ceqjfmi6jhdd.ap-southeast-1.rds.amazonaws.com'),
-            port=os.getenv('POSTGRES_PORT', '5432')
-        )
-        cur = conn.cursor()
-
-        # Step 1: Find most common claim type for this destination
-        cur.execute("""
-            SELECT claim_type, COUNT(*) as count
-            FROM hackathon.claims
-            WHERE LOWER(destination) = LOWER(%s)
-            GROUP BY claim_type
-            ORDER BY count DESC
-            LIMIT 1
-        """, (destination,))
-
-        row = cur.fetchone()
-        if not row:
-            print(f"[WARNING] No claims data found for destination: {destination}")
-            cur.close()
-            conn.close()
-            return None
-
-        claim_type = row[0]
-        print(f"[DEBUG] Most common claim type for {destination}: {claim_type}")
-
-        # Step 2: Find most common cause of loss for this claim type
-        cur.execute("""
-            SELECT cause_of_loss, COUNT(*) as count
-            FROM hackathon.claims
-            WHERE LOWER(destination) = LOWER(%s) AND claim_type = %s
-            GROUP BY cause_of_loss
-            ORDER BY count DESC
-            LIMIT 1
-        """, (destination, claim_type))
-
-        row = cur.fetchone()
-        cause_of_loss = row[0] if row else "Unknown"
-        print(f"[DEBUG] Most common cause: {cause_of_loss}")
-
-        # Step 3: Calculate average claim amount
-        cur.execute("""
-            SELECT AVG(gross_incurred)
-            FROM hackathon.claims
-            WHERE LOWER(destination) = LOWER(%s) AND claim_type = %s AND cause_of_loss = %s
-        """, (destination, claim_type, cause_of_loss))
-
-        avg_amount = cur.fetchone()[0] or 0.0
-
-        cur.close()
-        conn.close()
-
-        result = {
-            'destination': destination,
-            'claim_type': claim_type,
-            'cause_of_loss': cause_of_loss,
-            'gross_incurred': float(avg_amount)
-        }
+    key = _normalize_destination(destination)
 
-        print(f"[DEBUG] DB Stats: {result}")
-        return result
+    if CLAIM_STATS_MODE == 'snapshot':
+        from claims_snapshot import get_snapshot
+        available, stats = get_snapshot().lookup(key)
+        if available:
+            if stats is None:
+                print(f"[WARNING] No claims data found for destination: {destination} (snapshot)")
+                return None
+            return {'destination': destination, **stats}
+        print("[WARNING] No claims snapshot available yet, querying database")
+
+    with _stats_cache_lock:
+        if key in _stats_cache:
+            _cache_stats["hits"] += 1
+            cached = _stats_cache[key]
+            if cached is None:
+                print(f"[WARNING] No claims data found for destination: {destination} (cached)")
+                return None
+            return {**cached, 'destination': destination}
+        _cache_stats["misses"] += 1
+
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                _cache_stats["queries"] += 1
+                cur.execute(CLAIM_STATS_SQL, (key,))
+                row = cur.fetchone()
 
     except Exception as e:
+        # Errors are not cached - the next call retries
         print(f"[ERROR] Database query failed: {e}")
         return None
+
+    if not row:
+        print(f"[WARNING] No claims data found for destination: {destination}")
+        with _stats_cache_lock:
+            _stats_cache[key] = None
+        return None
+
+    claim_type, cause_of_loss, avg_amount = row
+    result = {
+        'destination': destination,
+        'claim_type': claim_type,
+        'cause_of_loss': cause_of_loss or "Unknown",
+        'gross_incurred': float(avg_amount or 0.0)
+    }
+    print(f"[DEBUG] DB Stats: {result}")
+
+    with _stats_cache_lock:
+        _stats_cache[key] = dict(result)
+    return result
+
+
+def clear_claim_stats_cache() -> None:
+    """Drop all cached claim statistics."""
+    with _stats_cache_lock:
+        _stats_cache.clear()
+
+
+def get_db_stats() -> Dict:
+    """Cache hit/miss counters, pool configuration and snapshot state, for the /metrics endpoint."""
+    with _stats_cache_lock:
+        stats = {
+            "mode": CLAIM_STATS_MODE,
+            **_cache_stats,
+            "cached_destinations": len(_stats_cache),
+            "pool": {"min": DB_POOL_MIN, "max": DB_POOL_MAX, "open": _pool is not None}
+        }
+    if CLAIM_STATS_MODE == 'snapshot':
+        from claims_snapshot import get_snapshot
+        stats["snapshot"] = get_snapshot().info()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Claims database maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Create the claims lookup indexes")
+    migrate_parser.add_argument("--table", default="hackathon.claims")
+
+    stats_parser = subparsers.add_parser("stats", help="Look up claim stats for a destination")
+    stats_parser.add_argument("destination")
+
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        result = ensure_claims_indexes(table=args.table)
+        for name, was_created in result.items():
+            print(f"  {'✓ created' if was_created else '- exists '} {name}")
+    elif args.command == "stats":
+        print(get_claim_stats(args.destination))
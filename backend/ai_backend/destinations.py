@@ -0,0 +1,240 @@
+"""
+Destination Canonicalization
+Maps whatever a user, document or LLM calls a country ("JP", "JPN", "Japan",
+"tokyo", "Nihon") onto one canonical key.
+
+- Profiles and the pricing API use ISO 3166 alpha-2 codes (arrivalCountry: "JP")
+- The claims database is keyed by English country name ("Japan")
+
+The alias index is built once at import time, so each lookup is a single dict hit
+after normalizing case, accents and punctuation.
+
+Usage:
+    to_country_code("Tokyo")        -> "JP"
+    to_country_name("IDN")          -> "Indonesia"
+    canonicalize_country("Bali")    -> "ID"
+    canonicalize_country("Narnia")  -> "Narnia"   (unknown values pass through)
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, Optional
+
+# alpha-2, alpha-3, name used by the claims database
+COUNTRIES = [
+    ("AD", "AND", "Andorra"), ("AE", "ARE", "United Arab Emirates"), ("AF", "AFG", "Afghanistan"),
+    ("AG", "ATG", "Antigua and Barbuda"), ("AL", "ALB", "Albania"), ("AM", "ARM", "Armenia"),
+    ("AO", "AGO", "Angola"), ("AR", "ARG", "Argentina"), ("AT", "AUT", "Austria"),
+    ("AU", "AUS", "Australia"), ("AW", "ABW", "Aruba"), ("AZ", "AZE", "Azerbaijan"),
+    ("BA", "BIH", "Bosnia and Herzegovina"), ("BB", "BRB", "Barbados"), ("BD", "BGD", "Bangladesh"),
+    ("BE", "BEL", "Belgium"), ("BF", "BFA", "Burkina Faso"), ("BG", "BGR", "Bulgaria"),
+    ("BH", "BHR", "Bahrain"), ("BI", "BDI", "Burundi"), ("BJ", "BEN", "Benin"),
+    ("BN", "BRN", "Brunei"), ("BO", "BOL", "Bolivia"), ("BR", "BRA", "Brazil"),
+    ("BS", "BHS", "Bahamas"), ("BT", "BTN", "Bhutan"), ("BW", "BWA", "Botswana"),
+    ("BY", "BLR", "Belarus"), ("BZ", "BLZ", "Belize"), ("CA", "CAN", "Canada"),
+    ("CD", "COD", "Democratic Republic of the Congo"), ("CF", "CAF", "Central African Republic"),
+    ("CG", "COG", "Republic of the Congo"), ("CH", "CHE", "Switzerland"), ("CI", "CIV", "Ivory Coast"),
+    ("CL", "CHL", "Chile"), ("CM", "CMR", "Cameroon"), ("CN", "CHN", "China"),
+    ("CO", "COL", "Colombia"), ("CR", "CRI", "Costa Rica"), ("CU", "CUB", "Cuba"),
+    ("CV", "CPV", "Cape Verde"), ("CY", "CYP", "Cyprus"), ("CZ", "CZE", "Czech Republic"),
+    ("DE", "DEU", "Germany"), ("DJ", "DJI", "Djibouti"), ("DK", "DNK", "Denmark"),
+    ("DM", "DMA", "Dominica"), ("DO", "DOM", "Dominican Republic"), ("DZ", "DZA", "Algeria"),
+    ("EC", "ECU", "Ecuador"), ("EE", "EST", "Estonia"), ("EG", "EGY", "Egypt"),
+    ("ER", "ERI", "Eritrea"), ("ES", "ESP", "Spain"), ("ET", "ETH", "Ethiopia"),
+    ("FI", "FIN", "Finland"), ("FJ", "FJI", "Fiji"), ("FM", "FSM", "Micronesia"),
+    ("FR", "FRA", "France"), ("GA", "GAB", "Gabon"), ("GB", "GBR", "United Kingdom"),
+    ("GD", "GRD", "Grenada"), ("GE", "GEO", "Georgia"), ("GH", "GHA", "Ghana"),
+    ("GM", "GMB", "Gambia"), ("GN", "GIN", "Guinea"), ("GQ", "GNQ", "Equatorial Guinea"),
+    ("GR", "GRC", "Greece"), ("GT", "GTM", "Guatemala"), ("GU", "GUM", "Guam"),
+    ("GW", "GNB", "Guinea-Bissau"), ("GY", "GUY", "Guyana"), ("HK", "HKG", "Hong Kong"),
+    ("HN", "HND", "Honduras"), ("HR", "HRV", "Croatia"), ("HT", "HTI", "Haiti"),
+    ("HU", "HUN", "Hungary"), ("ID", "IDN", "Indonesia"), ("IE", "IRL", "Ireland"),
+    ("IL", "ISR", "Israel"), ("IN", "IND", "India"), ("IQ", "IRQ", "Iraq"),
+    ("IR", "IRN", "Iran"), ("IS", "ISL", "Iceland"), ("IT", "ITA", "Italy"),
+    ("JM", "JAM", "Jamaica"), ("JO", "JOR", "Jordan"), ("JP", "JPN", "Japan"),
+    ("KE", "KEN", "Kenya"), ("KG", "KGZ", "Kyrgyzstan"), ("KH", "KHM", "Cambodia"),
+    ("KI", "KIR", "Kiribati"), ("KM", "COM", "Comoros"), ("KN", "KNA", "Saint Kitts and Nevis"),
+    ("KP", "PRK", "North Korea"), ("KR", "KOR", "South Korea"), ("KW", "KWT", "Kuwait"),
+    ("KZ", "KAZ", "Kazakhstan"), ("LA", "LAO", "Laos"), ("LB", "LBN", "Lebanon"),
+    ("LC", "LCA", "Saint Lucia"), ("LI", "LIE", "Liechtenstein"), ("LK", "LKA", "Sri Lanka"),
+    ("LR", "LBR", "Liberia"), ("LS", "LSO", "Lesotho"), ("LT", "LTU", "Lithuania"),
+    ("LU", "LUX", "Luxembourg"), ("LV", "LVA", "Latvia"), ("LY", "LBY", "Libya"),
+    ("MA", "MAR", "Morocco"), ("MC", "MCO", "Monaco"), ("MD", "MDA", "Moldova"),
+    ("ME", "MNE", "Montenegro"), ("MG", "MDG", "Madagascar"), ("MH", "MHL", "Marshall Islands"),
+    ("MK", "MKD", "North Macedonia"), ("ML", "MLI", "Mali"), ("MM", "MMR", "Myanmar"),
+    ("MN", "MNG", "Mongolia"), ("MO", "MAC", "Macau"), ("MR", "MRT", "Mauritania"),
+    ("MT", "MLT", "Malta"), ("MU", "MUS", "Mauritius"), ("MV", "MDV", "Maldives"),
+    ("MW", "MWI", "Malawi"), ("MX", "MEX", "Mexico"), ("MY", "MYS", "Malaysia"),
+    ("MZ", "MOZ", "Mozambique"), ("NA", "NAM", "Namibia"), ("NC", "NCL", "New Caledonia"),
+    ("NE", "NER", "Niger"), ("NG", "NGA", "Nigeria"), ("NI", "NIC", "Nicaragua"),
+    ("NL", "NLD", "Netherlands"), ("NO", "NOR", "Norway"), ("NP", "NPL", "Nepal"),
+    ("NR", "NRU", "Nauru"), ("NZ", "NZL", "New Zealand"), ("OM", "OMN", "Oman"),
+    ("PA", "PAN", "Panama"), ("PE", "PER", "Peru"), ("PF", "PYF", "French Polynesia"),
+    ("PG", "PNG", "Papua New Guinea"), ("PH", "PHL", "Philippines"), ("PK", "PAK", "Pakistan"),
+    ("PL", "POL", "Poland"), ("PR", "PRI", "Puerto Rico"), ("PS", "PSE", "Palestine"),
+    ("PT", "PRT", "Portugal"), ("PW", "PLW", "Palau"), ("PY", "PRY", "Paraguay"),
+    ("QA", "QAT", "Qatar"), ("RO", "ROU", "Romania"), ("RS", "SRB", "Serbia"),
+    ("RU", "RUS", "Russia"), ("RW", "RWA", "Rwanda"), ("SA", "SAU", "Saudi Arabia"),
+    ("SB", "SLB", "Solomon Islands"), ("SC", "SYC", "Seychelles"), ("SD", "SDN", "Sudan"),
+    ("SE", "SWE", "Sweden"), ("SG", "SGP", "Singapore"), ("SI", "SVN", "Slovenia"),
+    ("SK", "SVK", "Slovakia"), ("SL", "SLE", "Sierra Leone"), ("SM", "SMR", "San Marino"),
+    ("SN", "SEN", "Senegal"), ("SO", "SOM", "Somalia"), ("SR", "SUR", "Suriname"),
+    ("SS", "SSD", "South Sudan"), ("ST", "STP", "Sao Tome and Principe"), ("SV", "SLV", "El Salvador"),
+    ("SY", "SYR", "Syria"), ("SZ", "SWZ", "Eswatini"), ("TD", "TCD", "Chad"),
+    ("TG", "TGO", "Togo"), ("TH", "THA", "Thailand"), ("TJ", "TJK", "Tajikistan"),
+    ("TL", "TLS", "Timor-Leste"), ("TM", "TKM", "Turkmenistan"), ("TN", "TUN", "Tunisia"),
+    ("TO", "TON", "Tonga"), ("TR", "TUR", "Turkey"), ("TT", "TTO", "Trinidad and Tobago"),
+    ("TV", "TUV", "Tuvalu"), ("TW", "TWN", "Taiwan"), ("TZ", "TZA", "Tanzania"),
+    ("UA", "UKR", "Ukraine"), ("UG", "UGA", "Uganda"), ("US", "USA", "United States"),
+    ("UY", "URY", "Uruguay"), ("UZ", "UZB", "Uzbekistan"), ("VA", "VAT", "Vatican City"),
+    ("VC", "VCT", "Saint Vincent and the Grenadines"), ("VE", "VEN", "Venezuela"),
+    ("VN", "VNM", "Vietnam"), ("VU", "VUT", "Vanuatu"), ("WS", "WSM", "Samoa"),
+    ("YE", "YEM", "Yemen"), ("ZA", "ZAF", "South Africa"), ("ZM", "ZMB", "Zambia"),
+    ("ZW", "ZWE", "Zimbabwe")
+]
+
+# Other names and popular travel cities/regions -> alpha-2
+ALIASES = {
+    "AE": ["UAE", "Emirates", "Dubai", "Abu Dhabi"],
+    "AU": ["Sydney", "Melbourne", "Brisbane", "Perth", "Gold Coast", "Cairns"],
+    "CH": ["Swiss", "Zurich", "Geneva", "Lucerne", "Interlaken", "Zermatt"],
+    "CN": ["PRC", "People's Republic of China", "Mainland China", "Beijing", "Shanghai", "Guangzhou",
+           "Shenzhen", "Chengdu", "Xian"],
+    "CZ": ["Czechia", "Prague"],
+    "DE": ["Deutschland", "Berlin", "Munich", "Frankfurt", "Hamburg"],
+    "ES": ["Espana", "Madrid", "Barcelona", "Seville", "Ibiza"],
+    "FR": ["Paris", "Nice", "Lyon", "Marseille"],
+    "GB": ["UK", "U.K.", "Britain", "Great Britain", "England", "Scotland", "Wales", "Northern Ireland",
+           "London", "Edinburgh", "Manchester"],
+    "GR": ["Athens", "Santorini", "Mykonos"],
+    "HK": ["Hongkong", "Hong Kong SAR"],
+    "ID": ["Bali", "Jakarta", "Lombok", "Yogyakarta", "Batam", "Bintan", "Komodo"],
+    "IN": ["Bharat", "Delhi", "New Delhi", "Mumbai", "Bangalore", "Goa", "Chennai"],
+    "IT": ["Italia", "Rome", "Milan", "Venice", "Florence", "Naples"],
+    "JP": ["Nippon", "Nihon", "Tokyo", "Osaka", "Kyoto", "Hokkaido", "Sapporo", "Okinawa", "Fukuoka",
+           "Nagoya", "Hiroshima", "Nara"],
+    "KH": ["Siem Reap", "Phnom Penh", "Angkor Wat"],
+    "KR": ["Korea", "Republic of Korea", "Seoul", "Busan", "Jeju"],
+    "LA": ["Lao", "Vientiane", "Luang Prabang"],
+    "MM": ["Burma", "Yangon"],
+    "MO": ["Macao"],
+    "MY": ["Kuala Lumpur", "KL", "Penang", "Langkawi", "Malacca", "Melaka", "Johor", "Johor Bahru", "Sabah",
+           "Kota Kinabalu", "Sarawak"],
+    "NL": ["Holland", "The Netherlands", "Amsterdam"],
+    "NP": ["Kathmandu", "Pokhara"],
+    "NZ": ["Aotearoa", "Auckland", "Queenstown", "Wellington", "Christchurch"],
+    "PH": ["Manila", "Cebu", "Boracay", "Palawan"],
+    "RU": ["Russian Federation", "Moscow"],
+    "SG": ["Singapura"],
+    "TH": ["Siam", "Bangkok", "Phuket", "Chiang Mai", "Krabi", "Pattaya", "Koh Samui"],
+    "TR": ["Turkiye", "Istanbul", "Cappadocia"],
+    "TW": ["Taipei", "Chinese Taipei", "Republic of China"],
+    "US": ["USA", "U.S.", "U.S.A.", "America", "United States of America", "New York", "Los Angeles",
+           "San Francisco", "Las Vegas", "Hawaii", "Honolulu", "Orlando", "Seattle"],
+    "VN": ["Viet Nam", "Hanoi", "Ho Chi Minh City", "Saigon", "Da Nang", "Halong Bay"]
+}
+
+_CODE_TO_NAME: Dict[str, str] = {alpha2: name for alpha2, _, name in COUNTRIES}
+
+
+def normalize_text(value: str) -> str:
+    """Lookup form of a free-text place: accents stripped, case-folded, punctuation collapsed."""
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = text.replace("&", " and ").replace("'", "")
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def _build_alias_index() -> Dict[str, str]:
+    """Every known spelling (codes, names, aliases, "the X", "X city") -> alpha-2."""
+    index: Dict[str, str] = {}
+
+    def add(alias: str, alpha2: str) -> None:
+        key = normalize_text(alias)
+        if key:
+            index.setdefault(key, alpha2)
+
+    for alpha2, alpha3, name in COUNTRIES:
+        add(alpha2, alpha2)
+        add(alpha3, alpha2)
+        add(name, alpha2)
+        add(f"the {name}", alpha2)
+
+    for alpha2, aliases in ALIASES.items():
+        for alias in aliases:
+            add(alias, alpha2)
+            add(f"{alias} city", alpha2)
+
+    return index
+
+
+_ALIAS_INDEX = _build_alias_index()
+
+
+def to_country_code(value: Any) -> Optional[str]:
+    """
+    Resolve a country code, name, alias or city to an ISO alpha-2 code.
+
+    Args:
+        value: e.g. "JP", "jpn", "Japan", "Tokyo"
+
+    Returns:
+        Alpha-2 code, or None if the value is not recognized
+    """
+    if not value or not isinstance(value, str):
+        return None
+
+    key = normalize_text(value)
+    code = _ALIAS_INDEX.get(key)
+    if code is None and "," in value:
+        # "Tokyo, Japan" / "Bali, Indonesia": the country usually comes last
+        code = _ALIAS_INDEX.get(normalize_text(value.rsplit(",", 1)[1]))
+    return code
+
+
+def to_country_name(value: Any) -> Optional[str]:
+    """Resolve a code, name, alias or city to the country name used by the claims database."""
+    code = to_country_code(value)
+    return _CODE_TO_NAME.get(code) if code else None
+
+
+def canonicalize_country(value: Any) -> Any:
+    """Alpha-2 code for a recognized country; anything else is returned unchanged."""
+    return to_country_code(value) or value
+
+
+def claims_key(destination: str) -> str:
+    """Cache/DB key for claim statistics: the canonical country name, lower-cased."""
+    name = to_country_name(destination)
+    return (name or (destination or "").strip()).lower()
+
+
+# Profile fields (dotted paths, with * for list indexes) that hold countries
+COUNTRY_FIELDS = ("departureCountry", "arrivalCountry", "mainContact.countryCode", "mainContact.nationality",
+                  "insureds.*.nationality")
+
+
+def is_country_field(path: str) -> bool:
+    """True if a dotted profile path (e.g. "insureds.0.nationality") holds a country."""
+    parts = path.split(".")
+    for pattern in COUNTRY_FIELDS:
+        expected = pattern.split(".")
+        if len(expected) == len(parts) and all(e == "*" and p.isdigit() or e == p for e, p in zip(expected, parts)):
+            return True
+    return False
+
+
+def canonicalize_profile_countries(changes: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rewrite country fields in a profile patch to alpha-2 codes.
+
+    Args:
+        changes: Mapping of dotted field path -> value, as passed to update_profile
+
+    Returns:
+        New mapping with recognized country values canonicalized
+    """
+    return {
+        path: canonicalize_country(value) if is_country_field(path) else value
+        for path, value in changes.items()
+    }
@@ -0,0 +1,214 @@
+"""
+Blocking Work Executors
+Keeps sync tools (Gemini calls, psycopg2 queries, requests.post, profile file I/O)
+off the FastAPI event loop.
+
+Each category of blocking work gets its own bounded thread pool, so a burst of
+slow LLM calls cannot starve database or disk work and one slow user does not
+stall every other request on the worker:
+- llm:  Gemini / OpenAI calls          (EXECUTOR_LLM_WORKERS,  default 16)
+- db:   PostgreSQL queries             (EXECUTOR_DB_WORKERS,   default 8)
+- http: pricing/purchase/payment APIs  (EXECUTOR_HTTP_WORKERS, default 16)
+- disk: profile and taxonomy file I/O  (EXECUTOR_DISK_WORKERS, default 4)
+
+Work runs in a copy of the caller's contextvars, so the request-scoped profile
+session (and get_current_user_id) is visible inside the thread.
+
+Usage:
+    result = await run_blocking("db", get_claim_stats, destination)
+
+    @offload("http")
+    def call_pricing_api(user_id: str) -> Dict: ...   # now an async tool
+
+Event-loop lag is sampled by start_loop_lag_monitor(); everything is reported
+by get_executor_stats().
+"""
+
+import os
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Default thread count per category (override with EXECUTOR_<CATEGORY>_WORKERS)
+DEFAULT_WORKERS = {
+    "llm": 16,
+    "db": 8,
+    "http": 16,
+    "disk": 4
+}
+
+# How often the loop lag monitor wakes up (seconds)
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+# Per-category counters: submitted, running, completed, failed, total/max wait and run time
+_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+# Event loop lag samples (seconds late a periodic timer fired)
+_loop_lag = {"samples": 0, "last": 0.0, "max": 0.0, "total": 0.0, "over_100ms": 0}
+_lag_task: Optional[asyncio.Task] = None
+
+
+def _workers_for(category: str) -> int:
+    """Thread count for a category, from EXECUTOR_<CATEGORY>_WORKERS or the default."""
+    if category not in DEFAULT_WORKERS:
+        raise ValueError(f"Unknown executor category: {category} (expected one of {', '.join(DEFAULT_WORKERS)})")
+    return max(1, int(os.getenv(f"EXECUTOR_{category.upper()}_WORKERS", DEFAULT_WORKERS[category])))
+
+
+def get_executor(category: str) -> ThreadPoolExecutor:
+    """Return the thread pool for a category, creating it on first use."""
+    pool = _pools.get(category)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(category)
+            if pool is None:
+                pool = ThreadPoolExecutor(
+                    max_workers=_workers_for(category),
+                    thread_name_prefix=f"{category}-worker"
+                )
+                _pools[category] = pool
+                _stats[category] = {
+                    "submitted": 0, "running": 0, "completed": 0, "failed": 0,
+                    "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+                    "run_seconds": 0.0, "max_run_seconds": 0.0
+                }
+    return pool
+
+
+def _timed_call(category: str, submitted_at: float, func: Callable, *args, **kwargs) -> Any:
+    """Run func in a worker thread, recording queue wait and run time."""
+    started_at = time.perf_counter()
+    wait = started_at - submitted_at
+    stats = _stats[category]
+    with _stats_lock:
+        stats["running"] += 1
+        stats["wait_seconds"] += wait
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait)
+
+    failed = False
+    try:
+        return func(*args, **kwargs)
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started_at
+        with _stats_lock:
+            stats["running"] -= 1
+            stats["failed" if failed else "completed"] += 1
+            stats["run_seconds"] += elapsed
+            stats["max_run_seconds"] = max(stats["max_run_seconds"], elapsed)
+
+
+async def run_blocking(category: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking function in the category's thread pool and await its result.
+
+    Args:
+        category: One of "llm", "db", "http", "disk"
+        func: Sync callable to run
+        *args, **kwargs: Passed through to func
+
+    Returns:
+        Whatever func returns (exceptions propagate to the awaiting caller)
+    """
+    pool = get_executor(category)
+    with _stats_lock:
+        _stats[category]["submitted"] += 1
+
+    # Carry the request's contextvars (profile session, current user) into the thread
+    ctx = contextvars.copy_context()
+    call = functools.partial(_timed_call, category, time.perf_counter(), func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(pool, ctx.run, call)
+
+
+def offload(category: str) -> Callable:
+    """
+    Decorator turning a sync tool into an async one that runs in the category's pool.
+
+    functools.wraps keeps the name, docstring and signature, so ADK builds the same
+    tool declaration as for the sync function. The sync version stays reachable as
+    tool.__wrapped__ for scripts and for calls made from worker threads.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await run_blocking(category, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def _monitor_loop_lag(interval: float) -> None:
+    """Sleep for `interval` repeatedly and record how late each wake-up is."""
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - scheduled)
+        _loop_lag["samples"] += 1
+        _loop_lag["last"] = lag
+        _loop_lag["total"] += lag
+        _loop_lag["max"] = max(_loop_lag["max"], lag)
+        if lag > 0.1:
+            _loop_lag["over_100ms"] += 1
+            print(f"[LOOP LAG] Event loop blocked for {lag * 1000:.0f}ms")
+
+
+def start_loop_lag_monitor(interval: float = LOOP_LAG_INTERVAL) -> asyncio.Task:
+    """Start the event-loop lag monitor on the running loop (idempotent)."""
+    global _lag_task
+    if _lag_task is None or _lag_task.done():
+        _lag_task = asyncio.get_running_loop().create_task(_monitor_loop_lag(interval))
+    return _lag_task
+
+
+def stop_loop_lag_monitor() -> None:
+    """Cancel the lag monitor task if it is running."""
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        _lag_task = None
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    """Shut down all category pools (they are recreated on next use)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
+
+
+def get_executor_stats() -> Dict:
+    """Per-category pool counters plus event-loop lag, for the /metrics endpoint."""
+    with _stats_lock:
+        categories = {}
+        for category, stats in _stats.items():
+            finished = stats["completed"] + stats["failed"]
+            categories[category] = {
+                "max_workers": _workers_for(category),
+                "queued": stats["submitted"] - finished - stats["running"],
+                **stats,
+                "avg_wait_seconds": stats["wait_seconds"] / finished if finished else 0.0,
+                "avg_run_seconds": stats["run_seconds"] / finished if finished else 0.0
+            }
+
+    samples = _loop_lag["samples"]
+    return {
+        "executors": categories,
+        "loop_lag": {
+            "samples": samples,
+            "last_seconds": _loop_lag["last"],
+            "max_seconds": _loop_lag["max"],
+            "avg_seconds": _loop_lag["total"] / samples if samples else 0.0,
+            "over_100ms": _loop_lag["over_100ms"]
+        }
+    }
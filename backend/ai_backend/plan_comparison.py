@@ -0,0 +1,234 @@
+"""
+Plan Comparison - precomputed plan-vs-plan diffs over the filled taxonomy
+
+For every pair of products the differences are worked out once per taxonomy version
+(alongside the taxonomy index, see taxonomy_index.py), grouped by layer:
+- only_in:              conditions/benefits one product has and the other does not
+- exclusions_only_in:   exclusion-type conditions only one product applies
+- different_limits:     benefits both cover with a different headline limit
+                        (per-person limit of the top tier, see plan_scoring.parse_limit)
+- unknown_limits:       benefits both cover where a limit could not be parsed on one
+                        or both sides, so no difference can be claimed
+- different_exclusions: benefits/conditions both have whose listed exclusions differ
+
+Every diff is keyed by product name, so one entry serves both (A, B) and (B, A).
+compare() is then a dict lookup plus filtering - no LLM or vector store involved.
+
+Usage:
+    diffs = get_plan_diff_index()
+    diffs.compare("Plan A", "Product C", aspect="limits")
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional
+
+from plan_scoring import parse_limit
+from taxonomy_index import TAXONOMY_PATH, TaxonomyIndex, get_taxonomy_index, is_covered
+
+EXCLUSION_TYPES = {"exclusion", "benefit_exclusion"}
+
+# Parameter keys whose values list what is not covered
+_EXCLUSION_KEY = re.compile(r"exclu|not_covered", re.IGNORECASE)
+
+# Which diff fields each comparison_aspect returns
+ASPECT_FIELDS = {
+    "coverage": ["only_in", "exclusions_only_in"],
+    "benefits": ["only_in", "different_limits"],
+    "limits": ["different_limits", "unknown_limits"],
+    "exclusions": ["exclusions_only_in", "different_exclusions"],
+    "all": ["only_in", "exclusions_only_in", "different_limits", "unknown_limits", "different_exclusions"],
+}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9$]+", " ", text.lower()).split())
+
+
+def exclusion_texts(parameters) -> Dict[str, str]:
+    """
+    Exclusions listed in a cell's parameters.
+
+    Returns:
+        Mapping of normalized text -> original text, for every string under an
+        exclusion-like key (exclusions, what_is_not_covered, excluded_*, ...)
+    """
+    found = {}
+    stack = [(False, parameters)]
+    while stack:
+        under_exclusion, value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend((under_exclusion or bool(_EXCLUSION_KEY.search(k)), v) for k, v in value.items())
+        elif isinstance(value, list):
+            stack.extend((under_exclusion, v) for v in value)
+        elif under_exclusion and isinstance(value, str) and value.strip():
+            found.setdefault(_normalize(value), value.strip())
+    return found
+
+
+def resolve_product(plan: str, products: List[str]) -> Optional[str]:
+    """
+    Map a user-facing plan name ("Product B", "plan b", "B") to a taxonomy product.
+
+    Returns:
+        Product name, or None if no product matches
+    """
+    wanted = " ".join(plan.split()).casefold()
+    for product in products:
+        if product.casefold() == wanted:
+            return product
+    # "Plan B" / "B" -> the product whose last word is "B"
+    suffix = wanted.split()[-1] if wanted else ""
+    matches = [p for p in products if p.split() and p.split()[-1].casefold() == suffix]
+    return matches[0] if len(matches) == 1 else None
+
+
+class PlanDiffIndex:
+    """All pairwise product diffs for one taxonomy index."""
+
+    def __init__(self, index: TaxonomyIndex):
+        self.index = index
+        self.products = list(index.products)
+        self.layers = list(index.taxonomy.get("layers", {}))
+
+        # layer -> label -> {"exclusion": bool, "benefit": bool, "cells": {product: cell facts}}
+        self._items = {layer: self._layer_items(layer) for layer in self.layers}
+
+        self._diffs: Dict[tuple, Dict] = {}
+        for i, product_a in enumerate(self.products):
+            for product_b in self.products[i + 1:]:
+                self._diffs[(product_a, product_b)] = self._diff(product_a, product_b)
+
+    def _layer_items(self, layer: str) -> Dict[str, Dict]:
+        items: Dict[str, Dict] = {}
+        for item in self.index.taxonomy["layers"][layer]:
+            if "condition" in item and "benefit_name" in item:
+                label = f"{item['benefit_name']}: {item['condition']}"
+            else:
+                label = item.get("condition") or item.get("benefit_name", "")
+            entry = items.setdefault(label, {
+                "exclusion": item.get("condition_type") in EXCLUSION_TYPES,
+                "benefit": "condition" not in item,
+                "cells": {}
+            })
+            for product, product_info in item.get("products", {}).items():
+                if not isinstance(product_info, dict):
+                    continue
+                cell = entry["cells"].setdefault(product, {"covered": False, "limit": None, "exclusions": {}})
+                if not is_covered(product_info):
+                    continue
+                cell["covered"] = True
+                parameters = product_info.get("parameters")
+                if entry["benefit"]:
+                    limit = parse_limit(parameters)
+                    if limit is not None and (cell["limit"] is None or limit > cell["limit"]):
+                        cell["limit"] = limit
+                cell["exclusions"].update(exclusion_texts(parameters))
+        return items
+
+    def _diff(self, product_a: str, product_b: str) -> Dict[str, Dict]:
+        empty = {"covered": False, "limit": None, "exclusions": {}}
+        diff = {}
+        for layer in self.layers:
+            layer_diff = {
+                "only_in": {product_a: [], product_b: []},
+                "exclusions_only_in": {product_a: [], product_b: []},
+                "different_limits": [],
+                "unknown_limits": [],
+                "different_exclusions": []
+            }
+            for label, entry in self._items[layer].items():
+                a = entry["cells"].get(product_a, empty)
+                b = entry["cells"].get(product_b, empty)
+
+                if a["covered"] != b["covered"]:
+                    field = "exclusions_only_in" if entry["exclusion"] else "only_in"
+                    layer_diff[field][product_a if a["covered"] else product_b].append(label)
+                    continue
+                if not a["covered"]:
+                    continue
+
+                if entry["benefit"]:
+                    limits = {product_a: a["limit"], product_b: b["limit"]}
+                    if a["limit"] is None or b["limit"] is None:
+                        layer_diff["unknown_limits"].append({"name": label, "limits": limits})
+                    elif a["limit"] != b["limit"]:
+                        layer_diff["different_limits"].append({"name": label, "limits": limits})
+
+                if a["exclusions"].keys() != b["exclusions"].keys():
+                    layer_diff["different_exclusions"].append({
+                        "name": label,
+                        "only_in": {
+                            product_a: [text for key, text in a["exclusions"].items() if key not in b["exclusions"]],
+                            product_b: [text for key, text in b["exclusions"].items() if key not in a["exclusions"]]
+                        }
+                    })
+            diff[layer] = layer_diff
+        return diff
+
+    def compare(self, plan_a: str, plan_b: str, aspect: str = "coverage") -> Dict:
+        """
+        Differences between two plans, grouped by layer.
+
+        Args:
+            plan_a: First plan (product name, "Plan A", "A", ...)
+            plan_b: Second plan
+            aspect: coverage, benefits, limits, exclusions or all (unknown aspects -> all)
+
+        Returns:
+            Dictionary with the resolved products, per-layer differences and counts;
+            {"success": False, "error": ...} if a plan cannot be resolved
+        """
+        product_a = resolve_product(plan_a, self.products)
+        product_b = resolve_product(plan_b, self.products)
+        unknown = [plan for plan, product in ((plan_a, product_a), (plan_b, product_b)) if product is None]
+        if unknown:
+            return {"success": False, "error": f"Unknown plan: {', '.join(unknown)}", "available_plans": self.products}
+        if product_a == product_b:
+            return {"success": False, "error": f"Both plans are {product_a}", "available_plans": self.products}
+
+        pair = (product_a, product_b) if (product_a, product_b) in self._diffs else (product_b, product_a)
+        fields = ASPECT_FIELDS.get(aspect.lower(), ASPECT_FIELDS["all"])
+
+        differences = {}
+        summary = {field: 0 for field in fields}
+        for layer, layer_diff in self._diffs[pair].items():
+            selected = {field: layer_diff[field] for field in fields}
+            counts = {
+                field: sum(len(v) for v in value.values()) if isinstance(value, dict) else len(value)
+                for field, value in selected.items()
+            }
+            if any(counts.values()):
+                differences[layer] = selected
+            for field, count in counts.items():
+                summary[field] += count
+
+        result = {
+            "success": True,
+            "plan_a": product_a,
+            "plan_b": product_b,
+            "comparison_aspect": aspect,
+            "differences": differences,
+            "summary": summary
+        }
+        if aspect.lower() not in ASPECT_FIELDS:
+            result["note"] = f"'{aspect}' is not recorded in the taxonomy; showing all differences"
+        return result
+
+
+_diff_indexes: Dict[str, PlanDiffIndex] = {}
+_diff_indexes_lock = threading.Lock()
+
+
+def get_plan_diff_index(path: Optional[str] = None) -> PlanDiffIndex:
+    """Process-wide diff index for a taxonomy file, rebuilt whenever its taxonomy index is."""
+    key = str(path or TAXONOMY_PATH)
+    index = get_taxonomy_index(key)
+    diffs = _diff_indexes.get(key)
+    if diffs is None or diffs.index is not index:
+        with _diff_indexes_lock:
+            diffs = _diff_indexes.get(key)
+            if diffs is None or diffs.index is not index:
+                diffs = PlanDiffIndex(index)
+                _diff_indexes[key] = diffs
+    return diffs
@@ -0,0 +1,258 @@
+"""
+Plan Scoring - vectorized ranking of all products against a traveller's needs
+
+Built on top of the taxonomy index (taxonomy_index.py), with the taxonomy turned into
+two products x conditions matrices:
+- coverage: 1.0 where the product has the condition/benefit
+- limits:   the benefit's headline limit, parsed from the filled `parameters`
+            (see parse_limit: per-person amount of the top plan tier)
+
+A profile becomes a needs vector over the same conditions: each need that is set
+contributes its weight (1.0 for True, the number itself for numeric values, or an
+explicit per-need weight). One matrix-vector product then gives every product's
+- matched weight (coverage . needs) -> match_percentage
+- rank score     (coverage * (1 + PLAN_LIMIT_WEIGHT * relative limit)) . needs
+so among products covering the same needs, higher limits rank first.
+
+score_many() ranks a whole batch of profiles with a single matrix-matrix product
+(see benchmark_plan_scoring.py).
+
+Usage:
+    scorer = get_plan_scorer()
+    scorer.rank(profile["needs"])
+    -> [{"name": "Product B", "score": 12.4, "match_percentage": 57, ...}, ...]
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from taxonomy_index import TAXONOMY_PATH, TaxonomyIndex, get_taxonomy_index, is_covered
+
+# How much limits count relative to coverage: a covered need scores 1 + PLAN_LIMIT_WEIGHT
+# for the product with the highest limit for it, 1 for a product with no parsed limit
+PLAN_LIMIT_WEIGHT = float(os.getenv("PLAN_LIMIT_WEIGHT", "0.25"))
+
+_AMOUNT = re.compile(r"\$\s?(\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?")
+
+# Keys under which a bare number is an amount ("return_trip_sgd": 100000)
+_AMOUNT_KEY = re.compile(r"sgd|limit|sum_insured|amount|maximum|payout", re.IGNORECASE)
+
+# Amounts that are not this benefit's per-person limit: family/group/aggregate totals and
+# the parent benefit's limit ("Overall Medical Expenses whilst Overseas Limit")
+_AGGREGATE = re.compile(r"overall|aggregate|combined|family|group.cover|in total|total for|_total|total_", re.IGNORECASE)
+
+# Longer strings are prose; amounts in them are rates, examples or other sections' limits
+LIMIT_VALUE_MAX_CHARS = 60
+# Sibling strings (without amounts) up to this length label the amounts next to them
+# ("type": "TCM Treatment Sub-Limit")
+LIMIT_LABEL_MAX_CHARS = 120
+
+
+def parse_limit(parameters) -> Optional[float]:
+    """
+    Headline limit of a benefit: the largest per-person amount in its parameters.
+
+    Only amounts that are values in their own right count - a short string such as
+    "$500,000" or "Up to $750", or a number under an amount-like key - and amounts
+    whose key or sibling labels mark a family/aggregate total or an overall limit are
+    skipped. The largest remaining amount is the top plan tier's limit.
+
+    Args:
+        parameters: Filled `parameters` value (dict/list/str, arbitrarily nested)
+
+    Returns:
+        Amount in policy currency, or None if no amount was found
+    """
+    amounts = []
+    # (value, its key, labels of the dicts it sits in)
+    stack = [(parameters, "", "")]
+    while stack:
+        value, key, context = stack.pop()
+        if isinstance(value, dict):
+            labels = " ".join(
+                v for v in value.values()
+                if isinstance(v, str) and len(v) <= LIMIT_LABEL_MAX_CHARS and not _AMOUNT.search(v)
+            )
+            stack.extend((v, k, f"{context} {k} {labels}") for k, v in value.items())
+        elif isinstance(value, list):
+            stack.extend((v, key, context) for v in value)
+        elif _AGGREGATE.search(context) or (isinstance(value, str) and _AGGREGATE.search(value)):
+            continue
+        elif isinstance(value, str) and len(value) <= LIMIT_VALUE_MAX_CHARS:
+            amounts.extend(float(m.group(1).replace(",", "")) for m in _AMOUNT.finditer(value))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and _AMOUNT_KEY.search(key):
+            amounts.append(float(value))
+    return max(amounts) if amounts else None
+
+
+def need_weights(needs: Dict, weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Weight of every need that is set.
+
+    Args:
+        needs: profile["needs"]; True/False, or a number used as the need's weight
+        weights: Optional per-need weights for needs set to True (default 1.0)
+
+    Returns:
+        Mapping of need -> weight (> 0)
+    """
+    weights = weights or {}
+    result = {}
+    for need, value in needs.items():
+        if value is True:
+            weight = float(weights.get(need, 1.0))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            weight = float(value)
+        else:
+            continue
+        if weight > 0:
+            result[need] = weight
+    return result
+
+
+class PlanScorer:
+    """Products x conditions matrices plus the scoring around them."""
+
+    def __init__(
+        self,
+        products: List[str],
+        names: List[str],
+        coverage: np.ndarray,
+        limits: np.ndarray,
+        limit_weight: float = PLAN_LIMIT_WEIGHT,
+        index: Optional[TaxonomyIndex] = None
+    ):
+        """
+        Args:
+            products: Product names (matrix rows)
+            names: Condition/benefit names (matrix columns)
+            coverage: (products, conditions) 0/1 matrix
+            limits: (products, conditions) headline limits, 0 where unknown
+            limit_weight: Weight of the relative limit in the rank score
+            index: Taxonomy index the matrices were built from, if any
+        """
+        self.products = list(products)
+        self.names = list(names)
+        self.name_ids = {name: i for i, name in enumerate(self.names)}
+        self.index = index
+
+        self.coverage = np.asarray(coverage, dtype=np.float64)
+        self.limits = np.where(self.coverage > 0, np.asarray(limits, dtype=np.float64), 0.0)
+
+        # Limits relative to the best product for each condition (0..1)
+        best = self.limits.max(axis=0, initial=0.0)
+        relative = np.divide(self.limits, best, out=np.zeros_like(self.limits), where=best > 0)
+        rank_matrix = self.coverage * (1.0 + limit_weight * relative)
+
+        # Stacked so one product yields both matched weight and rank score
+        self._matrix = np.vstack([self.coverage, rank_matrix])
+
+    @classmethod
+    def from_index(cls, index: TaxonomyIndex, limit_weight: float = PLAN_LIMIT_WEIGHT) -> "PlanScorer":
+        """Build the matrices from a taxonomy index."""
+        n_names = len(index.names)
+        coverage = np.zeros((len(index.products), n_names))
+        for row, product in enumerate(index.products):
+            bits = index.coverage[product]
+            coverage[row] = [(bits >> col) & 1 for col in range(n_names)]
+
+        limits = np.zeros_like(coverage)
+        rows = {product: row for row, product in enumerate(index.products)}
+        for conditions in index.taxonomy.get("layers", {}).values():
+            for item in conditions:
+                if "condition" in item:
+                    continue  # limits only mean something for benefits
+                col = index.name_ids.get(item.get("benefit_name", ""))
+                for product, product_info in item.get("products", {}).items():
+                    if col is None or not is_covered(product_info):
+                        continue
+                    limit = parse_limit(product_info.get("parameters"))
+                    if limit is not None:
+                        row = rows[product]
+                        limits[row, col] = max(limits[row, col], limit)
+
+        return cls(index.products, index.names, coverage, limits, limit_weight=limit_weight, index=index)
+
+    def needs_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        """Weights (from need_weights) as a vector over the conditions; unknown needs are dropped."""
+        vector = np.zeros(len(self.names))
+        for need, weight in weights.items():
+            col = self.name_ids.get(need)
+            if col is not None:
+                vector[col] = weight
+        return vector
+
+    def score(self, vector: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score all products for one needs vector.
+
+        Returns:
+            (matched weight per product, rank score per product)
+        """
+        result = self._matrix @ vector
+        n_products = len(self.products)
+        return result[:n_products], result[n_products:]
+
+    def score_many(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score all products for a batch of needs vectors (profiles x conditions).
+
+        Returns:
+            (matched weight, rank score), each profiles x products
+        """
+        result = np.asarray(vectors) @ self._matrix.T
+        n_products = len(self.products)
+        return result[:, :n_products], result[:, n_products:]
+
+    def rank(self, needs: Dict, weights: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """
+        Rank all products for a profile's needs, best first (ties keep taxonomy order).
+
+        Args:
+            needs: profile["needs"]
+            weights: Optional per-need weights (see need_weights)
+
+        Returns:
+            List of {"name", "score", "match_percentage", "matched_weight", "total_weight"}
+        """
+        return self.rank_weights(need_weights(needs, weights))
+
+    def rank_weights(self, weighted: Dict[str, float]) -> List[Dict]:
+        """rank() for needs already normalized with need_weights."""
+        # Needs the taxonomy knows nothing about still count towards the total, as before
+        total_weight = sum(weighted.values())
+        matched, scores = self.score(self.needs_vector(weighted))
+
+        order = np.argsort(-scores, kind="stable")
+        return [
+            {
+                "name": self.products[i],
+                "score": round(float(scores[i]), 4),
+                "match_percentage": int(matched[i] / total_weight * 100) if total_weight > 0 else 0,
+                "matched_weight": float(matched[i]),
+                "total_weight": total_weight
+            }
+            for i in order
+        ]
+
+
+_scorers: Dict[str, PlanScorer] = {}
+_scorers_lock = threading.Lock()
+
+
+def get_plan_scorer(path: Optional[str] = None) -> PlanScorer:
+    """Process-wide scorer for a taxonomy file, rebuilt whenever its index is."""
+    key = str(path or TAXONOMY_PATH)
+    index = get_taxonomy_index(key)
+    scorer = _scorers.get(key)
+    if scorer is None or scorer.index is not index:
+        with _scorers_lock:
+            scorer = _scorers.get(key)
+            if scorer is None or scorer.index is not index:
+                scorer = PlanScorer.from_index(index)
+                _scorers[key] = scorer
+    return scorer
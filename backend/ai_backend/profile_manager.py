@@ -1,47 +1,201 @@
 """
-Profile Manager - File-based user profile storage system
+Profile Manager - User profile storage system
 
-Stores user profiles as Python files in the artifacts/ directory.
-Each profile is stored as: artifacts/user_{user_id}_profile.py
+Profiles are kept in a pluggable keyed store (see profile_store.py):
+- json (default): artifacts/profiles/user_{user_id}.json
+- sqlite:         artifacts/profiles.sqlite3
 
-The file contains a PROFILE constant with the user's data as a dictionary.
+Select the backend with PROFILE_BACKEND=json|sqlite.
+
+Older profiles stored as artifacts/user_{user_id}_profile.py are still picked up:
+they are migrated into the store on first read, or in bulk with
+    python profile_manager.py migrate
+
+Parsed profiles are kept in a process-wide LRU (PROFILE_CACHE_MAX_ENTRIES /
+PROFILE_CACHE_MAX_BYTES) and revalidated with a stat/version check on each load,
+so profiles rewritten by another worker are re-read and unchanged ones are not.
+
+Small changes should use update_profile(user_id, {"mainContact.email": ...}),
+which appends a field-level patch instead of rewriting the whole profile.
+
+Within a /chat turn, wrap the work in profile_session(user_id): every
+load_profile/save_profile for that user then shares one in-memory profile,
+which is read from the store once and written back once at the end of the turn.
+
+Concurrency: store writes hold a per-user lock (thread + advisory file lock),
+save_profile accepts an expected_version for optimistic checks, and a session
+flush reports fields another request changed underneath it. user_turn_lock()
+serializes whole /chat turns for one user inside a worker.
 """
 
 import os
-import importlib.util
 import sys
+import copy
+import asyncio
+import threading
+import argparse
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
 from datetime import datetime
-import pprint
 
 # Import the schema template for default profile structure
 from schema_template import taxonomy_dict
+from destinations import canonicalize_profile_countries
+from profile_store import (
+    ProfileBackend,
+    ProfileCache,
+    ProfileConflictError,
+    LegacyProfileReader,
+    apply_patch,
+    create_backend,
+    safe_user_id
+)
 
 # Base directory for artifacts
 ARTIFACTS_DIR = Path("/Users/ray/Desktop/hackdeez/backend/ai_backend/agents/artifacts")
 
+# Backend selection (json | sqlite)
+PROFILE_BACKEND = os.getenv("PROFILE_BACKEND", "json")
+
+# Keys save_profile stamps on every write; not counted as user changes
+METADATA_FIELDS = ("user_id", "updated_at")
+
+_backend: Optional[ProfileBackend] = None
+_legacy_reader = LegacyProfileReader(ARTIFACTS_DIR)
+
+# Process-wide cache of parsed profiles
+_cache = ProfileCache(
+    max_entries=int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("PROFILE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+)
+
+# Request-scoped profile session (see profile_session)
+_active_session: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+# Aggregate profile I/O counters across finished sessions
+_session_totals = {"sessions": 0, "load_calls": 0, "save_calls": 0, "store_loads": 0, "store_saves": 0, "conflicts": 0}
+_last_session_stats: Dict = {}
+
+# Per-user asyncio locks for whole chat turns: user_id -> [lock, holders/waiters]
+_turn_locks: Dict[str, List] = {}
+
+
+def get_backend() -> ProfileBackend:
+    """Return the configured profile backend (created on first use)."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend(PROFILE_BACKEND, ARTIFACTS_DIR)
+    return _backend
+
+
+def set_backend(backend: ProfileBackend) -> None:
+    """Swap the profile backend (e.g. for scripts or tests)."""
+    global _backend
+    _backend = backend
+    _cache.clear()
+
 
 def get_profile_path(user_id: str) -> Path:
     """
-    Get the file path for a user's profile.
+    Get the file path of a user's legacy .py profile.
 
     Args:
         user_id: The user's unique identifier
 
     Returns:
-        Path object pointing to the user's profile file
+        Path object pointing to the user's legacy profile file
+    """
+    return _legacy_reader.path(user_id)
+
+
+def _new_profile() -> Dict:
+    """Build a fresh profile from the schema template."""
+    new_profile = copy.deepcopy(taxonomy_dict)
+    # Set default names for mainContact
+    new_profile["mainContact"]["firstName"] = "John"
+    new_profile["mainContact"]["lastName"] = "Doe"
+    return new_profile
+
+
+def _read_profile(user_id: str) -> Optional[Dict]:
+    """
+    Read a profile through the cache, migrating a legacy .py file on first access.
+    The stamp is taken before reading, so a concurrent write can only make the
+    cached entry look stale (forcing a re-read), never fresh.
+    """
+    backend = get_backend()
+    stamp = backend.stamp(user_id)
+    if stamp is not None:
+        cached = _cache.get(user_id, stamp)
+        if cached is not None:
+            return cached
+
+        profile = backend.read(user_id)
+        if profile is not None:
+            _cache.put(user_id, profile, stamp)
+            return profile
+
+    profile = _legacy_reader.read(user_id)
+    if profile is not None:
+        with backend.lock(user_id):
+            if backend.exists(user_id):
+                # Another worker migrated it first
+                return backend.read(user_id)
+            stamp = backend.write(user_id, profile)
+            _cache.put(user_id, profile, stamp)
+        print(f"Migrated legacy profile for user {user_id} into {backend.name} store")
+    return profile
+
+
+def _load_from_store(user_id: str) -> Dict:
+    """Read a profile from the store, falling back to a fresh template profile."""
+    try:
+        profile = _read_profile(user_id)
+    except Exception as e:
+        print(f"Error loading profile for user {user_id}: {e}")
+        print(f"Returning new profile from template")
+        return _new_profile()
+
+    # If profile doesn't exist, return a new one from template
+    if profile is None:
+        print(f"Profile not found for user {user_id}, creating new profile from template")
+        return _new_profile()
+
+    print(f"Loaded profile for user {user_id} from {get_backend().name} store")
+    return profile
+
+
+def _save_to_store(user_id: str, profile_data: Dict, expected_version: Optional[Hashable] = None) -> Hashable:
+    """
+    Stamp metadata and write a profile to the store.
+
+    Raises:
+        ProfileConflictError: If expected_version is given and the stored profile moved on
     """
-    # Sanitize user_id to be filesystem-safe
-    safe_user_id = user_id.replace("/", "_").replace("\\", "_")
-    return ARTIFACTS_DIR / f"user_{safe_user_id}_profile.py"
+    backend = get_backend()
+    with backend.lock(user_id):
+        if expected_version is not None and backend.stamp(user_id) != expected_version:
+            raise ProfileConflictError(user_id)
+
+        # Add metadata
+        profile_data['user_id'] = user_id
+        profile_data['updated_at'] = datetime.now().isoformat()
+
+        stamp = backend.write(user_id, profile_data)
+        _cache.put(user_id, profile_data, stamp, bump_version=True)
+
+    print(f"Saved profile for user {user_id} to {backend.name} store")
+    return stamp
 
 
 def load_profile(user_id: str) -> Dict:
     """
-    Load a user's profile from their Python file.
+    Load a user's profile from the profile store.
 
     If the profile doesn't exist, returns a new profile based on the schema template.
+    Inside a profile_session for this user, returns the session's shared profile object.
 
     Args:
         user_id: The user's unique identifier
@@ -49,105 +203,139 @@ def load_profile(user_id: str) -> Dict:
     Returns:
         Dictionary containing the user's profile data
     """
-    profile_path = get_profile_path(user_id)
+    session = _active_session.get()
+    if session is not None and session.user_id == user_id:
+        return session.get()
+    return _load_from_store(user_id)
 
-    # If profile doesn't exist, return a new one from template
-    if not profile_path.exists():
-        print(f"Profile not found for user {user_id}, creating new profile from template")
-        new_profile = taxonomy_dict.copy()
-        # Set default names for mainContact
-        new_profile["mainContact"]["firstName"] = "John"
-        new_profile["mainContact"]["lastName"] = "Doe"
-        return new_profile
 
-    try:
-        # Load the Python module dynamically
-        spec = importlib.util.spec_from_file_location(f"user_{user_id}_profile", profile_path)
-        if spec is None or spec.loader is None:
-            raise ImportError(f"Could not load profile from {profile_path}")
-
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-
-        # Get the PROFILE constant from the module
-        if not hasattr(module, 'PROFILE'):
-            raise AttributeError(f"Profile file {profile_path} does not contain PROFILE constant")
+def load_profile_with_version(user_id: str) -> Tuple[Dict, Optional[Hashable]]:
+    """
+    Load a profile together with its store version, for an optimistic save_profile.
 
-        profile = module.PROFILE
-        print(f"Loaded profile for user {user_id} from {profile_path}")
-        return profile
+    Args:
+        user_id: The user's unique identifier
 
-    except Exception as e:
-        print(f"Error loading profile for user {user_id}: {e}")
-        print(f"Returning new profile from template")
-        new_profile = taxonomy_dict.copy()
-        new_profile["mainContact"]["firstName"] = "John"
-        new_profile["mainContact"]["lastName"] = "Doe"
-        return new_profile
+    Returns:
+        (profile, version) - version is None if the profile is not stored yet
+    """
+    session = _active_session.get()
+    if session is not None and session.user_id == user_id:
+        return session.get(), session.loaded_version
+    version = get_backend().stamp(user_id)
+    return _load_from_store(user_id), version
 
 
-def save_profile(user_id: str, profile_data: Dict) -> bool:
+def save_profile(user_id: str, profile_data: Dict, expected_version: Optional[Hashable] = None) -> bool:
     """
-    Save a user's profile to their Python file.
+    Save a user's profile to the profile store.
+
+    Inside a profile_session for this user, the write is deferred until the session ends.
 
     Args:
         user_id: The user's unique identifier
         profile_data: Dictionary containing the profile data to save
+        expected_version: Version from load_profile_with_version; if the stored
+                          profile changed since, nothing is written
 
     Returns:
-        True if save was successful, False otherwise
+        True if save was successful, False otherwise (including version conflicts)
     """
-    profile_path = get_profile_path(user_id)
+    session = _active_session.get()
+    if session is not None and session.user_id == user_id:
+        session.put(profile_data)
+        return True
 
     try:
-        # Ensure artifacts directory exists
-        ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
-
-        # Add metadata
-        profile_data['user_id'] = user_id
-        profile_data['updated_at'] = datetime.now().isoformat()
-
-        # Convert the profile dict to a nicely formatted Python string using pprint
-        profile_str = pprint.pformat(profile_data, indent=2, width=120)
+        _save_to_store(user_id, profile_data, expected_version)
+        return True
+    except ProfileConflictError as e:
+        _session_totals["conflicts"] += 1
+        print(f"[CONFLICT] {e} - save rejected, reload and retry")
+        return False
+    except Exception as e:
+        print(f"Error saving profile for user {user_id}: {e}")
+        return False
 
-        # Write as a Python file with PROFILE constant
-        python_content = f'''"""
-User Profile for {user_id}
-Generated: {datetime.now().isoformat()}
-"""
 
-PROFILE = {profile_str}
-'''
+def _patch_store(user_id: str, changes: Dict[str, Any], removed: Iterable[str] = ()) -> bool:
+    """Append a field-level patch (plus metadata) to the store and keep the cache in step."""
+    field_count = len(changes)
+    changes = dict(changes)
+    changes['user_id'] = user_id
+    changes['updated_at'] = datetime.now().isoformat()
+    removed = list(removed)
 
-        profile_path.write_text(python_content, encoding='utf-8')
-        print(f"Saved profile for user {user_id} to {profile_path}")
+    try:
+        backend = get_backend()
+        with backend.lock(user_id):
+            if not backend.exists(user_id):
+                # Nothing to patch yet - start from the template (or legacy file)
+                _save_to_store(user_id, apply_patch(_load_from_store(user_id), changes, removed))
+                return True
+
+            # Under the lock nobody else can write between these two stamps
+            cached = _cache.get(user_id, backend.stamp(user_id))
+            stamp = backend.append_patch(user_id, changes, removed)
+            if cached is not None:
+                _cache.put(user_id, apply_patch(cached, changes, removed), stamp, bump_version=True)
+            else:
+                _cache.invalidate(user_id)
+
+        print(f"Updated {field_count} field(s) for user {user_id} in {backend.name} store")
         return True
 
     except Exception as e:
-        print(f"Error saving profile for user {user_id}: {e}")
+        print(f"Error updating profile for user {user_id}: {e}")
         return False
 
 
-def delete_profile(user_id: str) -> bool:
+def update_profile(user_id: str, changes: Dict[str, Any]) -> bool:
     """
-    Delete a user's profile file.
+    Update individual profile fields without rewriting the whole profile.
 
     Args:
         user_id: The user's unique identifier
+        changes: Mapping of dotted field path -> value,
+                 e.g. {"payment_status": "completed", "mainContact.email": "a@b.com"}
+
+    Country fields (arrivalCountry, insureds.N.nationality, ...) are stored as ISO alpha-2 codes.
 
     Returns:
-        True if deletion was successful or file didn't exist, False if error occurred
+        True if the update was successful, False otherwise
     """
-    profile_path = get_profile_path(user_id)
+    changes = canonicalize_profile_countries(changes)
+    session = _active_session.get()
+    if session is not None and session.user_id == user_id:
+        session.patch(changes)
+        return True
+    return _patch_store(user_id, changes)
+
 
+def delete_profile(user_id: str) -> bool:
+    """
+    Delete a user's profile (including any legacy .py file).
+
+    Args:
+        user_id: The user's unique identifier
+
+    Returns:
+        True if deletion was successful or profile didn't exist, False if error occurred
+    """
     try:
-        if profile_path.exists():
-            profile_path.unlink()
+        _cache.invalidate(user_id)
+        deleted = get_backend().delete(user_id)
+
+        legacy_path = get_profile_path(user_id)
+        if legacy_path.exists():
+            legacy_path.unlink()
+            deleted = True
+
+        if deleted:
             print(f"Deleted profile for user {user_id}")
-            return True
         else:
             print(f"Profile for user {user_id} does not exist, nothing to delete")
-            return True
+        return True
 
     except Exception as e:
         print(f"Error deleting profile for user {user_id}: {e}")
@@ -156,13 +344,283 @@ def delete_profile(user_id: str) -> bool:
 
 def profile_exists(user_id: str) -> bool:
     """
-    Check if a profile file exists for a user.
+    Check if a profile exists for a user.
 
     Args:
         user_id: The user's unique identifier
 
     Returns:
-        True if profile file exists, False otherwise
+        True if a profile is stored (or a legacy file exists), False otherwise
+    """
+    return get_backend().exists(user_id) or get_profile_path(user_id).exists()
+
+
+def migrate_legacy_profiles(overwrite: bool = False, remove_legacy: bool = False) -> Dict:
+    """
+    Ingest every artifacts/user_*_profile.py file into the configured store.
+
+    Args:
+        overwrite: If True, replace profiles that already exist in the store
+        remove_legacy: If True, delete each .py file after it was migrated
+
+    Returns:
+        Dictionary with migrated, skipped and failed user_ids
+    """
+    backend = get_backend()
+    summary = {"backend": backend.name, "migrated": [], "skipped": [], "failed": []}
+
+    for file_user_id in _legacy_reader.user_ids():
+        legacy_path = get_profile_path(file_user_id)
+        user_id = file_user_id
+        try:
+            profile = LegacyProfileReader.read_file(legacy_path)
+            # Filenames are sanitized; save_profile stamped the original id into the profile
+            if isinstance(profile.get("user_id"), str) and safe_user_id(profile["user_id"]) == file_user_id:
+                user_id = profile["user_id"]
+
+            if backend.exists(user_id) and not overwrite:
+                summary["skipped"].append(user_id)
+                continue
+
+            backend.write(user_id, profile)
+            summary["migrated"].append(user_id)
+
+            if remove_legacy:
+                legacy_path.unlink()
+
+        except Exception as e:
+            print(f"Error migrating {legacy_path.name}: {e}")
+            summary["failed"].append(user_id)
+
+    return summary
+
+
+class ProfileSession:
+    """
+    Unit of work for one user's profile during a single request.
+
+    The profile is loaded from the store on first access and the same object is
+    handed to every caller. save_profile only marks the session as needing a write;
+    flush() writes once, as a patch of the top-level fields that actually changed.
+    Tools of one turn may run concurrently in executor threads, so access is locked.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.profile: Optional[Dict] = None
+        self.loaded_version: Optional[Hashable] = None
+        self.dirty_fields: Set[str] = set()
+        self.conflicting_fields: Set[str] = set()
+        self.stats = {"load_calls": 0, "save_calls": 0, "store_loads": 0, "store_saves": 0, "conflicts": 0}
+        self._baseline: Dict = {}
+        self._save_requested = False
+        self._token = None
+        self._lock = threading.RLock()
+
+    def get(self) -> Dict:
+        """Return the shared profile, loading it from the store the first time."""
+        with self._lock:
+            self.stats["load_calls"] += 1
+            if self.profile is None:
+                # Version first: a concurrent write can only make us see a conflict, never miss one
+                self.loaded_version = get_backend().stamp(self.user_id)
+                self.profile = _load_from_store(self.user_id)
+                self._baseline = copy.deepcopy(self.profile)
+                self.stats["store_loads"] += 1
+            return self.profile
+
+    def put(self, profile_data: Dict) -> None:
+        """Record a save request; the actual write happens in flush()."""
+        with self._lock:
+            self.stats["save_calls"] += 1
+            self.profile = profile_data
+            self._save_requested = True
+            self.dirty_fields |= self._changed_fields()
+
+    def patch(self, changes: Dict[str, Any]) -> None:
+        """Apply dotted-path changes to the shared profile as one locked read-modify-write."""
+        with self._lock:
+            self.put(apply_patch(self.get(), changes))
+
+    def _changed_fields(self) -> Set[str]:
+        """Top-level fields that differ from what was last loaded/written."""
+        if self.profile is None:
+            return set()
+        keys = set(self.profile) | set(self._baseline)
+        return {
+            k for k in keys
+            if k not in METADATA_FIELDS and self.profile.get(k) != self._baseline.get(k)
+        }
+
+    def flush(self) -> bool:
+        """
+        Write the profile back if anything was saved and changed.
+
+        Returns:
+            True if nothing needed writing or the write succeeded, False on error
+        """
+        with self._lock:
+            return self._flush()
+
+    def _flush(self) -> bool:
+        """flush() body; caller holds the session lock."""
+        if not self._save_requested or self.profile is None:
+            return True
+
+        self.dirty_fields |= self._changed_fields()
+        if not self.dirty_fields:
+            self._save_requested = False
+            return True
+
+        # Write only the top-level fields that changed during the turn
+        changed = {k: self.profile[k] for k in self.dirty_fields if k in self.profile}
+        removed = [k for k in self.dirty_fields if k not in self.profile]
+
+        backend = get_backend()
+        try:
+            with backend.lock(self.user_id):
+                self._check_conflicts(backend)
+                ok = _patch_store(self.user_id, changed, removed)
+                if ok:
+                    self.loaded_version = backend.stamp(self.user_id)
+        except Exception as e:
+            print(f"Error flushing profile session for user {self.user_id}: {e}")
+            ok = False
+
+        if ok:
+            self.stats["store_saves"] += 1
+            self._baseline = copy.deepcopy(self.profile)
+            self.dirty_fields = set()
+            self._save_requested = False
+        return ok
+
+    def _check_conflicts(self, backend: ProfileBackend) -> None:
+        """
+        Optimistic check (caller holds the user lock): if the stored profile moved on
+        since it was loaded, find dirty fields another request also changed.
+        Fields only the other request touched are preserved by the patch;
+        for overlapping fields this turn's values win and the overlap is reported.
+        """
+        if backend.stamp(self.user_id) == self.loaded_version:
+            return
+
+        current = backend.read(self.user_id) or {}
+        overlap = {
+            k for k in self.dirty_fields
+            if current.get(k) != self._baseline.get(k) and current.get(k) != self.profile.get(k)
+        }
+        if overlap:
+            self.conflicting_fields |= overlap
+            self.stats["conflicts"] += 1
+            print(f"[CONFLICT] {ProfileConflictError(self.user_id, overlap)} - keeping this turn's values")
+
+
+def begin_profile_session(user_id: str) -> ProfileSession:
+    """
+    Start a request-scoped profile session in the current context.
+    Must be paired with end_profile_session().
+    """
+    session = ProfileSession(user_id)
+    session._token = _active_session.set(session)
+    return session
+
+
+def end_profile_session(session: ProfileSession) -> Dict:
+    """
+    Flush and close a profile session.
+
+    Returns:
+        The session's I/O counters (also added to the process-wide totals)
+    """
+    global _last_session_stats
+    try:
+        session.flush()
+    finally:
+        if session._token is not None:
+            _active_session.reset(session._token)
+            session._token = None
+
+    _session_totals["sessions"] += 1
+    for key, value in session.stats.items():
+        _session_totals[key] += value
+    _last_session_stats = {"user_id": session.user_id, **session.stats}
+    return session.stats
+
+
+@contextmanager
+def profile_session(user_id: str):
     """
-    profile_path = get_profile_path(user_id)
-    return profile_path.exists()
+    Context manager form of begin/end_profile_session.
+
+    Example:
+        with profile_session(user_id) as session:
+            run_tools()
+        print(session.stats)
+    """
+    session = begin_profile_session(user_id)
+    try:
+        yield session
+    finally:
+        end_profile_session(session)
+
+
+def get_current_user_id(default: str = "default_user") -> str:
+    """
+    User the current request is for.
+
+    Prefers the active profile session (a contextvar, so concurrent requests never see
+    each other's user) and falls back to the CURRENT_USER_ID environment variable.
+    """
+    session = _active_session.get()
+    if session is not None:
+        return session.user_id
+    return os.environ.get('CURRENT_USER_ID', default)
+
+
+@asynccontextmanager
+async def user_turn_lock(user_id: str):
+    """
+    Serialize async work for one user within this process (e.g. double-submitted
+    /chat requests). Locks are dropped once nobody holds or waits for them.
+    """
+    entry = _turn_locks.get(user_id)
+    if entry is None:
+        entry = _turn_locks[user_id] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            _turn_locks.pop(user_id, None)
+
+
+def get_profile_io_stats() -> Dict:
+    """Profile I/O counters: session totals, the most recent session, and the profile cache."""
+    return {
+        "totals": dict(_session_totals),
+        "last_session": dict(_last_session_stats),
+        "cache": _cache.stats()
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile store maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Import legacy artifacts/*.py profiles")
+    migrate_parser.add_argument("--backend", choices=["json", "sqlite"], default=PROFILE_BACKEND)
+    migrate_parser.add_argument("--overwrite", action="store_true", help="Replace profiles already in the store")
+    migrate_parser.add_argument("--remove-legacy", action="store_true", help="Delete .py files after migrating")
+
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        set_backend(create_backend(args.backend, ARTIFACTS_DIR))
+        result = migrate_legacy_profiles(overwrite=args.overwrite, remove_legacy=args.remove_legacy)
+        print(f"Backend: {result['backend']}")
+        print(f"Migrated: {len(result['migrated'])}  Skipped: {len(result['skipped'])}  Failed: {len(result['failed'])}")
+        for user_id in result["failed"]:
+            print(f"  ✗ {user_id}")
+        sys.exit(1 if result["failed"] else 0)
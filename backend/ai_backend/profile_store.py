@@ -0,0 +1,736 @@
+"""
+Profile Store - Pluggable storage backends for user profiles
+
+Profiles used to be pretty-printed into artifacts/user_{user_id}_profile.py and
+re-imported on every read. This module replaces that with keyed local stores:
+
+- JsonProfileBackend:   one schema-versioned JSON document per user
+- SQLiteProfileBackend: a single SQLite database keyed by user_id
+
+Both store the same encoded payload ({"schema_version": ..., "user_id": ..., "profile": {...}}),
+so profiles can be moved between backends without conversion. The original user_id is
+kept in the payload because the JSON backend's filenames are sanitized (safe_user_id).
+LegacyProfileReader parses the old .py files (without executing them) for migration.
+
+Small changes go through append_patch(): field-level deltas are appended to a
+per-user log (JSON backend) or patch table (SQLite) and periodically compacted,
+so a one-field update costs about as much as the field, not the whole profile.
+
+ProfileCache is a process-wide LRU of parsed profiles. Entries are validated
+against a cheap backend stamp (file stat / row version), so a profile rewritten
+by another worker process is picked up without re-reading unchanged ones.
+"""
+
+import ast
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# Bump when the encoded payload layout changes
+SCHEMA_VERSION = 1
+
+
+class ProfileConflictError(Exception):
+    """Raised when a profile changed in the store since the caller loaded it."""
+
+    def __init__(self, user_id: str, fields: Iterable[str] = ()):
+        self.user_id = user_id
+        self.fields = sorted(fields)
+        detail = f" (fields: {', '.join(self.fields)})" if self.fields else ""
+        super().__init__(f"Profile for user {user_id} was modified concurrently{detail}")
+
+
+def safe_user_id(user_id: str) -> str:
+    """Make a user_id filesystem-safe (same rule the .py profile files used)."""
+    return user_id.replace("/", "_").replace("\\", "_")
+
+
+def encode_profile(profile: Dict, user_id: Optional[str] = None) -> bytes:
+    """
+    Encode a profile into the schema-versioned storage format.
+
+    Args:
+        profile: Profile dictionary
+        user_id: Owner of the profile, stored unsanitized
+
+    Returns:
+        Compact UTF-8 JSON bytes
+    """
+    payload = {"schema_version": SCHEMA_VERSION, "profile": profile}
+    if user_id is not None:
+        payload["user_id"] = user_id
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def decode_profile(data: bytes) -> Dict:
+    """
+    Decode a stored profile payload.
+
+    Args:
+        data: Bytes produced by encode_profile
+
+    Returns:
+        Profile dictionary
+
+    Raises:
+        ValueError: If the payload was written by a newer schema version
+    """
+    payload = json.loads(data)
+    schema_version = payload.get("schema_version", 0)
+    if schema_version > SCHEMA_VERSION:
+        raise ValueError(f"Profile schema version {schema_version} is newer than supported ({SCHEMA_VERSION})")
+    return payload["profile"]
+
+
+def apply_patch(profile: Dict, changes: Dict[str, Any], removed: Iterable[str] = ()) -> Dict:
+    """
+    Apply field-level changes to a profile in place.
+
+    Keys are dotted paths ("mainContact.email", "insureds.0.passport"). Numeric
+    segments index into lists; missing list slots and dicts are created on the way,
+    matching how fill_information has always mapped extracted fields.
+
+    Args:
+        profile: Profile dictionary to modify
+        changes: Mapping of dotted path -> new value
+        removed: Dotted paths to delete
+
+    Returns:
+        The same profile dictionary
+    """
+    for path, value in changes.items():
+        parts = path.split(".")
+        current = profile
+        for part in parts[:-1]:
+            if part.isdigit():  # Array index
+                idx = int(part)
+                while idx >= len(current):
+                    current.append({})
+                current = current[idx]
+            else:
+                if not isinstance(current.get(part), (dict, list)):
+                    current[part] = {}
+                current = current[part]
+        last = parts[-1]
+        if last.isdigit() and isinstance(current, list):
+            idx = int(last)
+            while idx >= len(current):
+                current.append({})
+            current[idx] = value
+        else:
+            current[last] = value
+
+    for path in removed:
+        parts = path.split(".")
+        current = profile
+        try:
+            for part in parts[:-1]:
+                current = current[int(part)] if part.isdigit() else current[part]
+            if isinstance(current, dict):
+                current.pop(parts[-1], None)
+        except (KeyError, IndexError, TypeError):
+            continue
+
+    return profile
+
+
+def _encode_patch(changes: Dict[str, Any], removed: Iterable[str] = ()) -> bytes:
+    entry = {"set": changes}
+    removed = list(removed)
+    if removed:
+        entry["unset"] = removed
+    return json.dumps(entry, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _replay_patch(profile: Optional[Dict], entry: Dict) -> Optional[Dict]:
+    if "replace" in entry:
+        return entry["replace"]
+    if profile is None:
+        return None
+    return apply_patch(profile, entry.get("set", {}), entry.get("unset", ()))
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write a file via a temp file + fsync + rename, so readers never see a torn file."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+class UserLocks:
+    """
+    Per-user exclusive lock that works across threads and processes.
+
+    In-process: one RLock per user (re-entrant, so a write path may nest).
+    Cross-process: fcntl.flock on {lock_dir}/user_{user_id}.lock, taken by the
+    outermost holder only and released when it exits.
+    """
+
+    def __init__(self, lock_dir: Path):
+        self.lock_dir = Path(lock_dir)
+        self._locks: Dict[str, threading.RLock] = {}
+        self._guard = threading.Lock()
+        self._depth: Dict[str, int] = {}
+        self._fds: Dict[str, int] = {}
+
+    def _rlock(self, user_id: str) -> threading.RLock:
+        with self._guard:
+            lock = self._locks.get(user_id)
+            if lock is None:
+                lock = self._locks[user_id] = threading.RLock()
+            return lock
+
+    @contextmanager
+    def hold(self, user_id: str):
+        """Hold the user's lock for the duration of the with-block."""
+        rlock = self._rlock(user_id)
+        with rlock:
+            # Only the owning thread reaches here, so depth/fd bookkeeping is safe
+            depth = self._depth.get(user_id, 0)
+            if depth == 0 and fcntl is not None:
+                self.lock_dir.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.lock_dir / f"user_{safe_user_id(user_id)}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                self._fds[user_id] = fd
+            self._depth[user_id] = depth + 1
+            try:
+                yield
+            finally:
+                self._depth[user_id] -= 1
+                if self._depth[user_id] == 0:
+                    del self._depth[user_id]
+                    fd = self._fds.pop(user_id, None)
+                    if fd is not None:
+                        fcntl.flock(fd, fcntl.LOCK_UN)
+                        os.close(fd)
+
+
+class ProfileBackend:
+    """
+    Base class for profile storage backends.
+    Backends only move profiles in and out; defaults and metadata live in profile_manager.
+    """
+
+    name = "base"
+    locks: UserLocks
+
+    def lock(self, user_id: str):
+        """
+        Exclusive per-user lock (re-entrant within a thread, advisory across processes).
+        Hold it around read-check-write sequences.
+        """
+        return self.locks.hold(user_id)
+
+    def read(self, user_id: str) -> Optional[Dict]:
+        """Return the stored profile, or None if the user has no profile."""
+        raise NotImplementedError
+
+    def write(self, user_id: str, profile: Dict) -> Hashable:
+        """Store (insert or replace) a user's profile. Returns the stamp of the written record."""
+        raise NotImplementedError
+
+    def append_patch(self, user_id: str, changes: Dict[str, Any], removed: Iterable[str] = ()) -> Hashable:
+        """
+        Apply field-level changes (see apply_patch) to an existing profile.
+        Backends override this to avoid rewriting the whole profile.
+
+        Returns:
+            Stamp of the updated record
+        """
+        with self.lock(user_id):
+            profile = self.read(user_id)
+            if profile is None:
+                raise KeyError(f"No stored profile for user {user_id}")
+            return self.write(user_id, apply_patch(profile, changes, removed))
+
+    def compact(self, user_id: str) -> None:
+        """Fold pending patches into the stored profile (no-op by default)."""
+
+    def stamp(self, user_id: str) -> Optional[Hashable]:
+        """
+        Cheap change token for a stored profile (None if absent).
+        Any write, from any process, must produce a different stamp.
+        """
+        raise NotImplementedError
+
+    def delete(self, user_id: str) -> bool:
+        """Delete a user's profile. Returns True if something was removed."""
+        raise NotImplementedError
+
+    def exists(self, user_id: str) -> bool:
+        """Check whether a profile is stored for the user."""
+        raise NotImplementedError
+
+    def user_ids(self) -> List[str]:
+        """List all user_ids with a stored profile."""
+        raise NotImplementedError
+
+
+class JsonProfileBackend(ProfileBackend):
+    """
+    Stores each profile as a snapshot plus an append-only patch log:
+
+        {root}/user_{user_id}.json             snapshot (replaced atomically)
+        {root}/user_{user_id}.log              JSON-lines patches, appended with O_APPEND
+        {root}/user_{user_id}.log.compacting   log being folded into the snapshot
+
+    Reads replay snapshot -> compacting -> log. Patches only set/unset paths, so
+    replaying a log that was already folded into the snapshot is harmless; this is
+    what lets compaction swap the snapshot before removing the folded log.
+    """
+
+    name = "json"
+
+    def __init__(self, root: Path, compact_bytes: int = 64 * 1024):
+        self.root = Path(root)
+        self.compact_bytes = compact_bytes
+        self.locks = UserLocks(self.root)
+
+    def _path(self, user_id: str) -> Path:
+        return self.root / f"user_{safe_user_id(user_id)}.json"
+
+    def _log_path(self, user_id: str) -> Path:
+        return self.root / f"user_{safe_user_id(user_id)}.log"
+
+    def _compacting_path(self, user_id: str) -> Path:
+        return self.root / f"user_{safe_user_id(user_id)}.log.compacting"
+
+    @staticmethod
+    def _replay_log(path: Path, profile: Optional[Dict]) -> Optional[Dict]:
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            return profile
+        for line in raw.split(b"\n"):
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Torn tail from a crashed writer
+                continue
+            profile = _replay_patch(profile, entry)
+        return profile
+
+    def _read_snapshot(self, user_id: str) -> Optional[Dict]:
+        try:
+            data = self._path(user_id).read_bytes()
+        except FileNotFoundError:
+            return None
+        return decode_profile(data)
+
+    def read(self, user_id: str) -> Optional[Dict]:
+        profile = self._read_snapshot(user_id)
+        profile = self._replay_log(self._compacting_path(user_id), profile)
+        return self._replay_log(self._log_path(user_id), profile)
+
+    def _append(self, user_id: str, line: bytes) -> int:
+        """Append one log line; returns the log size afterwards."""
+        fd = os.open(self._log_path(user_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line + b"\n")
+            return os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+    def write(self, user_id: str, profile: Dict) -> Hashable:
+        with self.lock(user_id):
+            self.root.mkdir(parents=True, exist_ok=True)
+            if self._log_path(user_id).exists() or self._compacting_path(user_id).exists():
+                # Pending patches would be replayed on top of a new snapshot, so log
+                # the full profile instead and fold everything right away.
+                entry = {"replace": profile}
+                self._append(user_id, json.dumps(entry, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+                self.compact(user_id)
+            else:
+                _atomic_write(self._path(user_id), encode_profile(profile, user_id))
+            return self.stamp(user_id)
+
+    def append_patch(self, user_id: str, changes: Dict[str, Any], removed: Iterable[str] = ()) -> Hashable:
+        with self.lock(user_id):
+            if not self._path(user_id).exists():
+                return super().append_patch(user_id, changes, removed)
+            log_size = self._append(user_id, _encode_patch(changes, removed))
+            if log_size > self.compact_bytes:
+                self.compact(user_id)
+            return self.stamp(user_id)
+
+    def compact(self, user_id: str) -> None:
+        with self.lock(user_id):
+            log_path = self._log_path(user_id)
+            compacting_path = self._compacting_path(user_id)
+            if not compacting_path.exists():
+                if not log_path.exists():
+                    return
+                # New appends go to a fresh log while this one is folded
+                os.replace(log_path, compacting_path)
+
+            profile = self._replay_log(compacting_path, self._read_snapshot(user_id))
+            if profile is not None:
+                _atomic_write(self._path(user_id), encode_profile(profile, user_id))
+            compacting_path.unlink()
+
+    @staticmethod
+    def _stat_stamp(path: Path) -> Optional[Hashable]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def stamp(self, user_id: str) -> Optional[Hashable]:
+        snapshot = self._stat_stamp(self._path(user_id))
+        if snapshot is None:
+            return None
+        return (
+            snapshot,
+            self._stat_stamp(self._compacting_path(user_id)),
+            self._stat_stamp(self._log_path(user_id))
+        )
+
+    def delete(self, user_id: str) -> bool:
+        with self.lock(user_id):
+            deleted = False
+            for path in (self._path(user_id), self._compacting_path(user_id), self._log_path(user_id)):
+                if path.exists():
+                    path.unlink()
+                    deleted = True
+            return deleted
+
+    def exists(self, user_id: str) -> bool:
+        return self._path(user_id).exists()
+
+    def user_ids(self) -> List[str]:
+        """Original user_ids from the snapshots (filename stem for snapshots written without one)."""
+        if not self.root.exists():
+            return []
+        user_ids = []
+        for path in self.root.glob("user_*.json"):
+            try:
+                user_id = json.loads(path.read_bytes()).get("user_id")
+            except (OSError, ValueError):
+                user_id = None
+            user_ids.append(user_id or path.stem[len("user_"):])
+        return sorted(user_ids)
+
+
+class SQLiteProfileBackend(ProfileBackend):
+    """
+    Stores profiles in a single SQLite database (tables: profiles, profile_patches).
+    Patches are inserted as small rows and folded into the profile row every
+    `compact_every` patches, inside the same transaction.
+    One connection per thread; SQLite serializes the writes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: Path, compact_every: int = 50):
+        self.db_path = Path(db_path)
+        self.compact_every = compact_every
+        self.locks = UserLocks(self.db_path.with_name(self.db_path.name + ".locks"))
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS profiles (
+                        user_id TEXT PRIMARY KEY,
+                        schema_version INTEGER NOT NULL,
+                        data BLOB NOT NULL,
+                        version INTEGER NOT NULL DEFAULT 0
+                    )
+                """)
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(profiles)")}
+                if "version" not in columns:
+                    conn.execute("ALTER TABLE profiles ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS profile_patches (
+                        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id TEXT NOT NULL,
+                        data BLOB NOT NULL
+                    )
+                """)
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS profile_patches_user_seq ON profile_patches (user_id, seq)"
+                )
+                conn.commit()
+                self._initialized = True
+        return conn
+
+    @staticmethod
+    def _read_in(conn: sqlite3.Connection, user_id: str) -> Optional[Dict]:
+        row = conn.execute(
+            "SELECT data FROM profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if not row:
+            return None
+        profile = decode_profile(row[0])
+        patches = conn.execute(
+            "SELECT data FROM profile_patches WHERE user_id = ? ORDER BY seq", (user_id,)
+        ).fetchall()
+        for (data,) in patches:
+            profile = _replay_patch(profile, json.loads(data))
+        return profile
+
+    @staticmethod
+    def _write_in(conn: sqlite3.Connection, user_id: str, profile: Dict) -> None:
+        conn.execute(
+            """
+            INSERT INTO profiles (user_id, schema_version, data, version) VALUES (?, ?, ?, 1)
+            ON CONFLICT(user_id) DO UPDATE SET
+                schema_version = excluded.schema_version,
+                data = excluded.data,
+                version = profiles.version + 1
+            """,
+            (user_id, SCHEMA_VERSION, encode_profile(profile))
+        )
+        conn.execute("DELETE FROM profile_patches WHERE user_id = ?", (user_id,))
+
+    @staticmethod
+    def _stamp_in(conn: sqlite3.Connection, user_id: str) -> Optional[Hashable]:
+        row = conn.execute(
+            """
+            SELECT version, (SELECT MAX(seq) FROM profile_patches WHERE user_id = profiles.user_id)
+            FROM profiles WHERE user_id = ?
+            """,
+            (user_id,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def read(self, user_id: str) -> Optional[Dict]:
+        return self._read_in(self._conn(), user_id)
+
+    def write(self, user_id: str, profile: Dict) -> Hashable:
+        conn = self._conn()
+        with conn:
+            self._write_in(conn, user_id, profile)
+            return self._stamp_in(conn, user_id)
+
+    def append_patch(self, user_id: str, changes: Dict[str, Any], removed: Iterable[str] = ()) -> Hashable:
+        conn = self._conn()
+        with conn:
+            if not conn.execute("SELECT 1 FROM profiles WHERE user_id = ?", (user_id,)).fetchone():
+                raise KeyError(f"No stored profile for user {user_id}")
+            conn.execute(
+                "INSERT INTO profile_patches (user_id, data) VALUES (?, ?)",
+                (user_id, _encode_patch(changes, removed))
+            )
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM profile_patches WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+            if pending >= self.compact_every:
+                self._write_in(conn, user_id, self._read_in(conn, user_id))
+            return self._stamp_in(conn, user_id)
+
+    def compact(self, user_id: str) -> None:
+        conn = self._conn()
+        with conn:
+            profile = self._read_in(conn, user_id)
+            if profile is not None:
+                self._write_in(conn, user_id, profile)
+
+    def stamp(self, user_id: str) -> Optional[Hashable]:
+        return self._stamp_in(self._conn(), user_id)
+
+    def delete(self, user_id: str) -> bool:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM profile_patches WHERE user_id = ?", (user_id,))
+            cur = conn.execute("DELETE FROM profiles WHERE user_id = ?", (user_id,))
+        return cur.rowcount > 0
+
+    def exists(self, user_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row is not None
+
+    def user_ids(self) -> List[str]:
+        rows = self._conn().execute("SELECT user_id FROM profiles ORDER BY user_id").fetchall()
+        return [r[0] for r in rows]
+
+
+class LegacyProfileReader:
+    """
+    Reads the old artifacts/user_{user_id}_profile.py files.
+    The PROFILE literal is parsed with ast.literal_eval instead of being executed.
+    """
+
+    def __init__(self, artifacts_dir: Path):
+        self.artifacts_dir = Path(artifacts_dir)
+
+    def path(self, user_id: str) -> Path:
+        return self.artifacts_dir / f"user_{safe_user_id(user_id)}_profile.py"
+
+    def read(self, user_id: str) -> Optional[Dict]:
+        path = self.path(user_id)
+        if not path.exists():
+            return None
+        return self.read_file(path)
+
+    @staticmethod
+    def read_file(path: Path) -> Dict:
+        """
+        Parse the PROFILE constant out of a legacy profile file.
+
+        Raises:
+            ValueError: If the file has no PROFILE literal
+        """
+        tree = ast.parse(Path(path).read_text(encoding="utf-8"), filename=str(path))
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and any(
+                isinstance(t, ast.Name) and t.id == "PROFILE" for t in node.targets
+            ):
+                return ast.literal_eval(node.value)
+        raise ValueError(f"Profile file {path} does not contain PROFILE constant")
+
+    def user_ids(self) -> List[str]:
+        """Sanitized ids from the filenames; the original is the PROFILE's user_id field."""
+        if not self.artifacts_dir.exists():
+            return []
+        return sorted(
+            p.name[len("user_"):-len("_profile.py")]
+            for p in self.artifacts_dir.glob("user_*_profile.py")
+        )
+
+
+class ProfileCache:
+    """
+    Thread-safe LRU of parsed profiles, bounded by entry count and approximate bytes.
+
+    Each entry holds a pickled snapshot of the profile: unpickling is several times
+    cheaper than decoding JSON and hands every caller its own copy, so mutations
+    by one tool never leak into the cache.
+    Entries carry the backend stamp they were read/written at plus a version
+    counter bumped on every save through this process.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str, stamp: Hashable) -> Optional[Dict]:
+        """Return a copy of the cached profile if it is still at `stamp`, else None."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry["stamp"] != stamp:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            blob = entry["blob"]
+        return pickle.loads(blob)
+
+    def put(self, user_id: str, profile: Dict, stamp: Hashable, bump_version: bool = False) -> int:
+        """
+        Cache a profile snapshot at `stamp`.
+
+        Args:
+            user_id: The user's unique identifier
+            profile: Profile dictionary (copied, not referenced)
+            stamp: Backend stamp the snapshot corresponds to
+            bump_version: True when the snapshot comes from a save
+
+        Returns:
+            The entry's version
+        """
+        blob = pickle.dumps(profile, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            old = self._entries.pop(user_id, None)
+            version = old["version"] if old else 0
+            if old:
+                self._bytes -= len(old["blob"])
+            if bump_version:
+                version += 1
+            if len(blob) > self.max_bytes:
+                return version
+            self._entries[user_id] = {"blob": blob, "stamp": stamp, "version": version}
+            self._bytes += len(blob)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted["blob"])
+                self.evictions += 1
+        return version
+
+    def version(self, user_id: str) -> int:
+        """Current version of a cached entry (0 if not cached)."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry["version"] if entry else 0
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's entry."""
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+            if entry:
+                self._bytes -= len(entry["blob"])
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters and current size."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def create_backend(kind: str, root: Path) -> ProfileBackend:
+    """
+    Create a profile backend by name.
+
+    Args:
+        kind: "json" or "sqlite"
+        root: Directory the backend keeps its files in
+
+    Returns:
+        ProfileBackend instance
+    """
+    root = Path(root)
+    if kind == "json":
+        return JsonProfileBackend(root / "profiles", compact_bytes=int(os.getenv("PROFILE_LOG_COMPACT_BYTES", str(64 * 1024))))
+    if kind == "sqlite":
+        return SQLiteProfileBackend(root / "profiles.sqlite3", compact_every=int(os.getenv("PROFILE_PATCH_COMPACT_EVERY", "50")))
+    raise ValueError(f"Unknown profile backend: {kind!r} (expected 'json' or 'sqlite')")
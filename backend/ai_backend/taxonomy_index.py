@@ -0,0 +1,153 @@
+"""
+Taxonomy Index - in-memory coverage index over the filled taxonomy
+
+select_best_plan used to json.load the 1.7 MB taxonomy_data.json on every call and
+walk all ~255 conditions. The index is built once per file version instead:
+
+- every condition/benefit name is interned to a bit position (in taxonomy order)
+- each product gets an int bitset of the names it covers (condition_exist or
+  benefit_exist is True in any layer)
+- a set of needs becomes a bitmask, and matching a product is `coverage & mask`
+
+The file's mtime is checked on each access and the index is rebuilt when it changes
+(e.g. after run_retrieval.py re-fills the taxonomy), without restarting the app.
+
+Usage:
+    index = get_taxonomy_index()
+    index.match(["age_eligibility", "cruise_cover"])
+    -> {"Product A": ["age_eligibility"], "Product B": [...], ...}
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+TAXONOMY_PATH = Path(os.getenv(
+    "TAXONOMY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents", "rag_agent", "taxonomy_data.json")
+))
+
+
+def is_covered(product_info: Dict) -> bool:
+    """True if a filled cell says the product has this condition/benefit (placeholders do not count)."""
+    return isinstance(product_info, dict) and (
+        product_info.get("condition_exist") is True or product_info.get("benefit_exist") is True
+    )
+
+
+class TaxonomyIndex:
+    """Read-only index built from one taxonomy dict; replaced as a whole on reload."""
+
+    def __init__(self, taxonomy: Dict):
+        self.taxonomy = taxonomy
+        self.products: List[str] = list(taxonomy.get("products", []))
+        self.names: List[str] = []            # bit position -> name
+        self.name_ids: Dict[str, int] = {}    # name -> bit position
+        self.coverage: Dict[str, int] = {product: 0 for product in self.products}
+
+        for conditions in taxonomy.get("layers", {}).values():
+            for item in conditions:
+                name = item.get("condition") or item.get("benefit_name", "")
+                bit = 1 << self._intern(name)
+                for product, product_info in item.get("products", {}).items():
+                    if product not in self.coverage:
+                        self.products.append(product)
+                        self.coverage[product] = 0
+                    if is_covered(product_info):
+                        self.coverage[product] |= bit
+
+    def _intern(self, name: str) -> int:
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.name_ids[name] = name_id
+            self.names.append(name)
+        return name_id
+
+    def needs_mask(self, needs: Iterable[str]) -> int:
+        """Bitmask of the needs that name a taxonomy condition/benefit (others are ignored)."""
+        mask = 0
+        for need in needs:
+            name_id = self.name_ids.get(need)
+            if name_id is not None:
+                mask |= 1 << name_id
+        return mask
+
+    def names_in(self, mask: int) -> List[str]:
+        """Names of the bits set in mask, in taxonomy order."""
+        names = []
+        while mask:
+            low_bit = mask & -mask
+            names.append(self.names[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return names
+
+    def match(self, needs: Iterable[str]) -> Dict[str, List[str]]:
+        """Matched needs per product."""
+        mask = self.needs_mask(needs)
+        return {product: self.names_in(self.coverage[product] & mask) for product in self.products}
+
+    def match_counts(self, needs: Iterable[str]) -> Dict[str, int]:
+        """Number of matched needs per product."""
+        mask = self.needs_mask(needs)
+        return {product: (self.coverage[product] & mask).bit_count() for product in self.products}
+
+
+class TaxonomyIndexLoader:
+    """Holds the index for one taxonomy file and rebuilds it when the file changes."""
+
+    def __init__(self, path: Path = TAXONOMY_PATH):
+        self.path = Path(path)
+        self.index: Optional[TaxonomyIndex] = None
+        self._mtime_ns: Optional[int] = None
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "reloads": 0, "reload_errors": 0}
+
+    def get(self) -> TaxonomyIndex:
+        """
+        Current index, rebuilt first if the file changed since the last build.
+
+        Raises:
+            FileNotFoundError / ValueError: if the taxonomy has never been loaded successfully
+        """
+        self.stats["lookups"] += 1
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            if self.index is None:
+                raise
+            return self.index
+
+        if mtime_ns != self._mtime_ns:
+            with self._lock:
+                if mtime_ns != self._mtime_ns:
+                    try:
+                        with open(self.path, "r") as f:
+                            index = TaxonomyIndex(json.load(f))
+                        self.index = index
+                        self._mtime_ns = mtime_ns
+                        self.stats["reloads"] += 1
+                        print(f"[TAXONOMY] Indexed {len(index.names)} conditions for {len(index.products)} products")
+                    except (OSError, ValueError) as e:
+                        # Keep serving the previous version (e.g. while the file is being rewritten)
+                        self.stats["reload_errors"] += 1
+                        print(f"[TAXONOMY] Could not read {self.path}: {e}")
+                        if self.index is None:
+                            raise
+        return self.index
+
+
+_loaders: Dict[str, TaxonomyIndexLoader] = {}
+_loaders_lock = threading.Lock()
+
+
+def get_taxonomy_index(path: Optional[str] = None) -> TaxonomyIndex:
+    """Process-wide index for a taxonomy file (default: TAXONOMY_PATH)."""
+    key = str(path or TAXONOMY_PATH)
+    loader = _loaders.get(key)
+    if loader is None:
+        with _loaders_lock:
+            loader = _loaders.setdefault(key, TaxonomyIndexLoader(Path(key)))
+    return loader.get()
@@ -0,0 +1,236 @@
+"""
+Taxonomy Search - in-memory inverted index over the filled taxonomy
+
+First tier of answer_policy_question: questions are matched against every taxonomy
+condition/benefit (its name and the policy wording extracted for each product, i.e.
+original_text) without any network call. Each item is one document, ranked by BM25
+over the wording plus NAME_BOOST x IDF for every question term in the item's name.
+
+confidence is the share of the question's terms (weighted by IDF) that the best match
+contains: fully when the term is in its name, TEXT_MATCH_CREDIT when it only appears
+in the wording. Terms found nowhere in the taxonomy keep full weight, so questions
+about things the taxonomy does not cover come out low and go to the RAG tier. Two
+guards stop generic overlap from looking confident:
+- a hit whose name shares no term with the question has confidence 0
+- a hit that misses the question's rarest term (highest IDF) has its confidence
+  scaled by RAREST_MISS_CREDIT ("period of insurance" is not about previous insurance)
+
+TIER1_MIN_CONFIDENCE is the confidence at which answer_policy_question answers from
+the taxonomy; it is tuned against the labelled questions in test_taxonomy_search.py.
+
+Built once per taxonomy version, alongside the taxonomy index (taxonomy_index.py).
+
+Usage:
+    search = get_taxonomy_search()
+    search.search("is pre-existing medical condition covered", k=3)
+    search.describe(hit, products=["Product B"])
+"""
+
+import os
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from plan_comparison import EXCLUSION_TYPES
+from plan_scoring import parse_limit
+from taxonomy_index import TAXONOMY_PATH, TaxonomyIndex, get_taxonomy_index, is_covered
+
+# Tier 1 answers when its best match reaches this confidence (midway between the
+# labelled tier-1 and RAG questions in test_taxonomy_search.py)
+TIER1_MIN_CONFIDENCE = float(os.getenv("QUERY_TIER1_MIN_CONFIDENCE", "0.45"))
+
+NAME_BOOST = 2.0
+TEXT_MATCH_CREDIT = 0.5
+RAREST_MISS_CREDIT = 0.5
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Question words plus words every policy uses ("covered", "claim"), which say nothing about the topic
+STOPWORDS = {
+    "a", "about", "am", "an", "and", "any", "are", "as", "at", "be", "by", "can", "do", "doe",
+    "for", "from", "get", "happen", "have", "how", "i", "if", "in", "is", "it", "make", "me",
+    "much", "my", "of", "on", "or", "our", "pay", "should", "the", "there", "this", "to", "under",
+    "us", "we", "what", "when", "which", "while", "who", "will", "with", "would", "you", "your"
+}
+DOMAIN_STOPWORDS = {
+    "benefit", "claim", "cover", "coverage", "covered", "exclude", "excluded", "exclusion",
+    "insurance", "insured", "insurer", "limit", "plan", "policie", "policy", "product"
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_SENTENCE = re.compile(r"(?<=[.;:!?])\s+|\n+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords and single letters; plural "s" stripped."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        if len(token) < 2 or token in STOPWORDS or token in DOMAIN_STOPWORDS:
+            continue
+        tokens.append(token)
+    return tokens
+
+
+class TaxonomySearchIndex:
+    """BM25 inverted index with one document per taxonomy condition/benefit."""
+
+    def __init__(self, index: TaxonomyIndex):
+        self.index = index
+        self.products = list(index.products)
+        self.documents: List[Dict] = []
+        self.postings: Dict[str, Dict[int, float]] = {}       # wording: term -> {doc: frequency}
+        self.name_postings: Dict[str, List[int]] = {}          # name: term -> docs
+
+        by_label: Dict[tuple, int] = {}
+        for layer, conditions in index.taxonomy.get("layers", {}).items():
+            for item in conditions:
+                if "condition" in item and "benefit_name" in item:
+                    label = f"{item['benefit_name']}: {item['condition']}"
+                else:
+                    label = item.get("condition") or item.get("benefit_name", "")
+                doc_id = by_label.get((layer, label))
+                if doc_id is None:
+                    doc_id = by_label[(layer, label)] = len(self.documents)
+                    if "condition" not in item:
+                        kind = "benefit"
+                    elif item.get("condition_type") in EXCLUSION_TYPES:
+                        kind = "exclusion"
+                    else:
+                        kind = "condition"
+                    self.documents.append({
+                        "name": label, "layer": layer, "kind": kind,
+                        "cells": {}, "terms": Counter(), "name_terms": set(tokenize(label.replace("_", " ")))
+                    })
+                document = self.documents[doc_id]
+
+                for product, product_info in item.get("products", {}).items():
+                    if not isinstance(product_info, dict):
+                        continue
+                    text = product_info.get("original_text") or ""
+                    cell = document["cells"].setdefault(product, {"covered": False, "limit": None, "text": ""})
+                    if is_covered(product_info):
+                        cell["covered"] = True
+                        if kind == "benefit":
+                            limit = parse_limit(product_info.get("parameters"))
+                            if limit is not None and (cell["limit"] is None or limit > cell["limit"]):
+                                cell["limit"] = limit
+                    if text and not cell["text"]:
+                        cell["text"] = text
+                        document["terms"].update(tokenize(text))
+
+        for doc_id, document in enumerate(self.documents):
+            document["length"] = sum(document["terms"].values())
+            for term, frequency in document["terms"].items():
+                self.postings.setdefault(term, {})[doc_id] = frequency
+            for term in document["name_terms"]:
+                self.name_postings.setdefault(term, []).append(doc_id)
+
+        n_docs = max(1, len(self.documents))
+        self.avg_length = sum(d["length"] for d in self.documents) / n_docs or 1.0
+        self.idf = {}
+        for term in set(self.postings) | set(self.name_postings):
+            n_containing = len(set(self.postings.get(term, ())) | set(self.name_postings.get(term, ())))
+            self.idf[term] = math.log(1 + (n_docs - n_containing + 0.5) / (n_containing + 0.5))
+        # Weight of a question term the taxonomy has never seen
+        self.unknown_idf = math.log(1 + (n_docs + 0.5) / 0.5)
+
+    def search(self, query: str, k: int = 3) -> List[Dict]:
+        """
+        Best matching taxonomy items for a question.
+
+        Returns:
+            Up to k hits, best first: {"doc_id", "name", "layer", "score", "confidence"}
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        scores: Dict[int, float] = {}
+        for term in terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, frequency in self.postings.get(term, {}).items():
+                length = self.documents[doc_id]["length"]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            for doc_id in self.name_postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + NAME_BOOST * idf
+
+        weights = {term: self.idf.get(term, self.unknown_idf) for term in terms}
+        total_weight = sum(weights.values())
+        rarest = max(terms, key=weights.get)
+        best = sorted(scores.items(), key=lambda item: -item[1])[:k]
+        hits = []
+        for doc_id, score in best:
+            document = self.documents[doc_id]
+            confidence = 0.0
+            if document["name_terms"].intersection(terms):
+                matched_weight = sum(
+                    weights[term] * (1.0 if term in document["name_terms"] else TEXT_MATCH_CREDIT)
+                    for term in terms if term in document["name_terms"] or term in document["terms"]
+                )
+                confidence = matched_weight / total_weight
+                if rarest not in document["name_terms"] and rarest not in document["terms"]:
+                    confidence *= RAREST_MISS_CREDIT
+            hits.append({
+                "doc_id": doc_id,
+                "name": document["name"],
+                "layer": document["layer"],
+                "score": round(score, 3),
+                "confidence": round(confidence, 3)
+            })
+        return hits
+
+    def describe(self, hit: Dict, query: str = "", products: Optional[List[str]] = None,
+                 snippet_chars: int = 300) -> Dict:
+        """
+        What each product's policy says about a hit.
+
+        Args:
+            hit: Result from search()
+            query: The question (picks the most relevant sentence of the wording)
+            products: Products to include (default: all)
+            snippet_chars: Maximum snippet length
+
+        Returns:
+            {"name", "layer", "kind", "products": {product: {"covered", "limit", "excerpt"}}}
+            kind is benefit, condition or exclusion (covered then means the exclusion applies)
+        """
+        document = self.documents[hit["doc_id"]]
+        terms = set(tokenize(query))
+        described = {}
+        for product in products or self.products:
+            cell = document["cells"].get(product, {"covered": False, "limit": None, "text": ""})
+            sentences = [s.strip() for s in _SENTENCE.split(cell["text"]) if s.strip()]
+            excerpt = max(sentences, key=lambda s: len(terms & set(tokenize(s))), default="")
+            described[product] = {
+                "covered": cell["covered"],
+                "limit": cell["limit"],
+                "excerpt": excerpt[:snippet_chars]
+            }
+        return {"name": document["name"], "layer": document["layer"], "kind": document["kind"], "products": described}
+
+
+_searches: Dict[str, TaxonomySearchIndex] = {}
+_searches_lock = threading.Lock()
+
+
+def get_taxonomy_search(path: Optional[str] = None) -> TaxonomySearchIndex:
+    """Process-wide search index for a taxonomy file, rebuilt whenever its taxonomy index is."""
+    key = str(path or TAXONOMY_PATH)
+    index = get_taxonomy_index(key)
+    search = _searches.get(key)
+    if search is None or search.index is not index:
+        with _searches_lock:
+            search = _searches.get(key)
+            if search is None or search.index is not index:
+                search = TaxonomySearchIndex(index)
+                _searches[key] = search
+    return search
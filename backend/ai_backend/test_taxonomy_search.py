@@ -0,0 +1,89 @@
+"""
+Labelled questions for the taxonomy tier of answer_policy_question
+
+TIER1_QUESTIONS should be answered from the taxonomy, by one of the listed items;
+RAG_QUESTIONS are about things the taxonomy does not record and must fall through to
+the RAG tier. Runs offline against the filled taxonomy_data.json.
+
+When changing tokenization, confidence or TIER1_MIN_CONFIDENCE, run:
+    python test_taxonomy_search.py
+and keep the threshold inside the printed separating range.
+"""
+
+from taxonomy_search import TIER1_MIN_CONFIDENCE, get_taxonomy_search
+
+# question -> acceptable best matches (item name, or the benefit part of "benefit: condition")
+TIER1_QUESTIONS = {
+    "is pre-existing medical condition covered": {"pre_existing_conditions", "pre-ex_critical_care"},
+    "what is the age limit for this policy": {"age_eligibility"},
+    "does the plan cover trip cancellation": {"trip_cancellation"},
+    "how much is covered for delayed baggage": {"delayed_baggage", "baggage_delay"},
+    "is terrorism covered": {"terrorism", "war_and_terrorism_exclusion"},
+    "what happens if my flight is overbooked": {"overbooked_flight"},
+    "are dental treatments excluded": {"dental_treatment_exclusion", "emergency_dental_expenses_accident"},
+    "does it cover kidnap": {"kidnap_and_hostage"},
+    "what is the limit for personal liability": {"personal_liability"},
+    "are pregnancy related conditions covered": {"pregnancy_related_conditions"},
+    "is mountaineering excluded": {"mountaineering_exclusion"},
+    "is medical evacuation and repatriation covered": {"emergency_medical_evacuation_repatriation"},
+    "is rental car excess covered": {"rental_vehicle_excess"},
+    "does the policy cover covid-19 quarantine": {"overseas_quarantine_allowance_covid_19", "trip_cancellation_covid_19"},
+    "how much do I get for travel delay": {"travel_delay"},
+    "is golf equipment covered": {"golfer"},
+    "will you pay for a funeral": {"funeral_expenses_accidental_death"},
+}
+
+RAG_QUESTIONS = [
+    "what is the period of insurance",
+    "how do I make a claim",
+    "who is the insurer",
+    "what is the definition of family in the policy",
+    "can I cancel my policy and get a refund of premium",
+    "what is the governing law of the insurance contract",
+    "how long is the free look period",
+    "what documents do I need to submit for a claim",
+    "what is the insurance premium for a family",
+    "what is the waiting period before cover starts",
+    "is there a deductible on the insurance",
+    "what if I lose my passport",
+]
+
+
+def _best(question):
+    hits = get_taxonomy_search().search(question, k=3)
+    return hits[0] if hits else None
+
+
+def test_tier1_questions_answer_from_taxonomy():
+    for question, expected in TIER1_QUESTIONS.items():
+        hit = _best(question)
+        assert hit is not None, question
+        assert hit["name"].split(":")[0] in expected, (question, hit["name"])
+        assert hit["confidence"] >= TIER1_MIN_CONFIDENCE, (question, hit)
+
+
+def test_rag_questions_fall_through():
+    for question in RAG_QUESTIONS:
+        hit = _best(question)
+        assert hit is None or hit["confidence"] < TIER1_MIN_CONFIDENCE, (question, hit)
+
+
+def separating_range():
+    """(highest RAG-question confidence, lowest tier-1 confidence) - the threshold belongs in between."""
+    rag = max((hit["confidence"] if hit else 0.0) for hit in map(_best, RAG_QUESTIONS))
+    tier1 = min(_best(question)["confidence"] for question in TIER1_QUESTIONS)
+    return rag, tier1
+
+
+if __name__ == "__main__":
+    for question in list(TIER1_QUESTIONS) + RAG_QUESTIONS:
+        hit = _best(question)
+        tier = "taxonomy" if hit and hit["confidence"] >= TIER1_MIN_CONFIDENCE else "rag"
+        print(f"{tier:<9} {hit['confidence'] if hit else 0.0:5.3f}  {question}  ->  {hit['name'] if hit else '-'}")
+
+    rag, tier1 = separating_range()
+    print(f"\nRAG questions up to {rag:.3f}, tier-1 questions from {tier1:.3f}; "
+          f"TIER1_MIN_CONFIDENCE = {TIER1_MIN_CONFIDENCE}")
+    test_tier1_questions_answer_from_taxonomy()
+    test_rag_questions_fall_through()
+    print("✓ All labelled questions routed correctly")